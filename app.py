@@ -1,7 +1,22 @@
+import math
+import os
+import tempfile
 import streamlit as st
 import pandas as pd
 import plotly.express as px
 
+from src.storage.feature_store import (feature_columns, list_periods, load_features, count_rows, load_page,
+                                       estimate_csv_bytes, write_features_csv)
+from src.storage.aggregate_store import has_aggregates, load_aggregate
+
+DATA_DIR = "data/processed"
+AGGREGATE_DIR = "data/rollups/dashboard"
+ENTRY_COLUMNS = ['date', 'text', 'emotion', 'bias/distortion', 'feedback/insight', 'quirk_cluster', 'peer_group']
+TREND_GRANULARITY = {"Day": "D", "Week": "W", "Month": "M"}
+PAGE_SIZES = [20, 50, 100]
+# Streamlit serves a download from memory, so larger exports are refused
+EXPORT_MAX_MB = 256
+
 # --- CONFIGURATION ---
 st.set_page_config(
     page_title="Journal Insight Dashboard",
@@ -11,24 +26,56 @@ st.set_page_config(
 )
 
 # --- DATA LOADING ---
+# Trends and metrics come from the per-period tables the pipeline writes
+# (size grows with the number of periods, not entries); entries are read one
+# page at a time, only the row groups holding that page.
+@st.cache_data
+def load_columns():
+    return feature_columns(DATA_DIR)
+
+@st.cache_data
+def load_periods():
+    return list_periods(DATA_DIR)
+
+@st.cache_data
+def load_aggregate_table(name, freq, start=None, end=None):
+    return load_aggregate(AGGREGATE_DIR, name, freq, start=start, end=end)
+
+@st.cache_data
+def count_period_entries(period):
+    return count_rows(DATA_DIR, periods=[period])
+
 @st.cache_data
-def load_data():
-    # Point to your pipeline's output file
-    return pd.read_csv("data/processed/cleaned_journal_features.csv")
+def load_entry_page(period, offset, limit, columns):
+    return load_page(DATA_DIR, offset, limit, columns=list(columns), periods=[period])
 
-df = load_data()
+@st.cache_data
+def period_mode(period, column):
+    values = load_features(DATA_DIR, columns=[column], periods=[period])[column]
+    return values.mode().iloc[0] if not values.empty else "N/A"
+
+all_columns = load_columns()
+traits = [col for col in all_columns if col.startswith('big5_')]
+cluster_col = "quirk_cluster" if "quirk_cluster" in all_columns else None
+peer_col = "peer_group" if "peer_group" in all_columns else None
 
 # --- SIDEBAR FILTERS ---
 st.sidebar.header("Journal Filter")
-periods = df['date'].unique()
+periods = load_periods()
 selected_period = st.sidebar.selectbox("Select Period/Month", options=periods)
+trend_freq = TREND_GRANULARITY[st.sidebar.selectbox("Trend Granularity", options=list(TREND_GRANULARITY))]
 
-traits = [col for col in df.columns if col.startswith('big5_')]
-cluster_col = "quirk_cluster" if "quirk_cluster" in df.columns else None
-peer_col = "peer_group" if "peer_group" in df.columns else None
+if selected_period is None:
+    st.warning(f"No journal entries in {DATA_DIR}; run the pipeline (main.py) first.")
+    st.stop()
+if not has_aggregates(AGGREGATE_DIR, trend_freq):
+    st.warning(f"No dashboard aggregates in {AGGREGATE_DIR}; run the pipeline (main.py) first.")
+    st.stop()
 
 # --- FILTER DATA ---
-df_period = df[df['date'] == selected_period]
+month = pd.Period(selected_period, freq='M')
+month_emotions = load_aggregate_table('emotions', 'M', month.start_time, month.end_time)
+entry_columns = tuple(c for c in ENTRY_COLUMNS + traits if c in all_columns)
 
 # --- TITLE AND INFO ---
 st.title("📔 Journal Analysis Dashboard")
@@ -37,41 +84,86 @@ st.markdown("Explore your journaling data: emotions, cognitive patterns, traits,
 # --- METRICS: Top Emotions, Traits, Clusters ---
 col1, col2, col3 = st.columns(3)
 with col1:
-    st.metric("Top Emotion", df_period['emotion'].mode().iloc[0] if not df_period.empty else "N/A")
+    # ties resolved like Series.mode(): smallest label
+    top_count = month_emotions['count'].max()
+    st.metric("Top Emotion", month_emotions.loc[month_emotions['count'] == top_count, 'emotion'].min() if not month_emotions.empty else "N/A")
 with col2:
-    st.metric("Peer Group", df_period[peer_col].mode().iloc[0] if peer_col and not df_period.empty else "N/A")
+    st.metric("Peer Group", period_mode(selected_period, peer_col) if peer_col else "N/A")
 with col3:
-    st.metric("Quirk Cluster", df_period[cluster_col].mode().iloc[0] if cluster_col and not df_period.empty else "N/A")
+    st.metric("Quirk Cluster", period_mode(selected_period, cluster_col) if cluster_col else "N/A")
 
-# --- SHOW JOURNALS TABLE ---
+# --- SHOW JOURNALS TABLE (server-side pagination) ---
 st.subheader("Journal Entries - Current Period")
-st.dataframe(df_period[['date', 'text', 'emotion', 'bias/distortion', 'feedback/insight', 'quirk_cluster', 'peer_group'] + traits].head(20))
+n_entries = count_period_entries(selected_period)
+page_col, size_col = st.columns(2)
+page_size = size_col.selectbox("Entries per page", options=PAGE_SIZES)
+n_pages = max(math.ceil(n_entries / page_size), 1)
+page = page_col.number_input(f"Page (of {n_pages})", min_value=1, max_value=n_pages, value=1, step=1)
+offset = (page - 1) * page_size
+df_page = load_entry_page(selected_period, offset, page_size, entry_columns)
+st.caption(f"Entries {min(offset + 1, n_entries)}–{offset + len(df_page)} of {n_entries}")
+st.dataframe(df_page)
 
 # --- EMOTION/PATTERN TRENDS ---
 st.subheader("Emotion Trend Over Time")
-fig1 = px.line(df, x="date", y="emotion", title="Emotion Change Over Time", markers=True)
+df_emotions = load_aggregate_table('emotions', trend_freq)
+top_emotions = df_emotions.groupby('emotion')['count'].sum().nlargest(5).index
+fig1 = px.line(df_emotions[df_emotions['emotion'].isin(top_emotions)], x="period", y="count", color="emotion",
+               title="Top Emotions Over Time", markers=True)
 st.plotly_chart(fig1, use_container_width=True)
 
 st.subheader("Distortion Count Trend Over Time")
-fig2 = px.line(df, x="date", y="distortion_count", title="Distortion Frequency Over Time")
+df_distortions = load_aggregate_table('distortions', trend_freq)
+fig2 = px.line(df_distortions, x="period", y=["distortion_sum", "distortion_rolling_mean"], title="Distortion Frequency Over Time")
 st.plotly_chart(fig2, use_container_width=True)
 
 # --- TRAIT VISUALIZATION ---
 st.subheader("Big Five Traits by Period")
-if traits:
-    df_trait = df.groupby('date')[traits].mean().reset_index()
-    fig3 = px.line(df_trait, x="date", y=traits, title="Trait Trends")
+df_trait = load_aggregate_table('traits', trend_freq)
+trait_means = [col for col in df_trait.columns if col != 'period']
+if trait_means:
+    fig3 = px.line(df_trait, x="period", y=trait_means, title="Trait Trends")
     st.plotly_chart(fig3, use_container_width=True)
 
 # --- FEEDBACK SECTION ---
+# Cards only for the entries on the current page
 st.subheader("Automated Feedback / Insights")
-for idx, row in df_period.iterrows():
-    st.info(f"**{row['date']} — Emotion:** {row['emotion']}\n\n**Feedback:** {row['feedback/insight']}")
+if {'date', 'emotion', 'feedback/insight'} <= set(df_page.columns):
+    for date, emotion, feedback in df_page[['date', 'emotion', 'feedback/insight']].itertuples(index=False):
+        st.info(f"**{date} — Emotion:** {emotion}\n\n**Feedback:** {feedback}")
 
 # --- DOWNLOAD/EXPORT ---
+# The CSV is written only when asked for, streamed from the store batch by
+# batch into a temporary file private to this session. st.download_button
+# cannot stream: it holds the whole file in memory, so exports above
+# EXPORT_MAX_MB are refused. The size is estimated from the row count before
+# anything is written, and writing stops at the limit if the estimate was low.
 st.sidebar.markdown("---")
 st.sidebar.header("Export")
-csv = df.to_csv(index=False).encode()
-st.sidebar.download_button("Download Full Data", csv, "journal_features.csv", "text/csv")
+
+def warn_export_too_large(size_mb, estimated=False):
+    st.sidebar.warning(f"The export is {'about ' if estimated else 'over '}{size_mb:,.0f} MB, above the {EXPORT_MAX_MB} MB "
+                       "in-browser limit. Set `output.export_csv: true` in the pipeline config to get the CSV from the "
+                       "pipeline run instead.")
+
+if st.sidebar.button("Prepare Full Data Export"):
+    max_bytes = EXPORT_MAX_MB * 2**20
+    estimate = estimate_csv_bytes(DATA_DIR)
+    if estimate > max_bytes:
+        warn_export_too_large(estimate / 2**20, estimated=True)
+    else:
+        with tempfile.NamedTemporaryFile(suffix=".csv", delete=False) as tmp:
+            export_file = tmp.name
+        try:
+            with st.spinner("Writing CSV export..."):
+                written = write_features_csv(DATA_DIR, export_file, max_bytes=max_bytes)
+            if written > max_bytes:
+                warn_export_too_large(written / 2**20)
+            else:
+                with open(export_file, 'rb') as f:
+                    data = f.read()
+                st.sidebar.download_button("Download Full Data", data, "journal_features.csv", "text/csv")
+        finally:
+            os.remove(export_file)
 
 st.sidebar.markdown("*Made with Streamlit — Journal Analysis Model Dashboard*")
@@ -1,95 +1,410 @@
+import numpy as np
 import pandas as pd
 import os
+import sys
+from functools import partial
 
 # === Config and Data Pipeline ===
-from src.data_preprocess.load_data import load_journal_data, load_yaml_config
-from src.data_preprocess.preprocess import preprocess_dataframe
+from src.data_preprocess.load_data import load_journal_data, load_yaml_config, iter_journal_chunks
+from src.data_preprocess.preprocess import preprocess_dataframe, clean_column_names
 
 # === Exploratory Data Analysis ===
-from src.eda.perform_eda import basic_eda_report, print_eda_report
+from src.eda.perform_eda import print_eda_report, EDAAccumulator
 
 # === Feature Engineering ===
-from src.features.feature_engineering import feature_engineering_pipeline
-from src.features.pattern_detection import detect_recurring_patterns, print_pattern_report
+from src.features.feature_engineering import feature_engineering_pipeline, cached_entry_features, tfidf_block, TfidfFeatures, ENTRY_FEATURE_COLUMNS
+from src.features import lexicon_matcher, personality_traits
+from src.features import corpus as corpus_module
+from src.features.lexicon_matcher import match_lexicons
+from src.features.corpus import build_corpus
+from src.features.pattern_detection import detect_recurring_patterns, print_pattern_report, PatternAccumulator
 
 # === Advanced Features: Traits, Quirks, Peer Groups ===
-from src.features.personality_traits import add_big5_traits
-from src.features.quirk_detection import detect_journal_quirks, summarize_quirks
-from src.features.norming import peer_group_clusters
+from src.features.personality_traits import add_big5_traits, big5_block, trait_lexicon, trait_columns
+from src.features.quirk_detection import detect_journal_quirks, summarize_quirks, online_quirk_clusters, QuirkVectorizer, quirk_artifact, predict_quirks
+from src.features.norming import peer_group_clusters, predict_peer_groups, UserTraitAggregator, user_norms
 
 # === Insights and Summaries ===
-from src.insights.psychological_inference import psychological_inference, user_insight_report, print_user_insight_report
-from src.insights.period_summary import period_insight_summary, print_period_summaries
+from src.insights import psychological_inference as inference_module
+from src.insights.psychological_inference import psychological_inference, distortion_block, user_insight_report, print_user_insight_report, InsightAccumulator
+from src.insights.period_summary import print_period_summaries, PeriodRollup
 from src.insights.period_feedback import attach_period_feedback, print_period_feedback
 
+# === Storage ===
+from src.storage.feature_store import save_features, export_csv
+from src.storage.feature_cache import FeatureCache
+from src.storage.aggregate_store import save_aggregates
+from src.storage.model_store import load_artifact, save_artifact, align_labels
+
 # === Visualization ===
 from src.visualization.progress_trends import plot_emotion_trend, plot_distortion_trend
 
+# === Pipeline Graph and Profiling ===
+from src.pipeline.graph import Stage, StageGraph
+from src.profiling.run_profile import RunProfiler
+
 # === Saving Utility ===
-def save_processed_data(df: pd.DataFrame, config: dict) -> None:
+def save_processed_data(df: pd.DataFrame, config: dict, append: bool = False, verbose: bool = True) -> str:
     output_path = config['data']['processed_data_dir']
+    output_cfg = config.get('output', {})
     os.makedirs(output_path, exist_ok=True)
-    output_file = os.path.join(output_path, "cleaned_journal_features.csv")
-    df.to_csv(output_file, index=False)
+    output_file = None
+    if output_cfg.get('format', 'parquet') == 'parquet':
+        output_file = save_features(df, output_path, append=append, row_group_size=output_cfg.get('row_group_size', 100000))
+    if output_cfg.get('format', 'parquet') == 'csv' or output_cfg.get('export_csv', False):
+        csv_file = export_csv(df, output_path, append=append)
+        output_file = output_file or csv_file
+    if verbose:
+        print(f"\n✅ Processed data with features saved to: {output_file}")
+        print(f"Columns in output: {df.columns.tolist()}")
+    return output_file
+
+# === Cached per-entry stages ===
+DISTORTION_COLUMNS = ['detected_distortions', 'distortion_count']
+
+def cached_preprocess(df: pd.DataFrame, config: dict, cache: FeatureCache) -> pd.DataFrame:
+    return cache.run_stage(df, 'preprocess', partial(preprocess_dataframe, config=config), clean_column_names(df, config))
+
+def cached_big5_traits(df: pd.DataFrame, cache: FeatureCache, config: dict, corpus=None, block: bool = False) -> pd.DataFrame:
+    lexicon = trait_lexicon(config)
+    return cache.run_stage(df, 'big5_traits', partial(big5_block if block else add_big5_traits, lexicon=lexicon),
+                           trait_columns(lexicon), modules=[personality_traits, corpus_module], key_cols=['text_clean'],
+                           row_kwargs={'corpus': corpus}, params=lexicon, block=block)
+
+def cached_psychological_inference(df: pd.DataFrame, cache: FeatureCache, matches=None, block: bool = False) -> pd.DataFrame:
+    return cache.run_stage(df, 'distortions', distortion_block if block else psychological_inference, DISTORTION_COLUMNS,
+                           modules=[inference_module, lexicon_matcher], key_cols=['text_clean'],
+                           row_kwargs={'matches': matches}, block=block)
+
+# === Cluster models: fit + versioned save, or predict-only ===
+QUIRK_MODEL = 'quirk_clusters'
+PEER_MODEL = 'peer_groups'
+
+def models_config(config: dict) -> dict:
+    return {'dir': 'data/models', 'mode': 'fit', 'keep_versions': 10, **(config.get('models') or {})}
+
+def save_cluster_model(df: pd.DataFrame, col: str, name: str, arrays: dict, config: dict, predict_previous, metadata=None) -> None:
+    """
+    Save freshly fitted cluster arrays as a new model version. When an
+    earlier version exists, the new cluster ids are first aligned with the
+    ids that version assigns to the same entries, and df[col] is relabelled,
+    so ids (and the dashboard's history) stay stable across refits.
+    """
+    models_cfg = models_config(config)
+    previous, previous_meta = load_artifact(models_cfg['dir'], name)
+    raw = df[col].to_numpy()
+    n_clusters = len(arrays['centers'])
+    arrays['cluster_ids'], agreement = np.arange(n_clusters), None
+    if previous is not None:
+        arrays['cluster_ids'], agreement = align_labels(raw, predict_previous(previous, previous_meta), n_clusters)
+        df[col] = arrays['cluster_ids'][raw]
+    meta = {'n_rows': len(df), 'n_clusters': n_clusters, 'label_agreement': agreement,
+            'parent_version': previous_meta['version'] if previous_meta else None}
+    version = save_artifact(models_cfg['dir'], name, arrays, {**meta, **(metadata or {})}, keep=models_cfg['keep_versions'])
+    aligned = f", ids aligned to v{previous_meta['version']} ({agreement:.1%} unchanged)" if previous_meta else ""
+    print(f"💾 Saved {name} model v{version}{aligned}")
+
+def assign_quirk_clusters(df: pd.DataFrame, corpus, config: dict) -> pd.DataFrame:
+    models_cfg = models_config(config)
+    if models_cfg['mode'] == 'predict':
+        artifact, meta = load_artifact(models_cfg['dir'], QUIRK_MODEL)
+        if artifact is not None:
+            df['quirk_cluster'] = predict_quirks(corpus, artifact)
+            print(f"⚡ Quirk clusters assigned with saved model v{meta['version']}")
+            return df
+        print("No saved quirk model yet, fitting one")
+
+    quirk_cfg = config.get('quirks', {})
+    if quirk_cfg.get('mode', 'batch') == 'online':
+        # Warm start: existing centroids assign the entries, refit only on drift
+        df, clusterer = online_quirk_clusters(df, corpus, config, update=False)
+        vectorizer, centers = clusterer.vectorizer, clusterer.model.cluster_centers_
+    else:
+        vectorizer = QuirkVectorizer()
+        df, quirk_model = detect_journal_quirks(df, text_col='text_clean', n_clusters=quirk_cfg.get('n_clusters', 5), corpus=corpus, vectorizer=vectorizer)
+        centers = quirk_model.cluster_centers_
+    save_cluster_model(df, 'quirk_cluster', QUIRK_MODEL, quirk_artifact(vectorizer, centers), config,
+                       lambda artifact, meta: predict_quirks(corpus, artifact), {'quirk_mode': quirk_cfg.get('mode', 'batch')})
+    return df
+
+def assign_peer_groups(df: pd.DataFrame, trait_cols: list, config: dict) -> pd.DataFrame:
+    models_cfg = models_config(config)
+    if models_cfg['mode'] == 'predict':
+        artifact, meta = load_artifact(models_cfg['dir'], PEER_MODEL)
+        if artifact is not None:
+            df['peer_group'] = predict_peer_groups(df, artifact, meta['feature_cols'])
+            print(f"⚡ Peer groups assigned with saved model v{meta['version']}")
+            return df
+        print("No saved peer-group model yet, fitting one")
+
+    df, peer_model = peer_group_clusters(df, feature_cols=trait_cols, n_clusters=3)
+    save_cluster_model(df, 'peer_group', PEER_MODEL, {'centers': peer_model.cluster_centers_}, config,
+                       lambda artifact, meta: predict_peer_groups(df, artifact, meta['feature_cols']), {'feature_cols': trait_cols})
+    return df
+
+# === Per-user norming ===
+def user_aggregator(df: pd.DataFrame, config: dict):
+    """UserTraitAggregator for the configured user column, or None when the data has no such column."""
+    user_col = config.get('norming', {}).get('user_col')
+    if not user_col or user_col not in df.columns:
+        print(f"No '{user_col}' column in the data, skipping per-user norming")
+        return None
+    return UserTraitAggregator([c for c in df.columns if c.startswith("big5_")])
+
+def save_user_norms(aggregator: UserTraitAggregator, config: dict) -> None:
+    """
+    User-level peer groups, nearest peers and trait percentiles from the
+    aggregated entries, written next to the processed features.
+    """
+    settings = config.get('norming', {})
+    profiles, norms = user_norms(aggregator, n_clusters=settings.get('n_clusters', 3), n_peers=settings.get('n_peers', 10),
+                                 nprobe=settings.get('nprobe', 3), n_bins=settings.get('n_bins', 2048))
+    output_path = config['data']['processed_data_dir']
+    os.makedirs(output_path, exist_ok=True)
+    output_file = os.path.join(output_path, 'user_norms.parquet')
+    profiles.to_parquet(output_file)
+    print(f"\n👥 User norms for {len(profiles)} users saved to: {output_file}")
+    print(norms.round(3))
+
+# === Period rollups ===
+def save_period_rollup(periods: PeriodRollup, config: dict) -> PeriodRollup:
+    """
+    Persist the day-level period rollup of this run (it serves D / W / M
+    summaries) and the per-period tables the dashboard reads. Each run rebuilds it from all processed entries; entries
+    added later go through PeriodRollup.load(dir).update(new).save(dir).
+    """
+    settings = config.get('rollups', {})
+    path = settings.get('dir', 'data/rollups/periods')
+    periods.save(path)
+    print(f"\n🗓️ Period rollup ({len(periods.days)} days) saved to: {path}")
+    dashboard_dir = settings.get('dashboard_dir', 'data/rollups/dashboard')
+    save_aggregates(periods, dashboard_dir, window=settings.get('rolling_window', 7))
+    print(f"📊 Dashboard aggregates saved to: {dashboard_dir}")
+    return periods
+
+def entry_dates(df: pd.DataFrame, start: pd.Timestamp) -> pd.Series:
+    """
+    Entry dates: the data's own `date` column when it has one, otherwise one
+    synthetic day per entry from `start` (only possible up to ~100k entries,
+    the end of the datetime64[ns] range).
+    """
+    if 'date' in df.columns:
+        return pd.to_datetime(df['date'])
+    return pd.Series(pd.date_range(start=start, periods=len(df), freq='D'), index=df.index)
+
+# === Per-entry stage graph ===
+# Graph stages -> the coarser profiling stages of streaming runs (and of
+# batch runs before the graph), so --diff-runs can compare across them
+PROFILE_STAGE_GROUPS = {
+    'preprocess': 'preprocess', 'matches': 'preprocess', 'corpus': 'preprocess', 'eda': 'eda',
+    'entry_features': 'features', 'tfidf': 'features', 'dates': 'features',
+    'big5_traits': 'traits', 'quirks': 'traits', 'peer_groups': 'traits', 'norms': 'traits',
+    'distortions': 'inference',
+}
+
+def journal_graph(config: dict, cache: FeatureCache, columns) -> StageGraph:
+    """
+    Per-entry stages of the batch pipeline with the columns / artifacts they
+    read and add, for a journal with the given raw `columns`. Feature stages
+    return their columns as one block (src/features/assembly.py).
+    """
+    text_cols = [c for c in config['preprocessing'].get('text_columns', []) if c in columns]
+    clean_cols = [f"{c}_clean" for c in text_cols]
+    trait_cols = trait_columns(trait_lexicon(config))
+    date_inputs = ['date'] if 'date' in columns else []
+    start_date = pd.Timestamp('2024-01-01')
+    return StageGraph([
+        Stage('preprocess', lambda f: cached_preprocess(f, config, cache), text_cols, clean_cols),
+        Stage('eda', lambda f: {'eda': EDAAccumulator.from_config(config).update(f).report()},
+              list(columns) + clean_cols, provides=['eda']),
+        Stage('matches', lambda f: {'matches': match_lexicons(f['text_clean'])}, ['text_clean'], provides=['matches']),
+        Stage('corpus', lambda f: {'corpus': build_corpus(f['text_clean'])}, ['text_clean'], provides=['corpus']),
+        Stage('entry_features', lambda f, matches, corpus: cached_entry_features(f, config, cache, matches, corpus, block=True),
+              ['text_clean'], ENTRY_FEATURE_COLUMNS, needs=['matches', 'corpus']),
+        Stage('tfidf', lambda f, corpus: tfidf_block(f, corpus=corpus),
+              ['text_clean'], TfidfFeatures().columns, needs=['corpus']),
+        Stage('dates', lambda f: {'date': entry_dates(f, start_date)}, date_inputs, ['date']),
+        Stage('big5_traits', lambda f, corpus: cached_big5_traits(f, cache, config, corpus, block=True),
+              ['text_clean'], trait_cols, needs=['corpus']),
+        Stage('quirks', lambda f, corpus: assign_quirk_clusters(f, corpus, config),
+              ['text_clean'], ['quirk_cluster'], needs=['corpus']),
+        Stage('peer_groups', lambda f: assign_peer_groups(f, trait_cols, config), trait_cols, ['peer_group']),
+        Stage('distortions', lambda f, matches: cached_psychological_inference(f, cache, matches, block=True),
+              ['text_clean'], DISTORTION_COLUMNS, needs=['matches']),
+    ])
+
+def stage_workers(config: dict) -> int:
+    return config.get('pipeline', {}).get('workers') or os.cpu_count() or 1
+
+def compute_columns(targets: list, config: dict = None) -> pd.DataFrame:
+    """
+    Load the journal and run only the per-entry stages that `targets` (e.g.
+    ['big5_openness', 'distortion_count']) depend on.
+    """
+    config = config or load_yaml_config()
+    df = load_journal_data(config)
+    graph = journal_graph(config, FeatureCache.from_config(config), df.columns)
+    return graph.run(df, targets=targets, workers=stage_workers(config))[0]
+
+# === Streaming Pipeline ===
+def main_streaming(config: dict, profiler: RunProfiler = None) -> None:
+    """
+    Chunked variant of main(): per-entry steps run on bounded chunks that are
+    appended to the processed output, while the aggregate reports are built
+    from mergeable accumulators. Quirk clusters are assigned only with
+    `quirks.mode: online` (centroids updated chunk by chunk); peer clustering
+    and the trend plots need the whole corpus and are skipped in this mode.
+    """
+    profiler = profiler or RunProfiler(enabled=False)
+    chunksize = config.get('pipeline', {}).get('chunksize', 50000)
+    print(f"🚀 Starting Journal Analysis Pipeline (streaming, {chunksize} rows/chunk)...\n")
+
+    eda, insights = EDAAccumulator.from_config(config), InsightAccumulator()
+    patterns = PatternAccumulator(config)
+    periods = PeriodRollup(date_col='date', mean_cols=trait_columns(trait_lexicon(config)))
+    cache = FeatureCache.from_config(config)
+    # IDF weights are fitted on the first chunk and reused for the rest
+    tfidf = TfidfFeatures()
+    online_quirks = config.get('quirks', {}).get('mode', 'batch') == 'online'
+    quirk_model = None
+    users = None
+    start_date = pd.Timestamp('2024-01-01')
+    rows_done, output_file = 0, None
+
+    for chunk in profiler.iterate('load', iter_journal_chunks(config, chunksize=chunksize)):
+        rows = len(chunk)
+        with profiler.stage('preprocess', rows):
+            chunk = cached_preprocess(chunk, config, cache)
+            matches = match_lexicons(chunk['text_clean'])
+            corpus = build_corpus(chunk['text_clean'])
+        with profiler.stage('eda', rows):
+            eda.update(chunk)
+
+        with profiler.stage('features', rows):
+            chunk = feature_engineering_pipeline(chunk, config, cache=cache, matches=matches, tfidf=tfidf, corpus=corpus)
+            chunk['date'] = entry_dates(chunk, start_date + pd.Timedelta(days=rows_done))
+        with profiler.stage('traits', rows):
+            chunk = cached_big5_traits(chunk, cache, config, corpus)
+            if online_quirks:
+                chunk, quirk_model = online_quirk_clusters(chunk, corpus, config, clusterer=quirk_model)
+            if rows_done == 0:
+                users = user_aggregator(chunk, config)
+            if users is not None:
+                users.update(chunk, config['norming']['user_col'])
+        with profiler.stage('inference', rows):
+            chunk = cached_psychological_inference(chunk, cache, matches)
+            insights.update(chunk, matches)
+        with profiler.stage('patterns', rows):
+            patterns.update(chunk, matches, corpus)
+        with profiler.stage('periods', rows):
+            periods.update(chunk)
+
+        with profiler.stage('save', rows):
+            output_file = save_processed_data(chunk, config, append=rows_done > 0, verbose=False)
+        rows_done += rows
+        print(f"📦 Processed {rows_done} rows")
+
+    with profiler.stage('eda'):
+        print_eda_report(eda.report())
+    with profiler.stage('inference'):
+        print_user_insight_report(insights.report())
+    with profiler.stage('patterns'):
+        print_pattern_report(patterns.report())
+    with profiler.stage('periods'):
+        period_summary_df = save_period_rollup(periods, config).summary('M')
+        print_period_summaries(period_summary_df)
+        print_period_feedback(attach_period_feedback(period_summary_df))
+
+    with profiler.stage('save'):
+        if users is not None:
+            save_user_norms(users, config)
+
     print(f"\n✅ Processed data with features saved to: {output_file}")
-    print(f"Columns in output: {df.columns.tolist()}")
+    cache.report()
+    profiler.metadata.update({'mode': 'streaming', 'rows': rows_done, 'chunksize': chunksize})
+    profiler.finish()
 
 # === Main Pipeline ===
-def main() -> None:
+def main(config: dict = None) -> None:
+    config = config or load_yaml_config()
+    profiler = RunProfiler.from_config(config)
+    if config.get('pipeline', {}).get('mode', 'batch') == 'streaming':
+        main_streaming(config, profiler)
+        return
+
     print("🚀 Starting Journal Analysis Pipeline...\n")
 
-    # Step 1: Load config and data
-    config = load_yaml_config()
-    df = load_journal_data(config)
+    # Step 1: Load data
+    with profiler.stage('load'):
+        df = load_journal_data(config)
+        cache = FeatureCache.from_config(config)
+    rows = len(df)
+    profiler.stages['load']['rows'] = rows
     print(f"📄 Raw data loaded. Shape: {df.shape}")
 
-    # Step 2: Preprocess text
-    df_clean = preprocess_dataframe(df, config)
+    # Steps 2-7: per-entry stages (preprocessing, EDA, features, dates,
+    # traits, quirks, peer groups, distortions) as a dependency graph;
+    # independent stages run concurrently
+    graph = journal_graph(config, cache, df.columns)
+    profiler.stage_groups.update(PROFILE_STAGE_GROUPS)
+    df_features, artifacts = graph.run(df, workers=stage_workers(config), profiler=profiler)
+    # One lexicon pass shared by every keyword-based scorer, and one
+    # tokenization shared by word counts, sentiment, TF-IDF, quirks and n-grams
+    matches, corpus = artifacts['matches'], artifacts['corpus']
     print("\n🧼 Preprocessing complete.")
-
-    # Step 3: EDA
-    report = basic_eda_report(df_clean)
-    print_eda_report(report)
-
-    # Step 4: Core Feature Engineering
-    df_features = feature_engineering_pipeline(df_clean, config)
+    print_eda_report(artifacts['eda'])
     print("🛠️ Feature engineering complete.")
 
-    # Step 5: Add date if needed
-    df_features['date'] = pd.date_range(start='2024-01-01', periods=len(df_features), freq='D')
-
-    # Step 6: Personality Traits, Quirks, Peer Groups
-    df_features = add_big5_traits(df_features, text_col='text_clean')
-    df_features, quirk_model = detect_journal_quirks(df_features, text_col='text_clean', n_clusters=5)
     print("\n=== Quirk/Recurring Pattern Example Summaries ===")
     for cluster, samples in summarize_quirks(df_features).items():
         print(f"Quirk Cluster {cluster}: {samples}")
-    trait_cols = [c for c in df_features.columns if c.startswith("big5_")]
-    df_features, peer_model = peer_group_clusters(df_features, feature_cols=trait_cols, n_clusters=3)
     print("Peer group assignments (first 10):", df_features['peer_group'].head(10).tolist())
+    with profiler.stage('norms', rows):
+        users = user_aggregator(df_features, config)
+        if users is not None:
+            save_user_norms(users.update(df_features, config['norming']['user_col']), config)
 
     # Step 7: Psychological Insight
-    df_features = psychological_inference(df_features, text_col='text_clean')
-    insight_summary = user_insight_report(df_features)
-    print_user_insight_report(insight_summary)
+    with profiler.stage('inference', rows):
+        insight_summary = user_insight_report(df_features, matches)
+        print_user_insight_report(insight_summary)
 
     # Step 8: Pattern Detection (themes, loops, triggers, etc.)
-    pattern_report = detect_recurring_patterns(df_features, config)
-    print_pattern_report(pattern_report)
+    with profiler.stage('patterns', rows):
+        pattern_report = detect_recurring_patterns(df_features, config, matches, corpus)
+        print_pattern_report(pattern_report)
 
     # Step 9: Evolution and Feedback
-    period_summary_df = period_insight_summary(df_features, date_col='date', freq='M')
-    print_period_summaries(period_summary_df)
-    period_feedback_df = attach_period_feedback(period_summary_df)
-    print_period_feedback(period_feedback_df)
+    with profiler.stage('periods', rows):
+        periods = PeriodRollup(date_col='date', mean_cols=trait_columns(trait_lexicon(config))).update(df_features)
+        periods = save_period_rollup(periods, config)
+        period_summary_df = periods.summary('M')
+        print_period_summaries(period_summary_df)
+        period_feedback_df = attach_period_feedback(period_summary_df)
+        print_period_feedback(period_feedback_df)
 
     # Step 10: Visualization (optional/interactive)
-    plot_emotion_trend(df_features, date_col='date', emotion_col='emotion')
-    plot_distortion_trend(df_features, date_col='date', distortion_col='distortion_count')
+    with profiler.stage('viz', rows):
+        plot_emotion_trend(df_features, date_col='date', emotion_col='emotion')
+        plot_distortion_trend(df_features, date_col='date', distortion_col='distortion_count')
 
     # Step 11: Persist full data
-    save_processed_data(df_features, config)
+    with profiler.stage('save', rows):
+        save_processed_data(df_features, config)
+    cache.report()
+    profiler.metadata.update({'mode': 'batch', 'rows': rows, 'workers': stage_workers(config)})
+    profiler.finish()
 
 # === Entry Point ===
 if __name__ == "__main__":
-    main()
+    if '--profile-imports' in sys.argv:
+        # startup profile: where `import main` spends its time
+        from src.profiling.import_profile import print_import_profile
+        print_import_profile('main')
+    elif '--diff-runs' in sys.argv:
+        # compare two run reports (default: the two latest)
+        from src.profiling.run_profile import print_run_diff
+        paths = sys.argv[sys.argv.index('--diff-runs') + 1:]
+        print_run_diff(*paths[:2], report_dir=load_yaml_config().get('profiling', {}).get('report_dir', 'data/runs'))
+    else:
+        main()
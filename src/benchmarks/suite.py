@@ -0,0 +1,358 @@
+# src/benchmarks/suite.py
+import argparse
+import contextlib
+import copy
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from functools import cached_property
+
+from src.benchmarks.synthetic_journal import generate_journal
+from src.data_preprocess.load_data import load_yaml_config
+from src.profiling.run_profile import reset_peak_rss, peak_rss_mb, current_rss_mb
+
+# Per-entry reference functions (preprocess_text, infer_distortions) are
+# timed on a sample; at millions of rows they would dominate the suite.
+PER_ENTRY_SAMPLE = 2000
+
+# Smallest differences reported as a regression (timer / allocator noise)
+MIN_REGRESSION_S = 0.005
+MIN_REGRESSION_MB = 5.0
+
+
+class BenchmarkData:
+    """
+    Synthetic journal of `rows` entries and the intermediate frames the
+    benchmarks start from, each built once on first use (not timed).
+    """
+
+    def __init__(self, rows, seed=0, config=None):
+        self.rows = rows
+        self.seed = seed
+        self.config = copy.deepcopy(config or load_yaml_config())
+        self.config.setdefault('cache', {})['enabled'] = False
+        self.config['preprocessing'].setdefault('parallel', {})['enabled'] = False
+
+    @cached_property
+    def raw(self):
+        return generate_journal(self.rows, seed=self.seed)
+
+    @cached_property
+    def clean(self):
+        from src.data_preprocess.preprocess import preprocess_dataframe
+        return preprocess_dataframe(self.raw.copy(), self.config)
+
+    @cached_property
+    def matches(self):
+        from src.features.lexicon_matcher import match_lexicons
+        return match_lexicons(self.clean['text_clean'])
+
+    @cached_property
+    def corpus(self):
+        from src.features.corpus import build_corpus
+        return build_corpus(self.clean['text_clean'])
+
+    @cached_property
+    def features(self):
+        """Clean entries with entry features, Big Five scores and distortions (dates from the generator)."""
+        from src.features.feature_engineering import feature_engineering_pipeline
+        from src.features.personality_traits import add_big5_traits
+        from src.insights.psychological_inference import psychological_inference
+        df = feature_engineering_pipeline(self.clean.copy(), self.config, matches=self.matches, corpus=self.corpus)
+        df = add_big5_traits(df, corpus=self.corpus)
+        return psychological_inference(df, matches=self.matches)
+
+    def sample(self, col='text'):
+        return self.raw[col].astype(str).head(PER_ENTRY_SAMPLE).tolist()
+
+    def pipeline_config(self, work_dir):
+        """Config running main.main on this journal, with every output under work_dir."""
+        config = copy.deepcopy(self.config)
+        raw_dir = os.path.join(work_dir, 'raw')
+        os.makedirs(raw_dir, exist_ok=True)
+        self.raw.to_csv(os.path.join(raw_dir, 'journal.csv'), index=False)
+        config['data'].update({'raw_data_dir': raw_dir, 'filenames': ['journal.csv'],
+                               'processed_data_dir': os.path.join(work_dir, 'processed')})
+        config.setdefault('models', {})['dir'] = os.path.join(work_dir, 'models')
+        config.setdefault('rollups', {}).update({'dir': os.path.join(work_dir, 'rollups'),
+                                                 'dashboard_dir': os.path.join(work_dir, 'dashboard')})
+        config.setdefault('profiling', {})['report_dir'] = os.path.join(work_dir, 'runs')
+        config['pipeline'] = {**config.get('pipeline', {}), 'mode': 'batch'}
+        return config
+
+
+# === Benchmark registry ===
+# A benchmark takes the BenchmarkData and returns (callable, rows): the setup
+# before the return is not timed, the callable is. It is called again for
+# every repeat, so each repeat gets fresh inputs. An untimed warm-up call
+# first keeps one-off costs (imports, NLTK data, lazy caches) out of the
+# numbers; `repeat` caps the repeats of slow benchmarks, which then skip it.
+BENCHMARKS = {}
+
+
+def benchmark(name, repeat=None):
+    def register(func):
+        BENCHMARKS[name] = (func, repeat)
+        return func
+    return register
+
+
+@benchmark('preprocess_text')
+def _bench_preprocess_text(data):
+    from src.data_preprocess.preprocess import preprocess_text
+    texts = data.sample()
+    return (lambda: [preprocess_text(t, data.config) for t in texts]), len(texts)
+
+
+@benchmark('preprocess_dataframe')
+def _bench_preprocess_dataframe(data):
+    from src.data_preprocess.preprocess import preprocess_dataframe
+    df = data.raw.copy()
+    return (lambda: preprocess_dataframe(df, data.config)), data.rows
+
+
+@benchmark('feature_engineering_pipeline')
+def _bench_feature_engineering(data):
+    from src.features.feature_engineering import feature_engineering_pipeline
+    df, matches, corpus = data.clean.copy(), data.matches, data.corpus
+    return (lambda: feature_engineering_pipeline(df, data.config, matches=matches, corpus=corpus)), data.rows
+
+
+@benchmark('add_big5_traits')
+def _bench_big5(data):
+    from src.features.personality_traits import add_big5_traits
+    df, corpus = data.clean.copy(), data.corpus
+    return (lambda: add_big5_traits(df, corpus=corpus)), data.rows
+
+
+@benchmark('infer_distortions')
+def _bench_infer_distortions(data):
+    from src.insights.psychological_inference import infer_distortions
+    texts = data.sample('text')
+    return (lambda: [infer_distortions(t) for t in texts]), len(texts)
+
+
+@benchmark('psychological_inference')
+def _bench_psychological_inference(data):
+    from src.insights.psychological_inference import psychological_inference
+    df, matches = data.clean.copy(), data.matches
+    return (lambda: psychological_inference(df, matches=matches)), data.rows
+
+
+@benchmark('feature_columns_inplace')
+def _bench_feature_columns_inplace(data):
+    # the feature columns added to one shared frame, one column at a time
+    from src.features.feature_engineering import feature_engineering_pipeline
+    from src.features.personality_traits import add_big5_traits
+    from src.insights.psychological_inference import psychological_inference
+    clean, matches, corpus = data.clean, data.matches, data.corpus
+
+    def run():
+        df = feature_engineering_pipeline(clean.copy(deep=False), data.config, matches=matches, corpus=corpus)
+        df = add_big5_traits(df, corpus=corpus)
+        return psychological_inference(df, matches=matches)
+    return run, data.rows
+
+
+@benchmark('feature_columns_blocks')
+def _bench_feature_columns_blocks(data):
+    # the same columns as one block per stage, assembled in a single concat
+    from src.features.assembly import assemble_frame
+    from src.features.feature_engineering import entry_feature_block, tfidf_block
+    from src.features.personality_traits import big5_block
+    from src.insights.psychological_inference import distortion_block
+    clean, matches, corpus = data.clean, data.matches, data.corpus
+    engine = data.config['features'].get('sentiment_engine', 'textblob')
+
+    def run():
+        return assemble_frame(clean, [
+            entry_feature_block(clean, matches=matches, corpus=corpus, sentiment_engine=engine),
+            tfidf_block(clean, corpus=corpus),
+            big5_block(clean, corpus=corpus),
+            distortion_block(clean, matches=matches),
+        ])
+    return run, data.rows
+
+
+@benchmark('get_top_ngrams')
+def _bench_top_ngrams(data):
+    from src.features.pattern_detection import get_top_ngrams
+    texts = data.clean['text_clean']
+    return (lambda: (get_top_ngrams(texts, n=2), get_top_ngrams(texts, n=3))), data.rows
+
+
+@benchmark('period_insight_summary')
+def _bench_period_summary(data):
+    from src.insights.period_summary import period_insight_summary
+    df = data.features
+    return (lambda: period_insight_summary(df, date_col='date', freq='M')), data.rows
+
+
+@benchmark('detect_journal_quirks')
+def _bench_quirks(data):
+    from src.features.quirk_detection import detect_journal_quirks
+    df, corpus = data.clean.copy(), data.corpus
+    return (lambda: detect_journal_quirks(df, corpus=corpus)), data.rows
+
+
+@benchmark('online_quirk_clusters')
+def _bench_online_quirks(data):
+    from src.features.quirk_detection import OnlineQuirkClusterer
+    clusterer, corpus = OnlineQuirkClusterer(), data.corpus
+    return (lambda: clusterer.fit(corpus)), data.rows
+
+
+@benchmark('peer_group_clusters')
+def _bench_peer_groups(data):
+    from src.features.norming import peer_group_clusters
+    df = data.features.copy()
+    trait_cols = [c for c in df.columns if c.startswith('big5_')]
+    return (lambda: peer_group_clusters(df, trait_cols)), data.rows
+
+
+@benchmark('main', repeat=1)
+def _bench_main(data):
+    import main
+    work_dir = os.path.join(tempfile.gettempdir(), 'journal-bench')
+    shutil.rmtree(work_dir, ignore_errors=True)
+    config = data.pipeline_config(work_dir)
+    return (lambda: main.main(config)), data.rows
+
+
+# === Running ===
+def time_benchmark(name, data, repeat=3):
+    """Median / best wall time, rows/sec and peak RSS above the starting RSS of one benchmark."""
+    func, max_repeat = BENCHMARKS[name]
+    repeat = min(repeat, max_repeat or repeat)
+    if max_repeat is None:
+        run, _ = func(data)
+        with contextlib.redirect_stdout(io.StringIO()):
+            run()
+    times, extra_mb = [], 0.0
+    for _ in range(repeat):
+        run, rows = func(data)
+        start_mb = current_rss_mb()
+        resettable = reset_peak_rss()
+        with contextlib.redirect_stdout(io.StringIO()):
+            t = time.perf_counter()
+            run()
+            times.append(time.perf_counter() - t)
+        if resettable and start_mb is not None:
+            extra_mb = max(extra_mb, peak_rss_mb() - start_mb)
+    median = statistics.median(times)
+    return {'name': name, 'rows': rows, 'repeat': repeat, 'median_s': median, 'min_s': min(times),
+            'rows_per_s': rows / median if median else None, 'peak_extra_mb': extra_mb}
+
+
+def run_suite(rows=10000, seed=0, repeat=3, only=None, skip=(), config=None):
+    """Run the registered benchmarks (all, or `only`) on a synthetic journal of `rows` entries."""
+    data = BenchmarkData(rows, seed=seed, config=config)
+    names = [name for name in (only or BENCHMARKS) if name not in skip]
+    results = []
+    for name in names:
+        result = time_benchmark(name, data, repeat=repeat)
+        results.append(result)
+        print(f"⏱️ {name:<30}{result['median_s']:>9.3f}s{result['rows_per_s'] or 0:>14,.0f} rows/s"
+              f"{result['peak_extra_mb']:>9.1f} MB")
+    return {
+        'started_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'rows': rows,
+        'seed': seed,
+        'benchmarks': results,
+    }
+
+
+# === Results and baseline ===
+def baseline_path(bench_dir, rows):
+    return os.path.join(bench_dir, f"baseline-{rows}.json")
+
+
+def save_results(results, bench_dir='data/benchmarks', baseline=False):
+    """Store a suite run (and optionally make it the baseline for its row count); returns the path."""
+    os.makedirs(bench_dir, exist_ok=True)
+    path = os.path.join(bench_dir, f"bench-{results['rows']}-{time.strftime('%Y%m%d-%H%M%S')}.json")
+    for target in [path] + ([baseline_path(bench_dir, results['rows'])] if baseline else []):
+        with open(target, 'w') as f:
+            json.dump(results, f, indent=2)
+    return path
+
+
+def compare_results(results, baseline, tolerance=0.25):
+    """
+    Per benchmark: baseline vs current median time and peak memory. A
+    benchmark regresses when either grows by more than `tolerance`
+    (relative, and by at least MIN_REGRESSION_S / MIN_REGRESSION_MB).
+    """
+    previous = {b['name']: b for b in baseline['benchmarks']}
+    rows = []
+    for current in results['benchmarks']:
+        old = previous.get(current['name'])
+        if old is None:
+            continue
+        slower = (current['median_s'] > old['median_s'] * (1 + tolerance)
+                  and current['median_s'] - old['median_s'] >= MIN_REGRESSION_S)
+        heavier = (current['peak_extra_mb'] > old['peak_extra_mb'] * (1 + tolerance)
+                   and current['peak_extra_mb'] - old['peak_extra_mb'] >= MIN_REGRESSION_MB)
+        rows.append({'name': current['name'], 'old_s': old['median_s'], 'new_s': current['median_s'],
+                     'time_ratio': current['median_s'] / old['median_s'] if old['median_s'] else None,
+                     'old_mb': old['peak_extra_mb'], 'new_mb': current['peak_extra_mb'],
+                     'regression': slower or heavier})
+    return rows
+
+
+def print_comparison(rows):
+    print(f"\n{'benchmark':<30}{'base s':>9}{'now s':>9}{'ratio':>8}{'base MB':>9}{'now MB':>9}")
+    for r in rows:
+        ratio = f"{r['time_ratio']:.2f}" if r['time_ratio'] is not None else '-'
+        flag = ' ⚠️ regression' if r['regression'] else ''
+        print(f"{r['name']:<30}{r['old_s']:>9.3f}{r['new_s']:>9.3f}{ratio:>8}{r['old_mb']:>9.1f}{r['new_mb']:>9.1f}{flag}")
+
+
+def main(argv=None):
+    config = load_yaml_config()
+    settings = config.get('benchmarks', {}) or {}
+    parser = argparse.ArgumentParser(description="Benchmark the journal pipeline on synthetic data")
+    parser.add_argument('--rows', type=lambda v: int(float(v)), default=settings.get('rows', 10000))
+    parser.add_argument('--repeat', type=int, default=settings.get('repeat', 3))
+    parser.add_argument('--seed', type=int, default=settings.get('seed', 0))
+    parser.add_argument('--only', help="comma-separated benchmark names")
+    parser.add_argument('--skip', default='', help="comma-separated benchmark names")
+    parser.add_argument('--save-baseline', action='store_true', help="store this run as the baseline")
+    parser.add_argument('--list', action='store_true', help="list the benchmarks")
+    args = parser.parse_args(argv)
+    if args.list:
+        print('\n'.join(BENCHMARKS))
+        return 0
+
+    bench_dir = settings.get('dir', 'data/benchmarks')
+    print(f"🏁 Benchmarking on {args.rows} synthetic entries (seed {args.seed}, {args.repeat} repeats)")
+    results = run_suite(args.rows, seed=args.seed, repeat=args.repeat, config=config,
+                        only=args.only.split(',') if args.only else None, skip=args.skip.split(','))
+    path = save_results(results, bench_dir, baseline=args.save_baseline)
+    print(f"💾 Results saved to: {path}")
+
+    baseline_file = baseline_path(bench_dir, args.rows)
+    if args.save_baseline or not os.path.exists(baseline_file):
+        print(f"📌 Baseline: {baseline_file}" if args.save_baseline else "No baseline for this row count yet (use --save-baseline)")
+        return 0
+    with open(baseline_file) as f:
+        comparison = compare_results(results, json.load(f), tolerance=settings.get('tolerance', 0.25))
+    print_comparison(comparison)
+    regressions = [r['name'] for r in comparison if r['regression']]
+    if regressions:
+        print(f"\n❌ Regressions against {baseline_file}: {', '.join(regressions)}")
+        return 1
+    print(f"\n✅ No regressions against {baseline_file}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+# src/benchmarks/synthetic_journal.py
+import os
+import sys
+import numpy as np
+import pandas as pd
+
+# Synthetic journal entries in the schema of data/raw/journal.csv, for
+# benchmarks at any scale. Entries are composed from phrase pools: a
+# context-specific event, a sentence for the emotion, one sentence per
+# labelled distortion (using the keywords the CBT / trait lexicons look for)
+# and sometimes a trait sentence. Label shares follow the bundled data.
+# Generation is vectorized and chunked; the same seed and chunk size always
+# produce the same rows.
+
+EMOTIONS = {
+    'shame': 146, 'anxiety': 143, 'joy': 98, 'hope': 85, 'sadness': 88, 'neutral': 82, 'anger': 68,
+    'guilt': 30, 'fear': 37, 'disappointment': 20, 'pride': 19, 'frustration': 21, 'loneliness': 14,
+    'despair': 17, 'relief': 10, 'determination': 26, 'joy with anxiety': 32, 'guilt, overwhelm': 20,
+    'shame, self-doubt': 11, 'anxiety, pride': 12,
+}
+
+CONTEXTS = {
+    'career': 139, 'health': 126, 'work': 121, 'parenting': 118, 'relationship': 108, 'family': 96,
+    'creative': 81, 'social': 72, 'friendship': 51, 'education': 44, 'financial': 29, 'fitness': 23,
+}
+
+DISTORTIONS = {
+    'none': 395, 'emotional reasoning': 402, 'labeling': 287, 'magnification': 243, 'personalization': 226,
+    'fortune telling': 225, 'mind reading': 223, 'catastrophizing': 219, 'mental filtering': 186,
+    'all-or-nothing thinking': 179, 'overgeneralization': 169, 'should statements': 140,
+    'disqualifying the positive': 35,
+}
+
+# Share of distorted entries with a second label (1552 single vs 1259 double in the bundled data)
+SECOND_DISTORTION_SHARE = 0.45
+
+# Dates are spread over three years unless `days` says otherwise
+DEFAULT_DAYS = 3 * 365
+
+OPENERS = ['Today', 'This morning', 'Tonight', 'Yesterday', 'This week', 'After lunch', 'Earlier today', 'Last night']
+
+EVENTS = {
+    'career': ['I had a performance review with my manager', 'I applied for a promotion I have wanted for months',
+               'I presented my project to the leadership team', 'I got feedback on my job interview'],
+    'health': ['I got my test results back from the doctor', 'I skipped my morning walk again',
+               'I finally booked the appointment I kept postponing', 'I slept badly for the third night'],
+    'work': ['the deadline for the client report moved up', 'my coworker took credit for my idea in the meeting',
+             'I finished three of my five priority tasks', 'I stayed late to fix a bug before the release'],
+    'parenting': ['my son refused to do his homework', 'I missed my daughter\'s school play because of work',
+                  'the kids and I cooked dinner together', 'the teacher called about my child\'s grades'],
+    'relationship': ['my partner forgot our anniversary', 'we had a long honest talk about moving in together',
+                     'my partner has been quiet all evening', 'we argued about money again'],
+    'family': ['my mother called to criticize my choices', 'we had a family dinner for my brother\'s birthday',
+               'my sister asked to borrow money again', 'I visited my grandparents after a long time'],
+    'creative': ['I finished the first draft of my short story', 'nobody commented on the painting I posted',
+                 'I spent the whole afternoon on a new song', 'my art was rejected from the local exhibition'],
+    'social': ['I went to a party where I barely knew anyone', 'my friends made plans without me',
+               'I gave a toast at the wedding', 'I met new people at the community event'],
+    'friendship': ['my best friend canceled our plans last minute', 'an old friend reached out after years',
+                   'I forgot to reply to my friend\'s message', 'I helped a friend move into a new flat'],
+    'education': ['I got my exam grade back', 'I could not follow the lecture at all',
+                  'my thesis advisor praised my chapter', 'I failed the quiz I studied for'],
+    'financial': ['an unexpected bill arrived', 'I paid off the last of my credit card',
+                  'I checked my savings and they are lower than I hoped', 'my rent is going up next month'],
+    'fitness': ['I ran five kilometers without stopping', 'I skipped the gym for the whole week',
+                'my trainer said I am making progress', 'I hurt my knee during practice'],
+}
+
+FEELINGS = {
+    'shame': ['I felt so embarrassed I wanted to disappear.', 'I am ashamed of how I reacted.'],
+    'anxiety': ['My chest is tight and I cannot stop worrying.', 'I feel anxious and on edge.'],
+    'joy': ['I feel genuinely happy and grateful.', 'It was a really good day and I am proud of it.'],
+    'hope': ['I feel hopeful that things are getting better.', 'Maybe this is the start of something good.'],
+    'sadness': ['I feel sad and tired of everything.', 'I cried for a while afterwards.'],
+    'neutral': ['It was an ordinary day overall.', 'Nothing special, just getting through it.'],
+    'anger': ['I am furious and could barely hold it in.', 'It made me really angry.'],
+    'guilt': ['I feel guilty for letting people down.', 'I keep replaying what I should have done.'],
+    'fear': ['I am afraid of what comes next.', 'I feel scared and unsafe.'],
+    'disappointment': ['I am disappointed in how it turned out.', 'I expected so much more.'],
+    'pride': ['I am proud of myself for once.', 'I did something I did not think I could.'],
+    'frustration': ['I am frustrated that nothing changes.', 'It is so frustrating to start over again.'],
+    'loneliness': ['I feel lonely even around other people.', 'Nobody really gets me lately.'],
+    'despair': ['I feel hopeless about all of this.', 'I do not see a way out.'],
+    'relief': ['I feel relieved that it is finally over.', 'A weight came off my shoulders.'],
+    'determination': ['I am determined to keep going.', 'I will not give up on this goal.'],
+    'joy with anxiety': ['I am happy but also nervous it will not last.'],
+    'guilt, overwhelm': ['I feel guilty and completely overwhelmed.'],
+    'shame, self-doubt': ['I feel ashamed and doubt I can do anything right.'],
+    'anxiety, pride': ['I am proud of it but anxious about what people will say.'],
+}
+
+DISTORTION_PHRASES = {
+    'none': ['I tried to look at it calmly.', 'I want to learn from it.'],
+    'emotional reasoning': ['I feel like a failure, so I must be one.', 'I feel stupid, so it must be true.'],
+    'labeling': ['I am such an idiot.', 'I am a total loser.'],
+    'magnification': ['This tiny mistake is a huge deal.', 'One bad comment ruined the whole thing.'],
+    'personalization': ['It is my fault that it went wrong.', 'It happened because of me.'],
+    'fortune telling': ['I just know it will go badly tomorrow.', 'It is inevitable that I will fail.'],
+    'mind reading': ['I think they assume I am lazy.', 'I know what others think of me.'],
+    'catastrophizing': ['This is a disaster and the worst thing that could happen.', 'Everything is ruined now.'],
+    'mental filtering': ['All I can think about is the one thing that went wrong.', 'I only remember the criticism.'],
+    'all-or-nothing thinking': ['If it is not perfect it is worthless.', 'I either do it right or I am a failure.'],
+    'overgeneralization': ['Nobody ever listens to me.', 'Every time I try, it goes wrong for everyone.'],
+    'should statements': ['I should have done better.', 'I must be stronger than this, I have to be.'],
+    'disqualifying the positive': ['They said it was good, but they were just being nice.',
+                                   'That success does not count, it was luck.'],
+}
+
+TRAIT_PHRASES = [
+    'I want to imagine something creative and novel for my art.', 'I made a plan and stayed organized toward my goal.',
+    'I want to meet a friend and talk in a group.', 'I tried to be kind and forgive, and to be generous with the team.',
+    'I worry a lot and feel anxious and upset.', 'I keep my discipline and order even when I feel afraid.',
+]
+TRAIT_SHARE = 0.5
+
+# Free-text annotation columns of the journal schema
+ANNOTATION_COLUMNS = [
+    'feedback/insight', 'behavioral_recommendation', 'progress_tracking', 'motivation', 'perception', 'habit',
+    'social_influence', 'attention', 'memory', 'trust', 'past_experience', 'decision_making',
+    'adaptive_behavior', 'identity', 'situational_trigger', 'cultural',
+]
+JOURNAL_COLUMNS = ['text', 'emotion', 'bias/distortion', 'context'] + ANNOTATION_COLUMNS
+
+
+def _weighted(table):
+    labels = np.array(list(table), dtype=object)
+    weights = np.array(list(table.values()), dtype=float)
+    return labels, weights / weights.sum()
+
+
+def _pool(groups, keys):
+    """Flattened phrase pool with (start, size) per key, for vectorized picking."""
+    phrases = [p for key in keys for p in groups[key]]
+    sizes = np.array([len(groups[key]) for key in keys])
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]])
+    return np.array(phrases, dtype=object), starts, sizes
+
+
+def _pick(rng, pool, codes):
+    phrases, starts, sizes = pool
+    return phrases[starts[codes] + (rng.random(len(codes)) * sizes[codes]).astype(np.int64)]
+
+
+def annotation_pools(reference='data/raw/journal.csv'):
+    """Distinct values per annotation column from a reference journal file (None when it is missing)."""
+    if not reference or not os.path.exists(reference):
+        return None
+    ref = pd.read_csv(reference, usecols=lambda c: c in ANNOTATION_COLUMNS)
+    return {col: ref[col].dropna().drop_duplicates().to_numpy(dtype=object) for col in ref.columns}
+
+
+def generate_journal(rows, seed=0, start='2022-01-01', days=None, offset=0, total_rows=None,
+                     annotations=None):
+    """
+    `rows` synthetic journal entries (plus a `date` column). Dates are sorted
+    and spread over `days` days from `start` (default DEFAULT_DAYS);
+    offset/total_rows place a chunk inside a longer journal.
+    `annotations` maps annotation columns to value pools (see
+    annotation_pools); without it they are filled from the labels.
+    """
+    rng = np.random.default_rng(seed)
+    total_rows = total_rows or rows
+    days = days or DEFAULT_DAYS
+
+    emotions, emotion_p = _weighted(EMOTIONS)
+    contexts, context_p = _weighted(CONTEXTS)
+    distortions, distortion_p = _weighted(DISTORTIONS)
+    emotion = rng.choice(len(emotions), rows, p=emotion_p)
+    context = rng.choice(len(contexts), rows, p=context_p)
+    first = rng.choice(len(distortions), rows, p=distortion_p)
+    # second label: any other distortion, only for distorted entries
+    second = rng.integers(1, len(distortions) - 1, rows)
+    second = np.where(second >= first, second + 1, second)
+    has_second = (first != 0) & (rng.random(rows) < SECOND_DISTORTION_SHARE)
+
+    opener = np.array(OPENERS, dtype=object)[rng.integers(0, len(OPENERS), rows)]
+    text = (pd.Series(opener) + ' ' + _pick(rng, _pool(EVENTS, contexts), context) + '. '
+            + _pick(rng, _pool(FEELINGS, emotions), emotion) + ' '
+            + _pick(rng, _pool(DISTORTION_PHRASES, distortions), first))
+    distortion_pool = _pool(DISTORTION_PHRASES, distortions)
+    text = text.where(~has_second, text + ' ' + _pick(rng, distortion_pool, second))
+    trait = np.array(TRAIT_PHRASES, dtype=object)[rng.integers(0, len(TRAIT_PHRASES), rows)]
+    text = text.where(rng.random(rows) >= TRAIT_SHARE, text + ' ' + trait)
+
+    label = pd.Series(distortions[first])
+    label = label.where(~has_second, label + ', ' + distortions[second])
+
+    # uniform positions over the whole journal, sorted within the chunk
+    positions = np.sort(rng.random(rows)) * rows + offset
+    seconds = (positions / total_rows * days * 86400).astype(np.int64)
+    df = pd.DataFrame({
+        'text': '"' + text + '"',
+        'emotion': emotions[emotion],
+        'bias/distortion': label,
+        'context': contexts[context],
+    })
+    for col in ANNOTATION_COLUMNS:
+        if annotations and col in annotations and len(annotations[col]):
+            values = annotations[col]
+            df[col] = values[rng.integers(0, len(values), rows)]
+        else:
+            df[col] = df['context'] + ' ' + col.replace('_', ' ')
+    df['date'] = pd.Timestamp(start) + pd.to_timedelta(seconds, unit='s')
+    return df
+
+
+def iter_journal(rows, chunk_rows=500_000, seed=0, start='2022-01-01', days=None, reference='data/raw/journal.csv'):
+    """generate_journal in chunks of `chunk_rows` (one child seed per chunk)."""
+    annotations = annotation_pools(reference)
+    n_chunks = -(-rows // chunk_rows) if rows else 0
+    seeds = np.random.SeedSequence(seed).spawn(n_chunks)
+    for i, chunk_seed in enumerate(seeds):
+        offset = i * chunk_rows
+        n = min(chunk_rows, rows - offset)
+        chunk = generate_journal(n, seed=chunk_seed, start=start, days=days, offset=offset, total_rows=rows,
+                                 annotations=annotations)
+        chunk.index = pd.RangeIndex(offset, offset + n)
+        yield chunk
+
+
+def write_synthetic_journal(path, rows, chunk_rows=500_000, seed=0, **kwargs):
+    """Write `rows` synthetic entries to a journal CSV, one chunk at a time; returns the path."""
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    for i, chunk in enumerate(iter_journal(rows, chunk_rows=chunk_rows, seed=seed, **kwargs)):
+        chunk.to_csv(path, mode='w' if i == 0 else 'a', header=i == 0, index=False)
+    print(f"🧪 Synthetic journal with {rows} entries written to: {path}")
+    return path
+
+
+if __name__ == "__main__":
+    # python -m src.benchmarks.synthetic_journal <rows> <path> [seed]
+    write_synthetic_journal(sys.argv[2], int(float(sys.argv[1])), seed=int(sys.argv[3]) if len(sys.argv) > 3 else 0)
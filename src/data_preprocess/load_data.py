@@ -20,3 +20,21 @@ def load_journal_data(config):
 
     df_all = pd.concat(frames, ignore_index=True)
     return df_all
+
+def iter_journal_chunks(config, chunksize=50000):
+    """
+    Yield the configured journal CSVs as DataFrames of at most `chunksize` rows.
+    The index keeps counting across chunks and files, as in load_journal_data.
+    """
+    data_dir = Path(config['data']['raw_data_dir'])
+    filenames = config['data']['filenames']
+    for fname in filenames:
+        if not (data_dir / fname).exists():
+            raise FileNotFoundError(f"{data_dir / fname} not found.")
+
+    offset = 0
+    for fname in filenames:
+        for chunk in pd.read_csv(data_dir / fname, chunksize=chunksize):
+            chunk.index = pd.RangeIndex(offset, offset + len(chunk))
+            offset += len(chunk)
+            yield chunk
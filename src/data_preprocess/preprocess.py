@@ -1,21 +1,74 @@
 # src/data_preprocess/preprocess.py
+import os
 import re
 import string
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+import numpy as np
 import pandas as pd
-import nltk
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
 import yaml
 
-nltk.download('stopwords')
-nltk.download('punkt')
-nltk.download('wordnet')
+# NLTK data packages and the resource paths that satisfy them (NLTK >= 3.9
+# tokenizes with punkt_tab). Checked when a preprocessor is built, not at import.
+NLTK_RESOURCES = {
+    'punkt_tab': ['tokenizers/punkt_tab', 'tokenizers/punkt'],
+    'stopwords': ['corpora/stopwords'],
+    'wordnet': ['corpora/wordnet', 'corpora/wordnet.zip'],
+}
+
+def _has_nltk_resource(nltk, package):
+    for path in NLTK_RESOURCES[package]:
+        try:
+            nltk.data.find(path)
+            return True
+        except LookupError:
+            pass
+    return False
+
+@lru_cache(maxsize=None)
+def ensure_nltk_resources(packages=tuple(NLTK_RESOURCES), download=True):
+    """
+    Check (once per process) that the NLTK data packages are installed
+    locally; only missing ones are downloaded, and only with download=True.
+    Raises LookupError for a package that is still missing, e.g. on an
+    offline worker without a populated NLTK_DATA directory.
+    """
+    import nltk
+    for package in packages:
+        if _has_nltk_resource(nltk, package):
+            continue
+        if download:
+            print(f"⬇️ Downloading NLTK data '{package}'")
+            nltk.download(package, quiet=True)
+        if not _has_nltk_resource(nltk, package):
+            raise LookupError(f"NLTK data '{package}' is not installed; run nltk.download('{package}') "
+                              f"where the network is available, or point NLTK_DATA at a copy")
+    return nltk
+
+def nltk_packages(config):
+    """NLTK data packages the preprocessing settings need."""
+    opts = config['preprocessing']
+    packages = ['punkt_tab']
+    if opts.get('remove_stopwords', True):
+        packages.append('stopwords')
+    if opts.get('lemmatize', True):
+        packages.append('wordnet')
+    return tuple(packages)
+
+def load_nltk(config):
+    return ensure_nltk_resources(nltk_packages(config), download=config['preprocessing'].get('nltk_download', True))
 
 def load_yaml_config(path='src/config/config.yaml'):
     with open(path, 'r') as f:
         return yaml.safe_load(f)
 
 def preprocess_text(text, config):
+    nltk = load_nltk(config)
+    from nltk.corpus import stopwords
+    from nltk.stem import WordNetLemmatizer
+
     # Lowercase
     if config['preprocessing'].get('lowercase', True):
         text = text.lower()
@@ -43,9 +96,165 @@ def preprocess_text(text, config):
 
     return ' '.join(tokens)
 
+# === Compiled preprocessor ===
+# Cleaned text made only of ASCII letters/digits/whitespace needs no sentence
+# splitting or Treebank punctuation rules, so word_tokenize reduces to split()
+# plus the handful of contractions NLTK always breaks apart.
+_PLAIN_TEXT = re.compile(r'[A-Za-z0-9 \t\n\r\f\v]*')
+_TREEBANK_SPLITS = {'cannot', 'gimme', 'gonna', 'gotta', 'lemme', 'wanna'}
+_DIGITS = re.compile(r'\d+')
+
+
+class TextPreprocessor:
+    """
+    Preprocessing settings compiled once: stopword set, lemmatizer, a single
+    translate table for punctuation/digit stripping and a token -> lemma memo.
+    Produces exactly the same output as preprocess_text.
+    """
+
+    def __init__(self, config):
+        opts = config['preprocessing']
+        self.lowercase = opts.get('lowercase', True)
+        self.remove_punctuation = opts.get('remove_punctuation', True)
+        self.remove_numbers = opts.get('remove_numbers', True)
+        self.remove_stopwords = opts.get('remove_stopwords', True)
+        self.lemmatize = opts.get('lemmatize', True)
+
+        deleted = ''
+        if self.remove_punctuation:
+            deleted += string.punctuation
+        if self.remove_numbers:
+            deleted += string.digits
+        self._table = str.maketrans('', '', deleted)
+        nltk = load_nltk(config)
+        from nltk.corpus import stopwords
+        from nltk.stem import WordNetLemmatizer
+        self._word_tokenize = nltk.word_tokenize
+        self._stop_words = set(stopwords.words('english')) if self.remove_stopwords else set()
+        self._lemmatizer = WordNetLemmatizer() if self.lemmatize else None
+        self._memo = {}
+
+    def tokenize(self, text):
+        if not _PLAIN_TEXT.fullmatch(text):
+            return self._word_tokenize(text)
+        tokens = []
+        for token in text.split():
+            if token.lower() in _TREEBANK_SPLITS:
+                tokens.extend((token[:3], token[3:]))
+            else:
+                tokens.append(token)
+        return tokens
+
+    def _resolve(self, token):
+        # '' marks a dropped stopword
+        if token in self._stop_words:
+            lemma = ''
+        elif self._lemmatizer is not None:
+            lemma = self._lemmatizer.lemmatize(token)
+        else:
+            lemma = token
+        self._memo[token] = lemma
+        return lemma
+
+    def warm_up(self):
+        """Force NLTK's lazily loaded corpora (WordNet, Punkt) into memory."""
+        self.tokenize('Warm up.')
+        if self._lemmatizer is not None:
+            self._lemmatizer.lemmatize('warming')
+
+    def __call__(self, text):
+        if self.lowercase:
+            text = text.lower()
+        text = text.translate(self._table)
+        # \d also matches non-ASCII digits, which the table does not cover
+        if self.remove_numbers and not text.isascii():
+            text = _DIGITS.sub('', text)
+
+        memo = self._memo
+        lemmas = [memo[t] if t in memo else self._resolve(t) for t in self.tokenize(text)]
+        return ' '.join([t for t in lemmas if t])
+
+
+def build_preprocessor(config):
+    return TextPreprocessor(config)
+
+# === Parallel (sharded) preprocessing ===
+_WORKER_PREPROCESSOR = None
+
+def _init_worker(config):
+    global _WORKER_PREPROCESSOR
+    _WORKER_PREPROCESSOR = build_preprocessor(config)
+    _WORKER_PREPROCESSOR.warm_up()
+
+def _preprocess_chunk(chunk_id, texts):
+    start = time.perf_counter()
+    cleaned = [_WORKER_PREPROCESSOR(t) for t in texts]
+    return chunk_id, cleaned, time.perf_counter() - start, os.getpid()
+
+def plan_chunks(lengths, workers, target_chunk_chars=2_000_000, min_chunk_rows=500):
+    """
+    Split rows into contiguous [start, stop) chunks of roughly equal total text
+    length, aiming for at least 4 chunks per worker so long entries don't leave
+    the pool unbalanced.
+    """
+    n_rows = len(lengths)
+    if n_rows == 0:
+        return []
+    cum_chars = np.cumsum(lengths)
+    chunk_chars = max(1, min(target_chunk_chars, int(cum_chars[-1] // (workers * 4))))
+    bounds = [0]
+    while bounds[-1] < n_rows:
+        start = bounds[-1]
+        base = cum_chars[start - 1] if start else 0
+        stop = int(np.searchsorted(cum_chars, base + chunk_chars, side='right'))
+        bounds.append(min(n_rows, max(stop, start + min_chunk_rows)))
+    return list(zip(bounds[:-1], bounds[1:]))
+
+def preprocess_series_parallel(series, config, workers=None):
+    """
+    Preprocess a text Series on a process pool. Chunks are reassembled in their
+    original order, so the result matches the serial path row for row.
+    """
+    opts = config['preprocessing'].get('parallel', {}) or {}
+    workers = workers or opts.get('workers') or os.cpu_count() or 1
+    texts = series.tolist()
+    chunks = plan_chunks(
+        series.str.len().to_numpy(),
+        workers,
+        target_chunk_chars=opts.get('target_chunk_chars', 2_000_000),
+        min_chunk_rows=opts.get('min_chunk_rows', 500),
+    )
+
+    results = [None] * len(chunks)
+    worker_rows, worker_secs = defaultdict(int), defaultdict(float)
+    with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker, initargs=(config,)) as pool:
+        futures = [pool.submit(_preprocess_chunk, i, texts[a:b]) for i, (a, b) in enumerate(chunks)]
+        for future in futures:
+            chunk_id, cleaned, elapsed, pid = future.result()
+            results[chunk_id] = cleaned
+            worker_rows[pid] += len(cleaned)
+            worker_secs[pid] += elapsed
+
+    print(f"Parallel preprocessing: {len(texts)} rows in {len(chunks)} chunks over {len(worker_rows)} workers")
+    for pid in sorted(worker_rows):
+        rate = worker_rows[pid] / worker_secs[pid] if worker_secs[pid] else float('inf')
+        print(f"  worker {pid}: {worker_rows[pid]} rows, {rate:,.0f} rows/sec")
+
+    return pd.Series([t for chunk in results for t in chunk], index=series.index, dtype=object)
+
+def clean_column_names(df, config):
+    """Columns preprocess_dataframe adds to df."""
+    return [f"{col}_clean" for col in config['preprocessing'].get('text_columns', []) if col in df.columns]
+
 def preprocess_dataframe(df, config):
     text_columns = config['preprocessing'].get('text_columns', [])
+    parallel = (config['preprocessing'].get('parallel', {}) or {}).get('enabled', False)
+    preprocessor = None if parallel else build_preprocessor(config)
     for col in text_columns:
         if col in df.columns:
-            df[f"{col}_clean"] = df[col].astype(str).map(lambda x: preprocess_text(x, config))
+            texts = df[col].astype(str)
+            if parallel:
+                df[f"{col}_clean"] = preprocess_series_parallel(texts, config)
+            else:
+                df[f"{col}_clean"] = texts.map(preprocessor)
     return df
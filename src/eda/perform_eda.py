@@ -1,36 +1,246 @@
 # src/eda/perform_eda.py
+import numpy as np
 import pandas as pd
+from collections import Counter
 
-def basic_eda_report(df):
-    report = {}
+# free-text columns: distinct counts only, never value-counted
+TEXT_COLUMNS = ['text', 'text_clean']
 
-    # General shape
-    report['shape'] = df.shape
+# stands in for NaN among tracked values (NaN keys do not compare equal)
+_MISSING = object()
 
-    # Data types
-    report['dtypes'] = df.dtypes.to_dict()
+def basic_eda_report(df, columns=None, text_columns=TEXT_COLUMNS, max_tracked_values=1000):
+    """
+    EDA report of a whole DataFrame: one EDAAccumulator pass, so only what
+    print_eda_report shows is computed (see EDAAccumulator).
+    """
+    return EDAAccumulator(max_tracked_values, columns=columns, text_columns=text_columns).update(df).report()
 
-    # Missing values
-    report['missing_values'] = df.isnull().sum().to_dict()
+# === Approximate statistics ===
+def _bit_length(values):
+    """Bit length of each uint64 (0 for 0), exact via two float64 halves."""
+    high = (values >> np.uint64(32)).astype(np.float64)
+    low = (values & np.uint64(0xFFFFFFFF)).astype(np.float64)
+    return np.where(high > 0, np.frexp(high)[1] + 32, np.frexp(low)[1])
 
-    # Descriptive stats (numerical)
-    report['describe'] = df.describe(include='all').to_dict()
+class HyperLogLog:
+    """
+    Mergeable distinct-count sketch: 2**p one-byte registers, relative
+    error about 1.04 / sqrt(2**p) (0.8% for p=14). Values are hashed with
+    pd.util.hash_array, so sketches from different chunks or processes merge.
+    """
 
-    # Top value counts for each column
-    report['value_counts'] = {}
-    for col in df.columns:
-        if df[col].nunique() < 20:  # Only for columns with reasonable cardinality
-            report['value_counts'][col] = df[col].value_counts().to_dict()
+    def __init__(self, p=14):
+        self.p = p
+        self.registers = np.zeros(1 << p, dtype=np.uint8)
 
-    # Unique values for key columns
-    report['unique_emotions'] = df['emotion'].unique().tolist() if 'emotion' in df.columns else []
-    report['unique_bias'] = df['bias/distortion'].unique().tolist() if 'bias/distortion' in df.columns else []
+    def update(self, values):
+        values = np.asarray(values, dtype=object)
+        if len(values) == 0:
+            return self
+        hashes = pd.util.hash_array(values)
+        buckets = (hashes >> np.uint64(64 - self.p)).astype(np.int64)
+        rest = hashes & np.uint64((1 << (64 - self.p)) - 1)
+        # position of the leftmost 1-bit in the remaining 64 - p bits
+        ranks = (64 - self.p + 1 - _bit_length(rest)).astype(np.uint8)
+        np.maximum.at(self.registers, buckets, ranks)
+        return self
 
-    # Average text length
-    if 'text' in df.columns:
-        report['avg_text_length'] = df['text'].astype(str).apply(len).mean()
+    def merge(self, other):
+        np.maximum(self.registers, other.registers, out=self.registers)
+        return self
 
-    return report
+    def estimate(self):
+        m = len(self.registers)
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / np.ldexp(1.0, -self.registers.astype(np.int64)).sum()
+        zeros = int((self.registers == 0).sum())
+        if estimate <= 2.5 * m and zeros:
+            estimate = m * np.log(m / zeros)  # linear counting for small cardinalities
+        return int(round(estimate))
+
+class RunningMoments:
+    """count / mean / M2 / min / max with Chan et al.'s parallel update."""
+
+    def __init__(self):
+        self.count, self.mean, self.m2 = 0, 0.0, 0.0
+        self.min, self.max = float('inf'), float('-inf')
+
+    def _combine(self, count, mean, m2, lo, hi):
+        total = self.count + count
+        if count == 0:
+            return
+        delta = mean - self.mean
+        self.mean += delta * count / total
+        self.m2 += m2 + delta ** 2 * self.count * count / total
+        self.count = total
+        self.min, self.max = min(self.min, lo), max(self.max, hi)
+
+    def update(self, values):
+        values = np.asarray(values, dtype=np.float64)
+        if len(values):
+            mean = values.mean()
+            self._combine(len(values), float(mean), float(((values - mean) ** 2).sum()),
+                          float(values.min()), float(values.max()))
+        return self
+
+    def merge(self, other):
+        self._combine(other.count, other.mean, other.m2, other.min, other.max)
+        return self
+
+    def describe(self):
+        std = (self.m2 / (self.count - 1)) ** 0.5 if self.count > 1 else float('nan')
+        return {'count': self.count, 'mean': self.mean if self.count else float('nan'),
+                'std': std, 'min': self.min, 'max': self.max}
+
+# === Chunked EDA ===
+class EDAAccumulator:
+    """
+    Mergeable EDA state, fed one chunk at a time; basic_eda_report is one
+    update() over the whole frame. Only what print_eda_report shows is kept,
+    so report() costs the same however many rows went in:
+      - numeric columns: streaming moments (count/mean/std/min/max)
+      - other columns: exact first-seen-ordered value counts until they pass
+        max_tracked_values distinct values, then a HyperLogLog distinct count
+        ('unique' becomes an estimate, 'top'/'freq' are dropped)
+      - text_columns: HyperLogLog from the start, never value-counted
+    With `columns`, every other column is ignored (column pruning).
+    """
+
+    def __init__(self, max_tracked_values=1000, columns=None, text_columns=TEXT_COLUMNS, hll_precision=14):
+        self.max_tracked_values = max_tracked_values
+        self.columns = columns
+        self.text_columns = set(text_columns or [])
+        self.hll_precision = hll_precision
+        self.n_rows = 0
+        self.dtypes = {}
+        self.missing = {}
+        self.numeric = {}
+        self.values = {}
+        self.distinct = {}
+        self.text_length_sum = 0
+        self.text_count = 0
+
+    @classmethod
+    def from_config(cls, config):
+        settings = (config or {}).get('eda') or {}
+        return cls(settings.get('max_tracked_values', 1000), columns=settings.get('columns'),
+                   text_columns=settings.get('text_columns', TEXT_COLUMNS))
+
+    def _overflow(self, col, counts):
+        """Switch a column from exact value counts to a HyperLogLog."""
+        sketch = self.distinct.setdefault(col, HyperLogLog(self.hll_precision))
+        sketch.update([value for value in counts if value is not _MISSING])
+        self.values.pop(col, None)
+
+    def _count_values(self, col, series, present):
+        """Exact first-seen-ordered value counts; NaN keeps its first-seen place as _MISSING."""
+        tracked = self.values.setdefault(col, Counter())
+        # a sample that already has too many distinct values skips the exact pass
+        sample = series.iloc[:4 * self.max_tracked_values]
+        if len(sample) < len(series) and len(pd.unique(sample)) > self.max_tracked_values:
+            self._overflow(col, tracked)
+            self.distinct[col].update(series.to_numpy()[present])
+            return
+        codes, uniques = pd.factorize(series)
+        if len(uniques) > self.max_tracked_values:
+            self._overflow(col, tracked)
+            self.distinct[col].update(uniques)
+            return
+        counts = np.bincount(codes[codes >= 0], minlength=len(uniques)).tolist()
+        missing = np.flatnonzero(codes < 0)
+        # distinct values seen before the first NaN
+        before = int(codes[:missing[0]].max()) + 1 if len(missing) and missing[0] else 0
+        for i, (value, n) in enumerate(zip(uniques, counts)):
+            if i == before and len(missing):
+                tracked[_MISSING] += len(missing)
+            tracked[value] += n
+        if len(missing) and before == len(uniques):
+            tracked[_MISSING] += len(missing)
+        if len(tracked) > self.max_tracked_values:
+            self._overflow(col, tracked)
+
+    def update(self, df):
+        self.n_rows += len(df)
+        columns = df.columns if self.columns is None else [c for c in self.columns if c in df.columns]
+        for col in columns:
+            series = df[col]
+            present = series.notna().to_numpy()
+            self.dtypes.setdefault(col, series.dtype)
+            self.missing[col] = self.missing.get(col, 0) + len(series) - int(present.sum())
+            if pd.api.types.is_numeric_dtype(series) and not pd.api.types.is_bool_dtype(series):
+                self.numeric.setdefault(col, RunningMoments()).update(series.to_numpy()[present])
+            elif col in self.distinct or col in self.text_columns:
+                self.distinct.setdefault(col, HyperLogLog(self.hll_precision)).update(series.to_numpy()[present])
+            else:
+                self._count_values(col, series, present)
+        if 'text' in df.columns:
+            self.text_length_sum += int(df['text'].astype(str).str.len().sum())
+            self.text_count += len(df)
+        return self
+
+    def merge(self, other):
+        self.n_rows += other.n_rows
+        for col, dtype in other.dtypes.items():
+            self.dtypes.setdefault(col, dtype)
+        for col, n in other.missing.items():
+            self.missing[col] = self.missing.get(col, 0) + n
+        for col, moments in other.numeric.items():
+            self.numeric.setdefault(col, RunningMoments()).merge(moments)
+        for col, sketch in other.distinct.items():
+            if col in self.values:
+                self._overflow(col, self.values[col])
+            self.distinct.setdefault(col, HyperLogLog(self.hll_precision)).merge(sketch)
+        for col, counts in other.values.items():
+            if col in self.distinct:
+                self.distinct[col].update([value for value in counts if value is not _MISSING])
+                continue
+            tracked = self.values.setdefault(col, Counter())
+            tracked.update(counts)
+            if len(tracked) > self.max_tracked_values:
+                self._overflow(col, tracked)
+        self.text_length_sum += other.text_length_sum
+        self.text_count += other.text_count
+        return self
+
+    def _present(self, col):
+        """Tracked values of a column without the missing marker."""
+        return Counter({value: n for value, n in self.values.get(col, {}).items() if value is not _MISSING})
+
+    def report(self):
+        """Same keys as the pandas-based report; see the class docstring for what is approximate."""
+        describe = {}
+        for col in self.dtypes:
+            count = self.n_rows - self.missing[col]
+            if col in self.numeric:
+                describe[col] = self.numeric[col].describe()
+            elif col in self.distinct:
+                describe[col] = {'count': count, 'unique': self.distinct[col].estimate()}
+            else:
+                present = self._present(col)
+                describe[col] = {'count': count, 'unique': len(present)}
+                if present:
+                    describe[col]['top'], describe[col]['freq'] = present.most_common(1)[0]
+
+        def unique_values(col):
+            return [np.nan if value is _MISSING else value for value in self.values.get(col, {})]
+
+        value_counts = {}
+        for col in self.values:
+            present = self._present(col)
+            if len(present) < 20:
+                value_counts[col] = dict(present.most_common())
+
+        return {
+            'shape': (self.n_rows, len(self.dtypes)),
+            'dtypes': dict(self.dtypes),
+            'missing_values': dict(self.missing),
+            'describe': describe,
+            'value_counts': value_counts,
+            'unique_emotions': unique_values('emotion'),
+            'unique_bias': unique_values('bias/distortion'),
+            'avg_text_length': self.text_length_sum / self.text_count if self.text_count else float('nan'),
+        }
 
 def print_eda_report(report):
     print(f"Dataset shape: {report['shape']}")
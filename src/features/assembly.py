@@ -0,0 +1,51 @@
+# src/features/assembly.py
+import numpy as np
+import pandas as pd
+
+# === Column blocks ===
+# Feature stages return their columns as one compact block (a DataFrame
+# holding only the stage's outputs, same-dtype columns stored together)
+# instead of inserting them into the shared frame one at a time. The
+# feature frame is then assembled once from the input frame and the blocks,
+# without copying either.
+
+
+def column_block(columns, index):
+    """Block from {name: 1-D array}; same-dtype columns are consolidated into one 2-D array."""
+    return pd.DataFrame(columns, index=index)
+
+
+def matrix_block(values, columns, index):
+    """Block over a 2-D array (e.g. entries x traits scores) without copying it."""
+    return pd.DataFrame(values, index=index, columns=columns, copy=False)
+
+
+def object_column(values):
+    """1-D object array of arbitrary cells (lists stay lists instead of becoming a 2-D array)."""
+    column = np.empty(len(values), dtype=object)
+    column[:] = values
+    return column
+
+
+def assign_block(df, block):
+    """Add a block's columns to df in place (the frame-mutating feature functions)."""
+    for col in block.columns:
+        df[col] = block[col]
+    return df
+
+
+def assemble_frame(base, blocks):
+    """
+    base's columns followed by the blocks' columns, in one concat without
+    copying. A block column that already exists in base replaces it in place.
+    """
+    blocks = [block for block in blocks if len(block.columns)]
+    replaced = {col: block[col] for block in blocks for col in block.columns if col in base.columns}
+    if replaced:
+        # shallow copy: only the replaced columns change, df itself is untouched
+        base = base.copy(deep=False)
+        for col, values in replaced.items():
+            base[col] = values
+        blocks = [block[[c for c in block.columns if c not in replaced]] if block.columns.isin(list(replaced)).any()
+                  else block for block in blocks]
+    return pd.concat([base] + blocks, axis=1, copy=False)
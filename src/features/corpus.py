@@ -0,0 +1,137 @@
+# src/features/corpus.py
+import re
+import numpy as np
+import pandas as pd
+from scipy import sparse
+
+# sklearn's default token_pattern for CountVectorizer/TfidfVectorizer
+ANALYZER_TOKEN = re.compile(r"(?u)\b\w\w+\b")
+
+
+class TokenizedCorpus:
+    """
+    Whitespace-tokenized corpus built once per run and shared by every
+    text-based feature: token ids (one flat array, split by `offsets`), the
+    vocabulary, and a documents x vocabulary count matrix.
+
+    Views:
+      - counts: the whitespace-token count matrix (what text.split() sees)
+      - analyzer_counts(): counts under sklearn's default analyzer
+        (lower-cased \\b\\w\\w+\\b tokens), derived per vocabulary entry,
+        so TF-IDF consumers never re-tokenize the documents
+      - ngram_starts(): positions of within-document word n-grams
+    """
+
+    def __init__(self, token_ids, offsets, vocabulary, analyzer_map=None):
+        self.token_ids = token_ids
+        self.offsets = offsets
+        self.vocabulary = vocabulary
+        self._analyzer_map = analyzer_map
+        self._counts = None
+        self._analyzer_counts = None
+
+    @classmethod
+    def from_texts(cls, texts):
+        docs = [str(text).split() for text in texts]
+        lengths = np.fromiter((len(d) for d in docs), dtype=np.int64, count=len(docs))
+        offsets = np.zeros(len(docs) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        flat = np.empty(int(offsets[-1]), dtype=object)
+        flat[:] = [token for doc in docs for token in doc]
+        token_ids, vocabulary = pd.factorize(flat)
+        return cls(token_ids.astype(np.int32), offsets, np.asarray(vocabulary, dtype=object))
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def doc_lengths(self):
+        return np.diff(self.offsets)
+
+    def doc_ids(self):
+        """Document index of every token."""
+        return np.repeat(np.arange(len(self)), self.doc_lengths)
+
+    def take(self, positions):
+        """Sub-corpus of the documents at `positions` (same vocabulary)."""
+        positions = np.asarray(positions, dtype=np.int64)
+        lengths = self.doc_lengths[positions]
+        offsets = np.zeros(len(positions) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        starts = np.repeat(self.offsets[:-1][positions] - offsets[:-1], lengths)
+        token_ids = self.token_ids[starts + np.arange(offsets[-1])]
+        return TokenizedCorpus(token_ids, offsets, self.vocabulary, self._analyzer_map)
+
+    # === Count matrices ===
+    @property
+    def counts(self):
+        """CSR documents x vocabulary whitespace-token counts."""
+        if self._counts is None:
+            data = np.ones(len(self.token_ids), dtype=np.int64)
+            # copies: sum_duplicates() sorts the index array in place
+            matrix = sparse.csr_matrix((data, self.token_ids.copy(), self.offsets.copy()), shape=(len(self), len(self.vocabulary)))
+            matrix.sum_duplicates()
+            self._counts = matrix
+        return self._counts
+
+    def analyzer_map(self):
+        """
+        (V x T matrix, analyzer terms): how many times each analyzer term
+        occurs inside each whitespace token. Terms are sorted like sklearn's.
+        """
+        if self._analyzer_map is None:
+            pieces = [ANALYZER_TOKEN.findall(token.lower()) for token in self.vocabulary]
+            terms = np.array(sorted({t for p in pieces for t in p}), dtype=object)
+            term_ids = {t: i for i, t in enumerate(terms)}
+            rows = np.repeat(np.arange(len(pieces)), [len(p) for p in pieces])
+            cols = np.fromiter((term_ids[t] for p in pieces for t in p), dtype=np.int64, count=len(rows))
+            mapping = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(pieces), len(terms)))
+            self._analyzer_map = (mapping, terms)
+        return self._analyzer_map
+
+    def analyzer_counts(self):
+        """(documents x terms float64 counts, terms) as CountVectorizer would count them."""
+        if self._analyzer_counts is None:
+            mapping, terms = self.analyzer_map()
+            self._analyzer_counts = ((self.counts @ mapping).tocsr(), terms)
+        return self._analyzer_counts
+
+    def term_counts(self, terms):
+        """Analyzer counts for a fixed vocabulary (like CountVectorizer(vocabulary=terms))."""
+        counts, known = self.analyzer_counts()
+        index = {t: i for i, t in enumerate(known)}
+        rows = [index[t] for t in terms if t in index]
+        cols = [j for j, t in enumerate(terms) if t in index]
+        select = sparse.csr_matrix((np.ones(len(rows)), (rows, cols)), shape=(len(known), len(terms)))
+        return (counts @ select).tocsr()
+
+    def vocabulary_counts(self, max_features=None, stop_words=None):
+        """
+        Learned-vocabulary counts with CountVectorizer's rules (stop words
+        dropped, unseen terms dropped, max_features most frequent kept, ties
+        broken the same way). Returns (counts, terms).
+        """
+        counts, terms = self.analyzer_counts()
+        tfs = np.asarray(counts.sum(axis=0)).ravel()
+        keep = tfs > 0
+        if stop_words is not None:
+            from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS
+            stop = ENGLISH_STOP_WORDS if stop_words == 'english' else frozenset(stop_words)
+            keep &= ~np.isin(terms, list(stop))
+        kept = np.flatnonzero(keep)
+        if max_features is not None and len(kept) > max_features:
+            kept = np.sort(kept[(-tfs[kept]).argsort()[:max_features]])
+        return counts[:, kept], terms[kept]
+
+    # === Word n-grams ===
+    def ngram_starts(self, n):
+        """Token positions where an n-gram that stays inside one document starts."""
+        if len(self.token_ids) < n:
+            return np.zeros(0, dtype=np.int64)
+        doc = self.doc_ids()
+        return np.flatnonzero(doc[: len(doc) - n + 1] == doc[n - 1:])
+
+
+def build_corpus(texts):
+    """Tokenize texts once into a TokenizedCorpus."""
+    return TokenizedCorpus.from_texts(texts)
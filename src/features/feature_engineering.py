@@ -1,19 +1,51 @@
+import numpy as np
 import pandas as pd
-from textblob import TextBlob
 import re
-from sklearn.feature_extraction.text import TfidfVectorizer
+import sys
+from scipy import sparse
+from functools import partial
+from src.features import lexicon_matcher
+from src.features.lexicon_matcher import match_lexicons, TOKEN
+from src.features import sentiment
+from src.features.sentiment import batch_sentiment
+from src.features import corpus as corpus_module
+from src.features.corpus import TokenizedCorpus, build_corpus
+from src.features.assembly import column_block, assign_block
 
 # === 1. Text length features ===
-def compute_length_features(df, text_col='text_clean'):
+def compute_length_features(df, text_col='text_clean', corpus=None):
     df['text_length'] = df[text_col].apply(len)
-    df['word_count'] = df[text_col].apply(lambda x: len(x.split()))
+    if corpus is not None:
+        df['word_count'] = corpus.doc_lengths
+    else:
+        df['word_count'] = df[text_col].apply(lambda x: len(x.split()))
     return df
 
 # === 2. Sentiment features ===
-def compute_sentiment(df, text_col='text_clean'):
-    df['polarity'] = df[text_col].apply(lambda x: TextBlob(x).sentiment.polarity)
-    df['subjectivity'] = df[text_col].apply(lambda x: TextBlob(x).sentiment.subjectivity)
-    df['TextBlob_Analysis'] = df['polarity'].apply(lambda x: 'Positive' if x > 0 else ('Negative' if x < 0 else 'Neutral'))
+# 'batch' scores the whole column at once with the same lexicon and rules as
+# TextBlob (see src/features/sentiment.py); 'textblob' runs TextBlob per row.
+SENTIMENT_ENGINES = ('batch', 'textblob')
+
+SENTIMENT_LABELS = pd.CategoricalDtype(['Negative', 'Neutral', 'Positive'])
+
+def sentiment_scores(texts, engine='textblob', corpus=None):
+    """(polarity, subjectivity) arrays of a text column with the given engine."""
+    if engine == 'batch':
+        return batch_sentiment(texts, corpus=corpus)
+    if engine == 'textblob':
+        from textblob import TextBlob
+        return (texts.apply(lambda x: TextBlob(x).sentiment.polarity).to_numpy(),
+                texts.apply(lambda x: TextBlob(x).sentiment.subjectivity).to_numpy())
+    raise ValueError(f"Unknown sentiment engine '{engine}', expected one of {SENTIMENT_ENGINES}")
+
+def sentiment_labels(polarity):
+    """Positive / Negative / Neutral (also for NaN) per polarity, as a categorical."""
+    codes = (polarity > 0).astype(np.int8) - (polarity < 0) + 1
+    return pd.Categorical.from_codes(codes, dtype=SENTIMENT_LABELS)
+
+def compute_sentiment(df, text_col='text_clean', engine='textblob', corpus=None):
+    df['polarity'], df['subjectivity'] = sentiment_scores(df[text_col], engine, corpus)
+    df['TextBlob_Analysis'] = sentiment_labels(df['polarity'].to_numpy())
     return df
 
 # === 3. Cognitive distortion keywords ===
@@ -25,8 +57,9 @@ def count_cog_distortions(text):
     tokens = text.lower().split()
     return sum(1 for word in tokens if word in COG_DISTORTION_KEYWORDS)
 
-def compute_cognitive_distortion_score(df, text_col='text_clean'):
-    df['cogdist_keyword_count'] = df[text_col].apply(count_cog_distortions)
+def compute_cognitive_distortion_score(df, text_col='text_clean', matches=None):
+    matches = matches if matches is not None else match_lexicons(df[text_col])
+    df['cogdist_keyword_count'] = matches.lexicon_counts('cog_distortion', TOKEN)
     return df
 
 # === 4. Negative emotion keywords ===
@@ -38,8 +71,9 @@ def count_negative_emotions(text):
     tokens = text.lower().split()
     return sum(1 for word in tokens if word in NEG_EMOTION_WORDS)
 
-def compute_emotion_marker_score(df, text_col='text_clean'):
-    df['neg_emotion_word_count'] = df[text_col].apply(count_negative_emotions)
+def compute_emotion_marker_score(df, text_col='text_clean', matches=None):
+    matches = matches if matches is not None else match_lexicons(df[text_col])
+    df['neg_emotion_word_count'] = matches.lexicon_counts('neg_emotion', TOKEN)
     return df
 
 # === 5. TF-IDF features for key psychological terms ===
@@ -48,17 +82,109 @@ TFIDF_TERMS = [
     'think', 'work', 'career', 'need', 'should'
 ]
 
-def compute_selected_tfidf_features(df, text_col='text_clean', max_features=100):
-    tfidf = TfidfVectorizer(vocabulary=TFIDF_TERMS)
-    tfidf_matrix = tfidf.fit_transform(df[text_col])
-    tfidf_df = pd.DataFrame(tfidf_matrix.toarray(), columns=[f'tfidf_{w}' for w in tfidf.get_feature_names_out()])
-    return pd.concat([df.reset_index(drop=True), tfidf_df.reset_index(drop=True)], axis=1)
+TFIDF_PREFIX = 'tfidf_'
+
+class TfidfFeatures:
+    """
+    TF-IDF over the fixed TFIDF_TERMS vocabulary, fitted once and applied to
+    any number of later batches with the same IDF weights. Accepts texts or a
+    TokenizedCorpus; the block is returned as sparse columns aligned to the
+    caller's index.
+    """
+
+    def __init__(self, vocabulary=TFIDF_TERMS):
+        self.vocabulary = list(vocabulary)
+        from sklearn.feature_extraction.text import TfidfTransformer
+        self.transformer = TfidfTransformer()
+        self.fitted = False
+
+    @property
+    def columns(self):
+        return [f'{TFIDF_PREFIX}{w}' for w in self.vocabulary]
+
+    def _counts(self, texts):
+        corpus = texts if isinstance(texts, TokenizedCorpus) else build_corpus(texts)
+        return corpus.term_counts(self.vocabulary)
+
+    def _frame(self, matrix, index):
+        return pd.DataFrame.sparse.from_spmatrix(matrix, index=index, columns=self.columns)
+
+    def fit(self, texts):
+        self.transformer.fit(self._counts(texts))
+        self.fitted = True
+        return self
+
+    def transform(self, texts, index=None):
+        return self._frame(self.transformer.transform(self._counts(texts)), index)
+
+    def fit_transform(self, texts, index=None):
+        counts = self._counts(texts)
+        self.transformer.fit(counts)
+        self.fitted = True
+        return self._frame(self.transformer.transform(counts), index)
+
+def tfidf_block(df, text_col='text_clean', tfidf=None, corpus=None):
+    """Sparse TF-IDF columns of df as one block (IDF fitted here unless `tfidf` is already fitted)."""
+    tfidf = tfidf if tfidf is not None else TfidfFeatures()
+    source = corpus if corpus is not None else df[text_col]
+    if tfidf.fitted:
+        return tfidf.transform(source, index=df.index)
+    return tfidf.fit_transform(source, index=df.index)
+
+def compute_selected_tfidf_features(df, text_col='text_clean', max_features=100, tfidf=None, corpus=None):
+    # Sparse columns are added in place; the rest of the frame is not copied
+    return assign_block(df, tfidf_block(df, text_col, tfidf=tfidf, corpus=corpus))
+
+def tfidf_matrix(df, prefix=TFIDF_PREFIX):
+    """CSR matrix of the TF-IDF block of a feature frame (no densifying)."""
+    cols = [c for c in df.columns if c.startswith(prefix)]
+    block = df[cols]
+    if all(isinstance(dtype, pd.SparseDtype) for dtype in block.dtypes):
+        return block.sparse.to_coo().tocsr()
+    return sparse.csr_matrix(block.to_numpy())
 
 # === Main feature pipeline ===
-def feature_engineering_pipeline(df, config=None):
-    df = compute_length_features(df)
-    df = compute_sentiment(df)
-    df = compute_cognitive_distortion_score(df)
-    df = compute_emotion_marker_score(df)
-    df = compute_selected_tfidf_features(df)
+# Per-entry features depend only on the entry's own text and can be cached;
+# TF-IDF depends on the whole corpus through its IDF weights.
+ENTRY_FEATURE_COLUMNS = [
+    'text_length', 'word_count', 'polarity', 'subjectivity', 'TextBlob_Analysis',
+    'cogdist_keyword_count', 'neg_emotion_word_count'
+]
+
+def entry_feature_block(df, text_col='text_clean', matches=None, corpus=None, sentiment_engine='textblob'):
+    """ENTRY_FEATURE_COLUMNS of df as one column block (see src/features/assembly.py)."""
+    texts = df[text_col]
+    matches = matches if matches is not None else match_lexicons(texts)
+    corpus = corpus if corpus is not None else build_corpus(texts)
+    polarity, subjectivity = sentiment_scores(texts, sentiment_engine, corpus)
+    return column_block({
+        'text_length': texts.str.len().to_numpy(),
+        'word_count': corpus.doc_lengths,
+        'polarity': polarity,
+        'subjectivity': subjectivity,
+        'TextBlob_Analysis': sentiment_labels(polarity),
+        'cogdist_keyword_count': matches.lexicon_counts('cog_distortion', TOKEN),
+        'neg_emotion_word_count': matches.lexicon_counts('neg_emotion', TOKEN),
+    }, df.index)
+
+def compute_entry_features(df, text_col='text_clean', matches=None, corpus=None, sentiment_engine='textblob'):
+    return assign_block(df, entry_feature_block(df, text_col, matches, corpus, sentiment_engine))
+
+def cached_entry_features(df, config=None, cache=None, matches=None, corpus=None, block=False):
+    """
+    ENTRY_FEATURE_COLUMNS of df, through the feature cache when one is
+    given: added to df, or returned as a column block with block=True.
+    """
+    engine = ((config or {}).get('features') or {}).get('sentiment_engine', 'textblob')
+    entry_features = partial(entry_feature_block if block else compute_entry_features, sentiment_engine=engine)
+    if cache is not None:
+        return cache.run_stage(df, 'entry_features', entry_features, ENTRY_FEATURE_COLUMNS,
+                               modules=[sys.modules[__name__], lexicon_matcher, sentiment, corpus_module],
+                               key_cols=['text_clean'], row_kwargs={'matches': matches, 'corpus': corpus}, block=block)
+    return entry_features(df, matches=matches, corpus=corpus)
+
+def feature_engineering_pipeline(df, config=None, cache=None, matches=None, tfidf=None, corpus=None):
+    corpus = corpus if corpus is not None else build_corpus(df['text_clean'])
+    df = cached_entry_features(df, config, cache=cache, matches=matches, corpus=corpus)
+    df = compute_selected_tfidf_features(df, tfidf=tfidf, corpus=corpus)
     return df
@@ -0,0 +1,205 @@
+# src/features/lexicon_matcher.py
+from collections import deque
+from functools import lru_cache
+import numpy as np
+from scipy import sparse
+
+# Match modes
+SUBSTRING = 'substring'  # any occurrence, like `kw in text`
+TOKEN = 'token'          # whitespace-delimited, like `kw in text.split()`
+WORD = 'word'            # regex \b...\b delimited
+
+
+def _is_word_char(ch):
+    # Same definition as the re module's \w for str patterns
+    return ch.isalnum() or ch == '_'
+
+
+class LexiconMatcher:
+    """
+    Aho-Corasick automaton over the terms of several named lexicons.
+    One scan of a document yields every occurrence of every term (phrases
+    included), from which substring, whitespace-token and \\b-word counts are
+    derived. Lexicons are lower-cased matches by default; case-sensitive
+    lexicons are matched against the original text.
+    """
+
+    def __init__(self, lexicons, case_sensitive=()):
+        self.lexicons = {name: list(dict.fromkeys(terms)) for name, terms in lexicons.items()}
+        self.case_sensitive = set(case_sensitive)
+
+        # One column per (term, case_sensitive) pair; one automaton pattern per distinct term
+        self.columns = []
+        self._column_ids = {}
+        self.lexicon_columns = {}
+        for name, terms in self.lexicons.items():
+            cs = name in self.case_sensitive
+            cols = []
+            for term in terms:
+                key = (term, cs)
+                if key not in self._column_ids:
+                    self._column_ids[key] = len(self.columns)
+                    self.columns.append(key)
+                cols.append(self._column_ids[key])
+            self.lexicon_columns[name] = np.array(cols, dtype=np.int64)
+
+        self.patterns = list(dict.fromkeys(term for term, _ in self.columns))
+        pattern_ids = {p: i for i, p in enumerate(self.patterns)}
+        self._pattern_len = [len(p) for p in self.patterns]
+        # pattern id -> columns fed from a lower-cased scan / from an original-case scan
+        self._lower_cols = [[] for _ in self.patterns]
+        self._cased_cols = [[] for _ in self.patterns]
+        for col, (term, cs) in enumerate(self.columns):
+            (self._cased_cols if cs else self._lower_cols)[pattern_ids[term]].append(col)
+        self._has_cased = bool(self.case_sensitive)
+        self._build(pattern_ids)
+
+    def _build(self, pattern_ids):
+        goto, fail, out = [{}], [0], [[]]
+        for pattern, pid in pattern_ids.items():
+            state = 0
+            for ch in pattern:
+                if ch not in goto[state]:
+                    goto.append({})
+                    fail.append(0)
+                    out.append([])
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            out[state].append(pid)
+
+        # Fold the failure links into a full transition table so the scan
+        # never has to follow them: delta[s].get(ch, 0) is the next state.
+        delta = [dict(goto[0])] + [None] * (len(goto) - 1)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            out[state] = out[state] + out[fail[state]]
+            delta[state] = dict(delta[fail[state]])
+            for ch, nxt in goto[state].items():
+                fail[nxt] = delta[fail[state]].get(ch, 0) if state else 0
+                delta[state][ch] = nxt
+                queue.append(nxt)
+        self._delta = delta
+        self._out = [tuple(o) for o in out]
+
+    def find(self, text):
+        """Yield (start, pattern) for every (possibly overlapping) occurrence."""
+        for end, pid in self._scan(text):
+            yield end - self._pattern_len[pid] + 1, self.patterns[pid]
+
+    def _scan(self, text):
+        delta, out = self._delta, self._out
+        hits = []
+        state = 0
+        for i, ch in enumerate(text):
+            state = delta[state].get(ch, 0)
+            if out[state]:
+                hits.extend((i, pid) for pid in out[state])
+        return hits
+
+    def _count(self, text, hits, column_lists, counts):
+        n = len(text)
+        for end, pid in hits:
+            cols = column_lists[pid]
+            if not cols:
+                continue
+            start = end - self._pattern_len[pid] + 1
+            before = text[start - 1] if start else ' '
+            after = text[end + 1] if end + 1 < n else ' '
+            token = before.isspace() and after.isspace()
+            word = not _is_word_char(before) and not _is_word_char(after)
+            for col in cols:
+                c = counts.setdefault(col, [0, 0, 0])
+                c[0] += 1
+                c[1] += token
+                c[2] += word
+
+    def match(self, text):
+        """{column: [substring, token, word] counts} for one document."""
+        counts = {}
+        lowered = text.lower()
+        hits = self._scan(lowered)
+        self._count(lowered, hits, self._lower_cols, counts)
+        if self._has_cased:
+            if lowered != text:
+                hits = self._scan(text)
+            self._count(text, hits, self._cased_cols, counts)
+        return counts
+
+    def match_many(self, texts):
+        """Scan every document once and return a LexiconMatches."""
+        rows, cols, data = [], [], []
+        n_docs = 0
+        for row, text in enumerate(texts):
+            n_docs += 1
+            for col, c in self.match(text).items():
+                rows.append(row)
+                cols.append(col)
+                data.append(c)
+        data = np.array(data, dtype=np.int32).reshape(-1, 3)
+        shape = (n_docs, len(self.columns))
+        matrices = {
+            mode: sparse.csr_matrix((data[:, i], (rows, cols)), shape=shape)
+            for i, mode in enumerate((SUBSTRING, TOKEN, WORD))
+        }
+        return LexiconMatches(self, matrices)
+
+
+class LexiconMatches:
+    """Per-document term counts for all lexicons of a matcher (documents x terms, per mode)."""
+
+    def __init__(self, matcher, matrices):
+        self.matcher = matcher
+        self.matrices = matrices
+
+    def __len__(self):
+        return self.matrices[SUBSTRING].shape[0]
+
+    def take(self, positions):
+        """Matches for a subset of documents, by position."""
+        return LexiconMatches(self.matcher, {mode: m[positions] for mode, m in self.matrices.items()})
+
+    def term_matrix(self, lexicon, mode=TOKEN):
+        """Sparse documents x terms count matrix, columns in lexicon order."""
+        return self.matrices[mode][:, self.matcher.lexicon_columns[lexicon]]
+
+    def lexicon_counts(self, lexicon, mode=TOKEN):
+        """Total occurrences of the lexicon's terms in each document."""
+        return np.asarray(self.term_matrix(lexicon, mode).sum(axis=1)).ravel().astype(np.int64)
+
+    def contains_any(self, lexicon, mode=SUBSTRING):
+        """Whether each document contains at least one of the lexicon's terms."""
+        return self.lexicon_counts(lexicon, mode) > 0
+
+    def term_totals(self, lexicon, mode=TOKEN):
+        """{term: occurrences across all documents}"""
+        totals = np.asarray(self.term_matrix(lexicon, mode).sum(axis=0)).ravel()
+        return dict(zip(self.matcher.lexicons[lexicon], totals.astype(np.int64).tolist()))
+
+    def document_frequencies(self, lexicon, mode=SUBSTRING):
+        """{term: number of documents containing it}"""
+        df = np.asarray((self.term_matrix(lexicon, mode) > 0).sum(axis=0)).ravel()
+        return dict(zip(self.matcher.lexicons[lexicon], df.astype(np.int64).tolist()))
+
+
+@lru_cache(maxsize=1)
+def journal_matcher():
+    """The shared matcher over every keyword lexicon used by the pipeline."""
+    from src.features.feature_engineering import COG_DISTORTION_KEYWORDS, NEG_EMOTION_WORDS
+    from src.features.pattern_detection import TRIGGER_TERMS
+    from src.insights.psychological_inference import CBT_DISTORTION_KEYWORDS, INSIGHT_TRIGGER_TERMS
+
+    lexicons = {
+        'cog_distortion': COG_DISTORTION_KEYWORDS,
+        'neg_emotion': NEG_EMOTION_WORDS,
+        'pattern_trigger': TRIGGER_TERMS,
+        'insight_trigger': INSIGHT_TRIGGER_TERMS,
+    }
+    lexicons.update({f'cbt:{dist}': words for dist, words in CBT_DISTORTION_KEYWORDS.items()})
+    # str.contains / regex based reports have always been case-sensitive
+    return LexiconMatcher(lexicons, case_sensitive=['pattern_trigger', 'insight_trigger'])
+
+
+def match_lexicons(texts):
+    """One Aho-Corasick pass over texts for all pipeline lexicons."""
+    return journal_matcher().match_many(texts)
@@ -1,25 +1,214 @@
-from transformers import pipeline
-import pandas as pd
+import hashlib
+import numpy as np
+import torch
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
 
-def load_emotion_model():
+EMOTION_MODEL = "j-hartmann/emotion-english-distilroberta-base"
+# Placeholder: replace with a custom or fine-tuned model for distortions if available
+DISTORTION_MODEL = "j-hartmann/cognitive-distortions-bert"
+
+# Defaults for the `nlp_models` section of config.yaml
+DEFAULT_ENGINE_SETTINGS = {
+    'device': 'auto',           # auto | cpu | cuda | cuda:N | mps
+    'quantize': False,          # int8 dynamic quantization of Linear layers (CPU only)
+    'max_batch_tokens': 8192,   # padded tokens per forward pass
+    'max_batch_size': 64,
+    'max_length': 512,
+}
+
+# === 1. Model registry ===
+# Models are loaded once per process and shared by every caller asking for the
+# same (model, device, quantize) combination.
+_MODEL_REGISTRY = {}
+_TOKENIZER_REGISTRY = {}
+
+
+class TextClassifier:
+    """A loaded sequence-classification model plus the tokenizer it expects."""
+
+    def __init__(self, model_name, model, tokenizer, tokenizer_key, device):
+        self.model_name = model_name
+        self.model = model
+        self.tokenizer = tokenizer
+        self.tokenizer_key = tokenizer_key
+        self.device = device
+        self.id2label = model.config.id2label
+
+    def logits(self, batch):
+        with torch.inference_mode():
+            return self.model(**batch).logits
+
+    def predict(self, batch):
+        return [self.id2label[i] for i in self.logits(batch).argmax(dim=-1).tolist()]
+
+
+def resolve_device(device='auto'):
+    if device and device != 'auto':
+        return torch.device(device)
+    if torch.cuda.is_available():
+        return torch.device('cuda')
+    if getattr(torch.backends, 'mps', None) is not None and torch.backends.mps.is_available():
+        return torch.device('mps')
+    return torch.device('cpu')
+
+
+# init_kwargs that only say where the files came from
+_TOKENIZER_SOURCE_KWARGS = ('name_or_path', '_commit_hash', 'auto_map')
+
+
+def tokenizer_fingerprint(tokenizer):
+    """
+    Hash of everything that decides how a tokenizer encodes and pads text:
+    the vocabulary, normalisation (e.g. do_lower_case, strip_accents),
+    pre-tokenization, special tokens and padding side.
+    """
+    backend = getattr(tokenizer, 'backend_tokenizer', None)
+    # tokenizer.json of a fast tokenizer holds vocab, normalizer, pre-tokenizer and post-processor
+    pipeline = backend.to_str() if backend is not None else repr(sorted(tokenizer.get_vocab().items()))
+    settings = sorted(
+        (k, repr(v)) for k, v in tokenizer.init_kwargs.items()
+        if k not in _TOKENIZER_SOURCE_KWARGS and not k.endswith('_file')
+    )
+    specials = sorted((k, repr(v)) for k, v in tokenizer.special_tokens_map.items())
+    layout = (tokenizer.padding_side, tokenizer.truncation_side, tuple(tokenizer.model_input_names))
+    payload = f"{type(tokenizer).__name__}:{pipeline}:{settings}:{specials}:{layout}"
+    return hashlib.sha1(payload.encode()).hexdigest()
+
+
+def load_tokenizer(model_name):
+    """
+    Tokenizers are registered by fingerprint (see tokenizer_fingerprint), so
+    models that ship the same tokenizer under different names end up sharing
+    one instance, while same-vocabulary tokenizers with different settings don't.
+    """
+    if model_name not in _TOKENIZER_REGISTRY:
+        tokenizer = AutoTokenizer.from_pretrained(model_name)
+        key = tokenizer_fingerprint(tokenizer)
+        for other, known_key in _TOKENIZER_REGISTRY.values():
+            if known_key == key:
+                tokenizer = other
+                break
+        _TOKENIZER_REGISTRY[model_name] = (tokenizer, key)
+    return _TOKENIZER_REGISTRY[model_name]
+
+
+def get_classifier(model_name, device='auto', quantize=False):
+    """Load (or reuse) a classifier from the process-wide registry."""
+    device = resolve_device(device)
+    quantize = bool(quantize) and device.type == 'cpu'
+    key = (model_name, str(device), quantize)
+    if key not in _MODEL_REGISTRY:
+        print(f"Loading model {model_name} on {device}{' (int8)' if quantize else ''}...")
+        tokenizer, tokenizer_key = load_tokenizer(model_name)
+        model = AutoModelForSequenceClassification.from_pretrained(model_name)
+        model.eval()
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        model.to(device)
+        _MODEL_REGISTRY[key] = TextClassifier(model_name, model, tokenizer, tokenizer_key, device)
+    return _MODEL_REGISTRY[key]
+
+
+def clear_model_registry():
+    _MODEL_REGISTRY.clear()
+    _TOKENIZER_REGISTRY.clear()
+
+
+def load_emotion_model(device='auto', quantize=False):
     # Using a widely used emotion classifier
-    return pipeline("text-classification", model="j-hartmann/emotion-english-distilroberta-base", return_all_scores=False)
+    return get_classifier(EMOTION_MODEL, device=device, quantize=quantize)
 
-def load_distortion_model():
-    # Placeholder: replace with a custom or fine-tuned model for distortions if available
+
+def load_distortion_model(device='auto', quantize=False):
     # For now, can use same model or a multi-label model trained on distortions
-    return pipeline("text-classification", model="j-hartmann/cognitive-distortions-bert", return_all_scores=False)
+    return get_classifier(DISTORTION_MODEL, device=device, quantize=quantize)
 
-def add_nlp_emotion_column(df, text_col='text_clean', out_col='nlp_emotion'):
-    print("Loading emotion classification model...")
-    model = load_emotion_model()
-    print("Classifying emotion for each entry (may take several minutes)...")
-    df[out_col] = df[text_col].apply(lambda x: model(x)[0]['label'] if x.strip() else "neutral")
-    return df
+# === 2. Dynamic batching ===
+def plan_batches(lengths, max_batch_tokens=8192, max_batch_size=64):
+    """
+    Sort sequences by length and cut the order into batches whose padded size
+    (rows x longest row) stays within max_batch_tokens.
+    Returns a list of index arrays into `lengths`.
+    """
+    lengths = np.asarray(lengths, dtype=np.int64)
+    order = np.argsort(lengths, kind='stable')
+    batches, current, longest = [], [], 0
+    for idx in order:
+        longest_if_added = max(longest, lengths[idx])
+        if current and (len(current) >= max_batch_size or longest_if_added * (len(current) + 1) > max_batch_tokens):
+            batches.append(np.array(current))
+            current, longest_if_added = [], lengths[idx]
+        current.append(idx)
+        longest = longest_if_added
+    if current:
+        batches.append(np.array(current))
+    return batches
+
+# === 3. Batched inference ===
+def classify_texts(texts, classifiers, max_batch_tokens=8192, max_batch_size=64, max_length=512):
+    """
+    Run several classifiers over the same texts.
+    Classifiers sharing a tokenizer are served from a single tokenization pass
+    and the same padded batches. Returns {model_name: [label, ...]}.
+    """
+    texts = list(texts)
+    results = {clf.model_name: [None] * len(texts) for clf in classifiers}
+    groups = {}
+    for clf in classifiers:
+        groups.setdefault(clf.tokenizer_key, []).append(clf)
+
+    for heads in groups.values():
+        tokenizer = heads[0].tokenizer
+        encoded = tokenizer(texts, truncation=True, max_length=max_length)
+        input_ids = encoded['input_ids']
+        batches = plan_batches([len(ids) for ids in input_ids], max_batch_tokens, max_batch_size)
+        for batch_idx in batches:
+            features = [{k: encoded[k][i] for k in encoded.keys()} for i in batch_idx]
+            padded = tokenizer.pad(features, return_tensors='pt')
+            for clf in heads:
+                labels = clf.predict({k: v.to(clf.device) for k, v in padded.items()})
+                for i, label in zip(batch_idx, labels):
+                    results[clf.model_name][i] = label
+    return results
 
-def add_nlp_distortion_column(df, text_col='text_clean', out_col='nlp_distortion'):
-    print("Loading distortion classification model...")
-    model = load_distortion_model()
-    print("Classifying cognitive distortions for each entry (may take several minutes)...")
-    df[out_col] = df[text_col].apply(lambda x: model(x)[0]['label'] if x.strip() else "none_detected")
+
+def engine_settings(config=None):
+    settings = dict(DEFAULT_ENGINE_SETTINGS)
+    settings.update((config or {}).get('nlp_models') or {})
+    return settings
+
+
+def add_nlp_columns(df, text_col='text_clean', emotion_col='nlp_emotion', distortion_col='nlp_distortion', config=None):
+    """
+    Emotion and distortion labels in one batched pass. Empty entries keep the
+    fixed 'neutral' / 'none_detected' labels without going through a model.
+    """
+    settings = engine_settings(config)
+    heads = {}
+    if emotion_col:
+        heads[emotion_col] = (settings.get('emotion_model', EMOTION_MODEL), "neutral")
+    if distortion_col:
+        heads[distortion_col] = (settings.get('distortion_model', DISTORTION_MODEL), "none_detected")
+
+    classifiers = {col: get_classifier(name, settings['device'], settings['quantize']) for col, (name, _) in heads.items()}
+    texts = df[text_col].astype(str)
+    non_empty = texts.str.strip().astype(bool).to_numpy()
+    print(f"Classifying {int(non_empty.sum())} entries with {len(classifiers)} model(s) in batches...")
+    labels = classify_texts(
+        texts[non_empty], list({clf.model_name: clf for clf in classifiers.values()}.values()),
+        max_batch_tokens=settings['max_batch_tokens'], max_batch_size=settings['max_batch_size'],
+        max_length=settings['max_length'],
+    )
+    for col, (name, empty_label) in heads.items():
+        column = np.full(len(df), empty_label, dtype=object)
+        column[non_empty] = labels[classifiers[col].model_name]
+        df[col] = column
     return df
+
+
+def add_nlp_emotion_column(df, text_col='text_clean', out_col='nlp_emotion', config=None):
+    return add_nlp_columns(df, text_col, emotion_col=out_col, distortion_col=None, config=config)
+
+
+def add_nlp_distortion_column(df, text_col='text_clean', out_col='nlp_distortion', config=None):
+    return add_nlp_columns(df, text_col, emotion_col=None, distortion_col=out_col, config=config)
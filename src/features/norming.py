@@ -1,11 +1,284 @@
 # src/features/norming.py
 
-from sklearn.cluster import KMeans
+import numpy as np
+import pandas as pd
+from src.storage.model_store import nearest_centroid
 
 def peer_group_clusters(df, feature_cols, n_clusters=3):
     """
     KMeans clustering to group user entries (or users) based on personality traits or derived features.
     """
+    from sklearn.cluster import KMeans
     kmeans = KMeans(n_clusters=n_clusters, random_state=42)
     df['peer_group'] = kmeans.fit_predict(df[feature_cols])
     return df, kmeans
+
+def predict_peer_groups(df, artifact, feature_cols):
+    """
+    Peer group ids for new entries from a saved artifact (nearest stored
+    centroid on feature_cols). No fitting.
+    """
+    labels = nearest_centroid(df[feature_cols].to_numpy(dtype=float), artifact['centers'])
+    cluster_ids = artifact.get('cluster_ids')
+    return np.asarray(cluster_ids)[labels] if cluster_ids is not None else labels
+
+# === User-level norming ===
+# Entries are aggregated into one trait profile per user (mean trait score per
+# entry); users are clustered into peer groups, get approximate nearest peers,
+# and a percentile per trait against the whole user base.
+
+class UserTraitAggregator:
+    """
+    Incremental per-user trait sums and entry counts. update() takes any
+    chunk of entries, merge() combines aggregators built on other chunks or
+    workers; profiles() returns one mean trait vector per user.
+
+    Each update only sums its own chunk per user; the per-chunk blocks are
+    folded into one (a single factorize over the block keys) once they hold
+    more rows than the folded aggregate, so no lookup table has to be
+    rebuilt per chunk.
+    """
+
+    def __init__(self, trait_cols):
+        self.trait_cols = list(trait_cols)
+        self.blocks = []
+
+    def _add_block(self, users, sums, counts):
+        self.blocks.append((np.asarray(users, dtype=object), sums, counts))
+        pending = sum(len(b[0]) for b in self.blocks[1:])
+        if pending > len(self.blocks[0][0]):
+            self.compact()
+
+    @staticmethod
+    def _sum_by(codes, n, sums, counts):
+        summed = np.column_stack([np.bincount(codes, weights=sums[:, j], minlength=n) for j in range(sums.shape[1])])
+        return summed, np.bincount(codes, weights=counts, minlength=n).astype(np.int64)
+
+    def update(self, df, user_col):
+        codes, uniques = pd.factorize(df[user_col])
+        values = df[self.trait_cols].to_numpy(dtype=float)
+        sums, counts = self._sum_by(codes, len(uniques), values, np.ones(len(codes)))
+        self._add_block(uniques, sums, counts)
+        return self
+
+    def merge(self, other):
+        for block in other.blocks:
+            self._add_block(*block)
+        return self
+
+    def compact(self):
+        """Fold all blocks into one (users in order of first appearance)."""
+        if len(self.blocks) > 1:
+            users = np.concatenate([b[0] for b in self.blocks])
+            codes, uniques = pd.factorize(users)
+            sums, counts = self._sum_by(codes, len(uniques), np.vstack([b[1] for b in self.blocks]),
+                                        np.concatenate([b[2] for b in self.blocks]))
+            self.blocks = [(np.asarray(uniques, dtype=object), sums, counts)]
+        return self
+
+    def profiles(self):
+        if not self.blocks:
+            return pd.DataFrame(columns=self.trait_cols + ['n_entries'])
+        users, sums, counts = self.compact().blocks[0]
+        means = sums / np.maximum(counts, 1)[:, None]
+        profiles = pd.DataFrame(means, columns=self.trait_cols, index=pd.Index(users, name='user'))
+        profiles['n_entries'] = counts
+        return profiles
+
+
+def fit_centroids(X, n_clusters, sample_size=100000, random_state=42, n_init=3):
+    """
+    Cluster centroids for a large matrix: MiniBatchKMeans fitted on a random
+    sample of at most `sample_size` rows. Rows are then assigned with
+    assign_centroids().
+    """
+    from sklearn.cluster import MiniBatchKMeans
+    rng = np.random.default_rng(random_state)
+    sample = X[rng.choice(len(X), sample_size, replace=False)] if len(X) > sample_size else X
+    model = MiniBatchKMeans(n_clusters=min(n_clusters, len(sample)), random_state=random_state,
+                            batch_size=4096, n_init=n_init, compute_labels=False)
+    return model.fit(sample).cluster_centers_
+
+def assign_centroids(X, centers, block_size=50000):
+    """Nearest centroid of every row, computed block by block (bounded memory)."""
+    return np.concatenate([nearest_centroid(X[s:s + block_size], centers) for s in range(0, len(X), block_size)]
+                          or [np.zeros(0, dtype=np.int64)])
+
+
+class QuantileSketch:
+    """
+    Mergeable fixed-size histogram sketch for several columns at once
+    (columns x n_bins counts over a per-column range that widens as needed).
+    Quantiles and percentile ranks are read from the cumulative counts, so
+    the error is bounded by one bin instead of requiring a full sort.
+    """
+
+    def __init__(self, n_columns, n_bins=2048):
+        self.n_bins = n_bins
+        self.lo = np.full(n_columns, np.nan)
+        self.hi = np.full(n_columns, np.nan)
+        self.counts = np.zeros((n_columns, n_bins))
+
+    def _widen(self, col, lo, hi):
+        if np.isnan(self.lo[col]):
+            self.lo[col], self.hi[col] = lo, hi if hi > lo else lo + 1.0
+            return
+        if lo >= self.lo[col] and hi <= self.hi[col]:
+            return
+        old_lo, old_width = self.lo[col], (self.hi[col] - self.lo[col]) / self.n_bins
+        new_lo, new_hi = min(lo, old_lo), max(hi, self.hi[col])
+        # grow geometrically so repeated widening stays cheap
+        span = max(new_hi - new_lo, 2 * (self.hi[col] - self.lo[col]))
+        self.lo[col], self.hi[col] = new_lo, new_lo + span
+        centers = old_lo + (np.arange(self.n_bins) + 0.5) * old_width
+        moved = np.zeros(self.n_bins)
+        np.add.at(moved, self._bins(col, centers), self.counts[col])
+        self.counts[col] = moved
+
+    def _bins(self, col, values):
+        width = (self.hi[col] - self.lo[col]) / self.n_bins
+        return np.clip(((values - self.lo[col]) / width).astype(np.int64), 0, self.n_bins - 1)
+
+    def update(self, values, weights=None):
+        values = np.asarray(values, dtype=float)
+        for col in range(values.shape[1]):
+            column = values[:, col]
+            self._widen(col, column.min(), column.max())
+            self.counts[col] += np.bincount(self._bins(col, column), weights=weights, minlength=self.n_bins)
+        return self
+
+    def merge(self, other):
+        for col in range(len(self.lo)):
+            if np.isnan(other.lo[col]):
+                continue
+            width = (other.hi[col] - other.lo[col]) / other.n_bins
+            centers = other.lo[col] + (np.arange(other.n_bins) + 0.5) * width
+            self._widen(col, other.lo[col], other.hi[col])
+            np.add.at(self.counts[col], self._bins(col, centers), other.counts[col])
+        return self
+
+    def quantiles(self, qs):
+        """columns x len(qs) values at the given quantiles (0-1)."""
+        qs = np.asarray(qs, dtype=float)
+        out = np.empty((len(self.lo), len(qs)))
+        for col in range(len(self.lo)):
+            cdf = np.cumsum(self.counts[col])
+            edges = np.linspace(self.lo[col], self.hi[col], self.n_bins + 1)
+            out[col] = np.interp(qs * cdf[-1], np.r_[0.0, cdf], edges)
+        return out
+
+    def ranks(self, values):
+        """Percentile rank (0-100, share of sketched values below) of each value, per column."""
+        values = np.asarray(values, dtype=float)
+        out = np.empty_like(values)
+        for col in range(len(self.lo)):
+            cdf = np.cumsum(self.counts[col])
+            edges = np.linspace(self.lo[col], self.hi[col], self.n_bins + 1)
+            out[:, col] = 100.0 * np.interp(values[:, col], edges, np.r_[0.0, cdf]) / max(cdf[-1], 1)
+        return out
+
+
+class PeerIndex:
+    """
+    Approximate nearest-neighbour index (inverted file, as in FAISS IVF):
+    points are split into about sqrt(n) cells by k-means; a query is only
+    compared with the members of its `nprobe` closest cells.
+    """
+
+    def __init__(self, n_cells=None, nprobe=3, random_state=42):
+        self.n_cells = n_cells
+        self.nprobe = nprobe
+        self.random_state = random_state
+
+    def fit(self, X):
+        self.X = np.ascontiguousarray(X, dtype=np.float32)
+        n_cells = self.n_cells or max(1, int(np.sqrt(len(self.X))))
+        # the coarse quantizer only needs a few dozen points per cell to train
+        self.centers = fit_centroids(self.X, n_cells, sample_size=64 * n_cells,
+                                     random_state=self.random_state, n_init=1).astype(np.float32)
+        cells = assign_centroids(self.X, self.centers)
+        self.order = np.argsort(cells, kind='stable')
+        self.cell_starts = np.r_[0, np.cumsum(np.bincount(cells, minlength=len(self.centers)))]
+        return self
+
+    def query(self, Q, k=10, exclude=None, block_size=50000):
+        """
+        (indices, distances) of the k approximate nearest points for each
+        query row; -1 / inf when fewer candidates were found. `exclude` gives
+        one point index per query to leave out (e.g. the query itself).
+        """
+        Q = np.asarray(Q, dtype=float)
+        exclude = np.full(len(Q), -1, dtype=np.int64) if exclude is None else np.asarray(exclude, dtype=np.int64)
+        # bounded memory: queries are probed block by block
+        parts = [self._query_block(Q[s:s + block_size], k, exclude[s:s + block_size])
+                 for s in range(0, len(Q), block_size)]
+        if not parts:
+            return np.zeros((0, k), dtype=np.int64), np.zeros((0, k))
+        return np.vstack([p[0] for p in parts]), np.vstack([p[1] for p in parts])
+
+    def _query_block(self, Q, k, exclude):
+        Q = Q.astype(np.float32)
+        best_d = np.full((len(Q), k), np.inf, dtype=np.float32)
+        best_i = np.full((len(Q), k), -1, dtype=np.int64)
+        nprobe = min(self.nprobe, len(self.centers))
+        center_d = Q @ self.centers.T * -2 + (self.centers ** 2).sum(1)
+        probes = np.argpartition(center_d, nprobe - 1, axis=1)[:, :nprobe]
+        # group (query, cell) pairs by cell so each cell's members are scanned once
+        query_ids = np.repeat(np.arange(len(Q)), nprobe)
+        probe_cells = probes.ravel()
+        by_cell = np.argsort(probe_cells, kind='stable')
+        bounds = np.r_[0, np.cumsum(np.bincount(probe_cells, minlength=len(self.centers)))]
+        for cell in np.flatnonzero(np.diff(bounds)):
+            members = self.order[self.cell_starts[cell]:self.cell_starts[cell + 1]]
+            if len(members) == 0:
+                continue
+            qs = query_ids[by_cell[bounds[cell]:bounds[cell + 1]]]
+            P = self.X[members]
+            d = Q[qs] @ P.T * -2 + (P ** 2).sum(1) + (Q[qs] ** 2).sum(1)[:, None]
+            d[members[None, :] == exclude[qs, None]] = np.inf
+            ids = np.broadcast_to(members, d.shape)
+            if d.shape[1] > k:
+                top = np.argpartition(d, k - 1, axis=1)[:, :k]
+                d, ids = np.take_along_axis(d, top, axis=1), np.take_along_axis(ids, top, axis=1)
+            merged_d, merged_i = np.hstack([best_d[qs], d]), np.hstack([best_i[qs], ids])
+            keep = np.argpartition(merged_d, k - 1, axis=1)[:, :k]
+            best_d[qs] = np.take_along_axis(merged_d, keep, axis=1)
+            best_i[qs] = np.take_along_axis(merged_i, keep, axis=1)
+        order = np.argsort(best_d, axis=1, kind='stable')
+        best_d, best_i = np.take_along_axis(best_d, order, axis=1), np.take_along_axis(best_i, order, axis=1)
+        best_i[np.isinf(best_d)] = -1
+        return best_i, np.sqrt(np.maximum(best_d, 0.0))
+
+
+NORM_PERCENTILES = [5, 25, 50, 75, 95]
+
+def user_norms(aggregator, n_clusters=3, n_peers=10, nprobe=3, n_bins=2048, random_state=42):
+    """
+    User-level norming from a UserTraitAggregator:
+      - peer_group: k-means (fit_centroids) on standardized user profiles
+      - peers: approximate k nearest users (PeerIndex) in the same space
+      - <trait>_pct: percentile of the user's profile per trait (QuantileSketch)
+    Returns (users DataFrame, norms DataFrame of trait percentiles).
+    """
+    profiles = aggregator.profiles()
+    traits = aggregator.trait_cols
+    values = profiles[traits].to_numpy()
+    scaled = (values - values.mean(axis=0)) / np.where(values.std(axis=0) > 0, values.std(axis=0), 1.0)
+
+    centers = fit_centroids(scaled, n_clusters, random_state=random_state)
+    profiles['peer_group'] = assign_centroids(scaled, centers)
+
+    k = min(n_peers, len(profiles) - 1)
+    if k > 0:
+        index = PeerIndex(nprobe=nprobe, random_state=random_state).fit(scaled)
+        neighbours, _ = index.query(scaled, k=k, exclude=np.arange(len(scaled)))
+        users = np.asarray(profiles.index, dtype=object)
+        profiles['peers'] = [list(users[row[row >= 0]]) for row in neighbours]
+
+    sketch = QuantileSketch(len(traits), n_bins=n_bins).update(values)
+    ranks = sketch.ranks(values)
+    for i, trait in enumerate(traits):
+        profiles[f'{trait}_pct'] = ranks[:, i]
+    norms = pd.DataFrame(sketch.quantiles(np.array(NORM_PERCENTILES) / 100), index=traits,
+                         columns=[f'p{p}' for p in NORM_PERCENTILES])
+    return profiles, norms
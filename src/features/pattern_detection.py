@@ -1,26 +1,165 @@
+import itertools
+import numpy as np
 import pandas as pd
 from collections import Counter
+from src.features.lexicon_matcher import match_lexicons, SUBSTRING
+from src.features.corpus import TokenizedCorpus, build_corpus
 
-def get_top_ngrams(texts, n=2, top_k=15):
-    """Return top K ngrams (words/phrases) in the dataset."""
-    all_tokens = []
+def count_ngrams(texts, n=2):
+    """Return a Counter of all ngrams in the texts."""
+    counts = Counter()
     for txt in texts:
         words = txt.split()
         ngrams = zip(*[words[i:] for i in range(n)])
-        ngram_tokens = [' '.join(ngram) for ngram in ngrams]
-        all_tokens.extend(ngram_tokens)
-    return Counter(all_tokens).most_common(top_k)
+        counts.update(' '.join(ngram) for ngram in ngrams)
+    return counts
+
+def get_top_ngrams(texts, n=2, top_k=15):
+    """Return top K ngrams (words/phrases) in the dataset."""
+    return NgramSketch(orders=(n,)).update(texts).top(n, top_k)
+
+# === Bounded-memory n-gram heavy hitters ===
+_HASH_MULTIPLIER = np.uint64(0x9E3779B97F4A7C15)
+
+class NgramSketch:
+    """
+    Streaming top-k n-gram miner with bounded memory (Space-Saving summary
+    per n-gram order). N-grams are hashed to 64-bit ids from a stable hash of
+    their tokens, so summaries built on different chunks or processes can be
+    merged. Every order is counted from the same pass over the token ids.
+
+    Each summary keeps at most `capacity` n-grams with an upper-bound count,
+    its maximum overestimate (error) and the position of its first
+    occurrence (Counter.most_common breaks ties by first appearance). `floor`
+    bounds the count of any n-gram that is not kept. Counts are exact while
+    the text fits in one block (`block_tokens`); after that any n-gram that
+    occurred more than `floor` times is guaranteed to be kept.
+    """
+
+    def __init__(self, orders=(2, 3), capacity=65536, block_tokens=1000000):
+        self.orders = tuple(orders)
+        self.capacity = capacity
+        self.block_tokens = block_tokens
+        self.tables = {n: self._empty() for n in self.orders}
+        self.n_tokens = 0
+
+    @staticmethod
+    def _empty():
+        return {'keys': np.zeros(0, dtype=np.uint64), 'counts': np.zeros(0, dtype=np.int64),
+                'errors': np.zeros(0, dtype=np.int64), 'first': np.zeros(0, dtype=np.int64),
+                'grams': np.zeros(0, dtype=object), 'floor': 0}
+
+    def _trim(self, table, floor):
+        """Keep the `capacity` largest counts (ties: earliest first); table sorted by key."""
+        if len(table['keys']) > self.capacity:
+            order = np.lexsort((table['first'], -table['counts']))
+            floor = max(floor, int(table['counts'][order[self.capacity]]))
+            keep = np.sort(order[:self.capacity])
+            table = {k: v[keep] for k, v in table.items() if k != 'floor'}
+        table['floor'] = floor
+        return table
+
+    @staticmethod
+    def _lookup(table, keys):
+        """Positions of `keys` in a summary and which of them it holds."""
+        if len(table['keys']) == 0:
+            return np.zeros(len(keys), dtype=np.int64), np.zeros(len(keys), dtype=bool)
+        pos = np.minimum(np.searchsorted(table['keys'], keys), len(table['keys']) - 1)
+        return pos, table['keys'][pos] == keys
+
+    def _combine(self, a, b):
+        """
+        Merge two summaries (b's text after a's). An n-gram missing from one
+        side may still have occurred up to that side's floor times there, so
+        the floor is added to both its count and its error.
+        """
+        keys = np.union1d(a['keys'], b['keys'])
+        pos_a, in_a = self._lookup(a, keys)
+        pos_b, in_b = self._lookup(b, keys)
+        merged = {'keys': keys}
+        for col in ('counts', 'errors'):
+            merged[col] = (np.where(in_a, a[col][pos_a] if len(a['keys']) else 0, a['floor'])
+                           + np.where(in_b, b[col][pos_b] if len(b['keys']) else 0, b['floor']))
+        merged['first'] = np.where(in_a, a['first'][pos_a] if len(a['keys']) else 0,
+                                   b['first'][pos_b] if len(b['keys']) else 0)
+        merged['grams'] = np.where(in_a, a['grams'][pos_a] if len(a['keys']) else None,
+                                   b['grams'][pos_b] if len(b['keys']) else None)
+        return merged, a['floor'] + b['floor']
+
+    def _block_table(self, corpus, token_hashes, n, offset):
+        """Exact counts of one block's n-grams, trimmed to capacity (text decoded later)."""
+        starts = corpus.ngram_starts(n)
+        keys = token_hashes[corpus.token_ids[starts]]
+        for k in range(1, n):
+            keys = (keys ^ (keys >> np.uint64(29))) * _HASH_MULTIPLIER + token_hashes[corpus.token_ids[starts + k]]
+        keys, first, counts = np.unique(keys, return_index=True, return_counts=True)
+        table = {'keys': keys, 'counts': counts.astype(np.int64), 'errors': np.zeros(len(keys), dtype=np.int64),
+                 'first': starts[first] + offset, 'grams': np.full(len(keys), None, dtype=object)}
+        return self._trim(table, 0)
+
+    @staticmethod
+    def _decode(table, corpus, n, offset):
+        """Text of the n-grams that were first seen in this block and survived the merge."""
+        missing = np.flatnonzero(pd.isna(table['grams']))
+        gram_starts = table['first'][missing] - offset
+        table['grams'][missing] = [' '.join(corpus.vocabulary[corpus.token_ids[start:start + n]]) for start in gram_starts]
+
+    def _update_corpus(self, corpus):
+        token_hashes = pd.util.hash_array(np.asarray(corpus.vocabulary, dtype=object))
+        cuts = np.searchsorted(corpus.offsets, np.arange(self.block_tokens, corpus.offsets[-1], self.block_tokens))
+        bounds = np.unique(np.r_[0, cuts, len(corpus)])
+        for d0, d1 in zip(bounds[:-1], bounds[1:]):
+            block = corpus.take(np.arange(d0, d1))
+            offset = self.n_tokens + int(corpus.offsets[d0])
+            for n in self.orders:
+                table = self._block_table(block, token_hashes, n, offset)
+                self.tables[n] = self._trim(*self._combine(self.tables[n], table))
+                self._decode(self.tables[n], block, n, offset)
+        self.n_tokens += int(corpus.offsets[-1])
+
+    def update(self, texts, batch_size=10000):
+        """Count the n-grams of a TokenizedCorpus, or of texts tokenized batch by batch."""
+        if isinstance(texts, TokenizedCorpus):
+            self._update_corpus(texts)
+            return self
+        texts = iter(texts)
+        while True:
+            batch = list(itertools.islice(texts, batch_size))
+            if not batch:
+                return self
+            self._update_corpus(build_corpus(batch))
+
+    def merge(self, other):
+        """Add a sketch of text that comes after this one's."""
+        for n in self.orders:
+            theirs = dict(other.tables[n], first=other.tables[n]['first'] + self.n_tokens)
+            self.tables[n] = self._trim(*self._combine(self.tables[n], theirs))
+        self.n_tokens += other.n_tokens
+        return self
+
+    def top(self, n=2, top_k=15):
+        """[(ngram, count)] like Counter.most_common(top_k)."""
+        table = self.tables[n]
+        order = np.lexsort((table['first'], -table['counts']))[:top_k]
+        return [(table['grams'][i], int(table['counts'][i])) for i in order]
 
 def column_recurrence(df, column, top_n=10):
     """Return the most frequent (recurring) values in a given column."""
     return df[column].value_counts().head(top_n).to_dict()
 
-def detect_recurring_patterns(df, config):
+def ngram_capacity(config):
+    return ((config or {}).get('patterns') or {}).get('ngram_capacity', 65536)
+
+TRIGGER_TERMS = ['never', 'should', 'always', 'everyone', 'must', 'can’t', 'nothing', 'everybody']
+
+def detect_recurring_patterns(df, config, matches=None, corpus=None):
     report = {}
 
     # Recurring n-grams in text_clean (bigrams, trigrams)
-    report['top_bigrams'] = get_top_ngrams(df['text_clean'], n=2, top_k=15)
-    report['top_trigrams'] = get_top_ngrams(df['text_clean'], n=3, top_k=15)
+    corpus = corpus if corpus is not None else build_corpus(df['text_clean'])
+    ngrams = NgramSketch(orders=(2, 3), capacity=ngram_capacity(config)).update(corpus)
+    report['top_bigrams'] = ngrams.top(2, top_k=15)
+    report['top_trigrams'] = ngrams.top(3, top_k=15)
 
     # Recurring emotions & biases
     if 'emotion' in df.columns:
@@ -29,9 +168,8 @@ def detect_recurring_patterns(df, config):
         report['top_biases'] = column_recurrence(df, 'bias/distortion', top_n=10)
 
     # Recurring triggers (words to watch: "never", "should", "always", "everyone", etc.)
-    trigger_terms = ['never', 'should', 'always', 'everyone', 'must', 'can’t', 'nothing', 'everybody']
-    trigger_counts = {term: df['text_clean'].str.contains(term).sum() for term in trigger_terms}
-    report['trigger_word_counts'] = trigger_counts
+    matches = matches if matches is not None else match_lexicons(df['text_clean'])
+    report['trigger_word_counts'] = matches.document_frequencies('pattern_trigger', SUBSTRING)
 
     # Recurring scenarios (from 'context', if present)
     if 'context' in df.columns:
@@ -39,6 +177,49 @@ def detect_recurring_patterns(df, config):
 
     return report
 
+class PatternAccumulator:
+    """
+    Mergeable partial state for detect_recurring_patterns, fed one chunk at a
+    time (streaming mode). report() returns the same structure; n-gram
+    counts come from a bounded NgramSketch (exact until it fills up).
+    """
+
+    def __init__(self, config=None):
+        self.ngrams = NgramSketch(orders=(2, 3), capacity=ngram_capacity(config))
+        self.columns = {'emotion': Counter(), 'bias/distortion': Counter(), 'context': Counter()}
+        self.seen_columns = set()
+        self.trigger_counts = Counter({term: 0 for term in TRIGGER_TERMS})
+
+    def update(self, df, matches=None, corpus=None):
+        corpus = corpus if corpus is not None else build_corpus(df['text_clean'])
+        self.ngrams.update(corpus)
+        for col, counts in self.columns.items():
+            if col in df.columns:
+                self.seen_columns.add(col)
+                counts.update(df[col].value_counts().to_dict())
+        matches = matches if matches is not None else match_lexicons(df['text_clean'])
+        self.trigger_counts.update(matches.document_frequencies('pattern_trigger', SUBSTRING))
+        return self
+
+    def merge(self, other):
+        self.ngrams.merge(other.ngrams)
+        for col, counts in other.columns.items():
+            self.columns[col].update(counts)
+        self.seen_columns |= other.seen_columns
+        self.trigger_counts.update(other.trigger_counts)
+        return self
+
+    def report(self):
+        report = {
+            'top_bigrams': self.ngrams.top(2, 15),
+            'top_trigrams': self.ngrams.top(3, 15),
+        }
+        for key, col, top_n in [('top_emotions', 'emotion', 10), ('top_biases', 'bias/distortion', 10), ('top_context', 'context', 7)]:
+            if col in self.seen_columns:
+                report[key] = dict(self.columns[col].most_common(top_n))
+        report['trigger_word_counts'] = dict(self.trigger_counts)
+        return report
+
 def print_pattern_report(report):
     print("\n--- PATTERN & TRIGGER REPORT ---")
     print("Top Bigrams:", report['top_bigrams'])
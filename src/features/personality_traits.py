@@ -1,4 +1,8 @@
+import numpy as np
 import pandas as pd
+from scipy import sparse
+from src.features.corpus import build_corpus
+from src.features.assembly import matrix_block, assign_block
 
 BIG5_LEXICON = {
     'openness': ['imagine', 'creative', 'novel', 'invent', 'art'],
@@ -15,11 +19,58 @@ def score_big5(text):
         scores[trait] = sum(w in keywords for w in words)
     return scores
 
-def add_big5_traits(df, text_col="text_clean"):
-    big5_scores = df[text_col].apply(score_big5)
-    for trait in BIG5_LEXICON:
-        df[f'big5_{trait}'] = big5_scores.apply(lambda x: x[trait])
-    return df
+# === Vectorized scoring ===
+# A trait lexicon is {trait: {term: weight}}; plain term lists weigh 1 per
+# occurrence. Terms are matched like score_big5: lower-cased whitespace tokens.
+
+def trait_lexicon(config=None):
+    """
+    BIG5_LEXICON merged with the `traits.lexicon` config section. Each trait
+    there is a term list (weight 1) or a {term: weight} mapping; known terms
+    get the new weight, new terms and new traits are added.
+    """
+    lexicon = {trait: dict.fromkeys(words, 1) for trait, words in BIG5_LEXICON.items()}
+    extra = ((config or {}).get('traits') or {}).get('lexicon') or {}
+    for trait, terms in extra.items():
+        terms = terms if isinstance(terms, dict) else dict.fromkeys(terms, 1)
+        lexicon.setdefault(trait, {}).update({str(term).lower(): weight for term, weight in terms.items()})
+    return lexicon
+
+def trait_columns(lexicon=None):
+    return [f'big5_{trait}' for trait in (lexicon or BIG5_LEXICON)]
+
+def lexicon_matrix(vocabulary, lexicon):
+    """Sparse vocabulary x traits weight matrix (a corpus token's lower-cased form looked up per trait)."""
+    lowered = pd.Series(vocabulary, dtype=object).str.lower()
+    rows, cols, weights = [], [], []
+    for col, terms in enumerate(lexicon.values()):
+        weight = lowered.map(terms)
+        hit = np.flatnonzero(weight.notna().to_numpy())
+        rows.append(hit)
+        cols.append(np.full(len(hit), col))
+        weights.append(weight.to_numpy(dtype=float)[hit])
+    return sparse.csr_matrix((np.concatenate(weights), (np.concatenate(rows), np.concatenate(cols))),
+                             shape=(len(vocabulary), len(lexicon)))
+
+def score_traits(corpus, lexicon=None):
+    """
+    documents x traits scores in one sparse matmul: whitespace-token counts
+    times the lexicon weight matrix. Integer counts when all weights are
+    integers (the default lexicon), floats otherwise.
+    """
+    lexicon = lexicon or trait_lexicon()
+    scores = (corpus.counts @ lexicon_matrix(corpus.vocabulary, lexicon)).toarray()
+    integral = all(float(w).is_integer() for terms in lexicon.values() for w in terms.values())
+    return scores.astype(np.int64) if integral else scores
+
+def big5_block(df, text_col="text_clean", corpus=None, lexicon=None):
+    """Trait score columns of df as one block over the entries x traits score matrix."""
+    corpus = corpus if corpus is not None else build_corpus(df[text_col])
+    lexicon = lexicon or trait_lexicon()
+    return matrix_block(score_traits(corpus, lexicon), trait_columns(lexicon), df.index)
+
+def add_big5_traits(df, text_col="text_clean", corpus=None, lexicon=None):
+    return assign_block(df, big5_block(df, text_col, corpus, lexicon))
 
 def get_period_trait_summary(df, trait_cols, date_col='date', freq='M'):
     df[date_col] = pd.to_datetime(df[date_col])
@@ -1,20 +1,241 @@
 # src/features/quirk_detection.py
 
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.cluster import KMeans
+import os
+import numpy as np
+from src.features.corpus import TokenizedCorpus, build_corpus
+from src.storage.model_store import nearest_centroid, align_labels
 
-def detect_journal_quirks(df, text_col="text_clean", n_clusters=5):
+class QuirkVectorizer:
+    """
+    TF-IDF space of TfidfVectorizer(max_features=100, stop_words='english'),
+    built from the shared tokenized corpus. The vocabulary and IDF weights are
+    learned once and reused, so later batches land in the same space.
+    """
+
+    def __init__(self, max_features=100):
+        self.max_features = max_features
+        self.terms = None
+        from sklearn.feature_extraction.text import TfidfTransformer
+        self.transformer = TfidfTransformer()
+
+    @property
+    def fitted(self):
+        return self.terms is not None
+
+    def fit_transform(self, corpus):
+        counts, self.terms = corpus.vocabulary_counts(max_features=self.max_features, stop_words='english')
+        return self.transformer.fit_transform(counts)
+
+    def transform(self, corpus):
+        return self.transformer.transform(corpus.term_counts(self.terms))
+
+def quirk_tfidf_matrix(corpus, max_features=100):
+    """TF-IDF matrix and terms of the quirk space, fitted on `corpus`."""
+    vectorizer = QuirkVectorizer(max_features)
+    return vectorizer.fit_transform(corpus), vectorizer.terms
+
+# === Online (mini-batch) clustering ===
+class OnlineQuirkClusterer:
+    """
+    MiniBatchKMeans quirk clustering over a fixed QuirkVectorizer space.
+    fit() does the initial fit, partial_fit() updates the centroids from new
+    mini-batches, predict() assigns entries without refitting. The whole
+    object is checkpointed with save()/load() so the next run warm-starts
+    from the previous centroids.
+
+    Drift: the clusterer keeps reference statistics of the data it was
+    trained on (mean squared distance to the nearest centroid, cluster
+    shares, share of entries with no vocabulary term). drift() compares a
+    new batch against them; a full refit is advised when the distance ratio
+    or the cluster-share shift passes its threshold. Batches smaller than
+    `min_drift_rows` (default: batch_size) only update the centroids: their
+    cluster shares are too noisy to judge drift, and a refit needs at least
+    n_clusters entries.
+    """
+
+    def __init__(self, n_clusters=5, batch_size=1024, random_state=42,
+                 max_features=100, inertia_ratio_threshold=1.5, share_shift_threshold=0.25, min_drift_rows=None):
+        self.n_clusters = n_clusters
+        self.batch_size = batch_size
+        self.min_drift_rows = max(min_drift_rows or batch_size, n_clusters)
+        self.random_state = random_state
+        self.inertia_ratio_threshold = inertia_ratio_threshold
+        self.share_shift_threshold = share_shift_threshold
+        self.vectorizer = QuirkVectorizer(max_features)
+        from sklearn.cluster import MiniBatchKMeans
+        self.model = MiniBatchKMeans(n_clusters=n_clusters, batch_size=batch_size, random_state=random_state, n_init=3)
+        self.n_seen = 0
+        self.distance_sum = 0.0
+        self.label_counts = np.zeros(n_clusters, dtype=np.int64)
+        self.empty_count = 0
+
+    @property
+    def fitted(self):
+        return hasattr(self.model, 'cluster_centers_')
+
+    def _matrix(self, corpus):
+        if isinstance(corpus, TokenizedCorpus):
+            return self.vectorizer.transform(corpus)
+        return corpus
+
+    def _track(self, X):
+        labels, distances = self._assign(X)
+        self.n_seen += X.shape[0]
+        self.distance_sum += float(distances.sum())
+        self.label_counts += np.bincount(labels, minlength=self.n_clusters)
+        self.empty_count += int((X.getnnz(axis=1) == 0).sum())
+        return labels
+
+    def _assign(self, X):
+        distances = self.model.transform(X)
+        labels = distances.argmin(axis=1)
+        return labels, distances[np.arange(len(labels)), labels] ** 2
+
+    def fit(self, corpus):
+        """Fresh fit: learn the TF-IDF space and the centroids from `corpus`."""
+        X = self.vectorizer.fit_transform(corpus)
+        self.model.fit(X)
+        self.n_seen, self.distance_sum, self.empty_count = 0, 0.0, 0
+        self.label_counts[:] = 0
+        return self._track(X)
+
+    def refit(self, corpus):
+        """
+        Refit the centroids on `corpus` in the existing TF-IDF space. New
+        cluster ids are aligned with the ids the previous centroids give the
+        same entries, so ids already written stay valid.
+        """
+        X = self._matrix(corpus)
+        previous = self._assign(X)[0]
+        self.model.fit(X)
+        mapping, agreement = align_labels(self.model.labels_, previous, self.n_clusters)
+        # mapping is a permutation (new id -> previous id): reorder the centroids by it
+        order = np.argsort(mapping)
+        self.model.cluster_centers_ = self.model.cluster_centers_[order]
+        if hasattr(self.model, '_counts'):
+            self.model._counts = self.model._counts[order]
+        self.n_seen, self.distance_sum, self.empty_count = 0, 0.0, 0
+        self.label_counts[:] = 0
+        self._track(X)
+        return agreement
+
+    def partial_fit(self, corpus):
+        """Update the centroids from new entries, one mini-batch at a time."""
+        if not self.fitted:
+            return self.fit(corpus)
+        X = self._matrix(corpus)
+        for start in range(0, X.shape[0], self.batch_size):
+            self.model.partial_fit(X[start:start + self.batch_size])
+        return self._track(X)
+
+    def predict(self, corpus):
+        """Assign entries to the current clusters (no refit)."""
+        return self._assign(self._matrix(corpus))[0]
+
+    def drift(self, corpus):
+        """Compare new entries with the training reference; see class docstring."""
+        X = self._matrix(corpus)
+        labels, distances = self._assign(X)
+        reference_distance = self.distance_sum / max(self.n_seen, 1)
+        reference_shares = self.label_counts / max(self.label_counts.sum(), 1)
+        shares = np.bincount(labels, minlength=self.n_clusters) / max(len(labels), 1)
+        report = {
+            'n_entries': int(X.shape[0]),
+            'inertia_ratio': float(distances.mean() / reference_distance) if len(distances) and reference_distance > 0 else 1.0,
+            'share_shift': float(0.5 * np.abs(shares - reference_shares).sum()),
+            'empty_share': float((X.getnnz(axis=1) == 0).mean()) if X.shape[0] else 0.0,
+            'reference_empty_share': self.empty_count / max(self.n_seen, 1),
+        }
+        report['needs_refit'] = (report['inertia_ratio'] > self.inertia_ratio_threshold
+                                 or report['share_shift'] > self.share_shift_threshold)
+        return report
+
+    def save(self, path):
+        import joblib
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        joblib.dump(self, path)
+        return path
+
+    @staticmethod
+    def load(path):
+        import joblib
+        return joblib.load(path)
+
+def online_quirk_clusters(df, corpus, config=None, clusterer=None, update=True):
+    """
+    Online quirk clustering for the pipeline (`quirks.mode: online`).
+    Warm-starts from the checkpoint in config when no clusterer is passed;
+    without one (or when drift() asks for it) the model is refitted on
+    `corpus`. With update=True new entries also update the centroids.
+    Returns the updated DataFrame and the clusterer (already checkpointed).
+    """
+    settings = (config or {}).get('quirks', {})
+    checkpoint = settings.get('checkpoint')
+    if clusterer is None and checkpoint and os.path.exists(checkpoint):
+        clusterer = OnlineQuirkClusterer.load(checkpoint)
+        print(f"♻️ Warm start from quirk checkpoint {checkpoint} ({clusterer.n_seen} entries seen)")
+
+    if clusterer is None or not clusterer.fitted:
+        clusterer = clusterer or OnlineQuirkClusterer(
+            n_clusters=settings.get('n_clusters', 5), batch_size=settings.get('batch_size', 1024),
+            inertia_ratio_threshold=settings.get('inertia_ratio_threshold', 1.5),
+            share_shift_threshold=settings.get('share_shift_threshold', 0.25),
+            min_drift_rows=settings.get('min_drift_rows'))
+        clusterer.fit(corpus)
+    elif len(corpus) < getattr(clusterer, 'min_drift_rows', clusterer.batch_size):  # older checkpoints lack it
+        if update:
+            clusterer.partial_fit(corpus)
+    else:
+        report = clusterer.drift(corpus)
+        print(f"📈 Quirk drift: inertia ratio {report['inertia_ratio']:.2f}, share shift {report['share_shift']:.2f}")
+        if report['needs_refit']:
+            agreement = clusterer.refit(corpus)
+            print(f"⚠️ Drift threshold exceeded, refitted quirk clusters ({agreement:.0%} of entries keep their id)")
+        elif update:
+            clusterer.partial_fit(corpus)
+
+    df['quirk_cluster'] = clusterer.predict(corpus)
+    if checkpoint:
+        clusterer.save(checkpoint)
+    return df, clusterer
+
+# === Batch clustering ===
+def detect_journal_quirks(df, text_col="text_clean", n_clusters=5, corpus=None, vectorizer=None):
     """
     Clusters journal entries into themes (quirks) using TF-IDF + KMeans.
-    Returns the updated DataFrame and fitted model.
+    Returns the updated DataFrame and fitted model. A QuirkVectorizer passed
+    as `vectorizer` is fitted in place (e.g. to save it with the model).
     """
-    tfidf = TfidfVectorizer(max_features=100, stop_words='english')  # better vectorization
-    tfidf_matrix = tfidf.fit_transform(df[text_col])
+    corpus = corpus if corpus is not None else build_corpus(df[text_col])
+    from sklearn.cluster import KMeans
+    vectorizer = vectorizer if vectorizer is not None else QuirkVectorizer()
+    tfidf_matrix = vectorizer.fit_transform(corpus)  # better vectorization
     kmeans = KMeans(n_clusters=n_clusters, random_state=42)
     kmeans.fit(tfidf_matrix)
     df['quirk_cluster'] = kmeans.labels_
     return df, kmeans
 
+# === Saved models / predict-only path ===
+def quirk_artifact(vectorizer, centers):
+    """Arrays describing a fitted quirk model, for the model store."""
+    return {
+        'terms': np.asarray(vectorizer.terms, dtype=str),
+        'idf': vectorizer.transformer.idf_,
+        'centers': np.asarray(centers),
+    }
+
+def predict_quirks(corpus, artifact):
+    """
+    Quirk cluster ids for new entries from a saved artifact: TF-IDF with the
+    stored vocabulary/IDF, then the nearest stored centroid. No fitting.
+    """
+    from sklearn.preprocessing import normalize
+    counts = corpus.term_counts(artifact['terms'].tolist())
+    X = normalize(counts.multiply(np.asarray(artifact['idf'])).tocsr())
+    labels = nearest_centroid(X, artifact['centers'])
+    cluster_ids = artifact.get('cluster_ids')
+    return np.asarray(cluster_ids)[labels] if cluster_ids is not None else labels
+
 def summarize_quirks(df, text_col='text_clean', max_samples=3):
     """
     Returns 2-3 sample entries per quirk cluster.
@@ -1,38 +1,247 @@
 # src/insights/period_summary.py
 
+import json
+import os
+import warnings
+import numpy as np
 import pandas as pd
+from src.insights.psychological_inference import explode_distortions
 
 def period_insight_summary(df, date_col='date', freq='M'):
     # Assumes date_col is datetime
-    df = df.copy()
-    df[date_col] = pd.to_datetime(df[date_col])
-
-    # Group by period
-    period_groups = df.groupby(pd.Grouper(key=date_col, freq=freq))
-
-    summaries = []
-    for period, group in period_groups:
-        if group.empty:
-            continue
-
-        # Dominant emotions & distortions
-        top_emotion = group['emotion'].value_counts().idxmax() if 'emotion' in group else None
-        avg_distortion = group['distortion_count'].mean() if 'distortion_count' in group else None
-        common_distortions = pd.Series(sum(group['detected_distortions'], [])).value_counts().head(2).to_dict()
-        # Watch for empty lists
-        entry_count = len(group)
-
-        # Build summary
-        summary = {
-            'period': period.strftime('%Y-%m') if freq=='M' else str(period),
-            'entry_count': entry_count,
-            'top_emotion': top_emotion,
-            'avg_distortion_count': round(avg_distortion, 2) if avg_distortion is not None else None,
-            'common_distortions': common_distortions,
+    return PeriodRollup(date_col=date_col).update(df).summary(freq)
+
+DASHBOARD_TABLES = ('emotions', 'distortions', 'traits')
+
+def _descending_order(counts):
+    """Order of Series(counts).sort_values(ascending=False) (pandas' nargsort, default quicksort)."""
+    positions = np.arange(len(counts))[::-1]
+    return positions[counts[::-1].argsort(kind='quicksort')][::-1]
+
+class PeriodRollup:
+    """
+    Day-level rollup store behind the period summaries. Mergeable state per
+    day: entry count, distortion_count sum/count, sum/count of every
+    `mean_cols` column (trait scores), and per-day emotion and distortion
+    counts with their first occurrence. Any period of a day or
+    longer (D, W, M, ...) is served by regrouping the day rows, so one store
+    answers every granularity, and update() with new entries only rewrites
+    the days they fall on.
+
+    Summaries are identical to grouping the entries directly. Groups see
+    their entries sorted by timestamp (stable), so "first occurrence" is the
+    (timestamp, entry sequence) pair; ties in value_counts() are resolved by
+    replaying the same sort over the values in that order.
+    """
+
+    TABLES = ('days', 'emotions', 'distortions')
+    ORDER = ['first_time', 'first_seen']
+
+    def __init__(self, date_col='date', mean_cols=None):
+        self.date_col = date_col
+        self.mean_cols = list(mean_cols or [])
+        columns = {'entry_count': pd.Series(dtype='int64')}
+        for col in ['distortion'] + self.mean_cols:
+            columns[f'{col}_sum'], columns[f'{col}_n'] = pd.Series(dtype='float64'), pd.Series(dtype='int64')
+        self.days = pd.DataFrame(columns, index=pd.DatetimeIndex([], name='day'))
+        self.emotions = self._empty_counts('emotion')
+        self.distortions = self._empty_counts('distortion')
+        self.n_entries = 0
+        self.n_distortions = 0
+        self.has_emotion = False
+        self.has_distortion_count = False
+
+    @staticmethod
+    def _empty_counts(key):
+        return pd.DataFrame({'day': pd.Series(dtype='datetime64[ns]'), key: pd.Series(dtype=object),
+                             'count': pd.Series(dtype='int64'), 'first_time': pd.Series(dtype='datetime64[ns]'),
+                             'first_seen': pd.Series(dtype='int64')})
+
+    @classmethod
+    def _combine(cls, table, keys):
+        """Sum counts per `keys`, keeping the earliest occurrence."""
+        table = table.sort_values(cls.ORDER, kind='stable')
+        return table.groupby(keys, sort=False).agg(count=('count', 'sum'), first_time=('first_time', 'first'),
+                                                   first_seen=('first_seen', 'first')).reset_index()
+
+    @classmethod
+    def _count_by_day(cls, time, values, seq, key):
+        frame = pd.DataFrame({'day': time.floor('D'), key: values, 'count': 1, 'first_time': time, 'first_seen': seq})
+        return cls._combine(frame.dropna(subset=[key]), ['day', key])
+
+    @classmethod
+    def _merge_counts(cls, table, new, key):
+        touched = table['day'].isin(new['day'].unique())
+        merged = cls._combine(pd.concat([table[touched], new], ignore_index=True), ['day', key])
+        return pd.concat([table[~touched], merged], ignore_index=True)
+
+    def update(self, df):
+        """Add entries (in order) to the store; only their days are rewritten."""
+        dates = pd.to_datetime(df[self.date_col])
+        valid = dates.notna().to_numpy()
+        time = pd.DatetimeIndex(dates[valid])
+        seq = self.n_entries + np.flatnonzero(valid)
+        self.n_entries += len(df)
+
+        days = pd.DataFrame({'day': time.floor('D'), 'entry_count': 1})
+        self.has_distortion_count |= 'distortion_count' in df
+        for name, col in [('distortion', 'distortion_count')] + [(col, col) for col in self.mean_cols]:
+            if col in df:
+                values = df[col].to_numpy(dtype=float)[valid]
+                days[f'{name}_sum'] = np.nan_to_num(values)
+                days[f'{name}_n'] = ~np.isnan(values)
+            else:
+                days[f'{name}_sum'], days[f'{name}_n'] = 0.0, 0
+        days = days.groupby('day').sum()
+        self.days = self.days.add(days, fill_value=0).astype(self.days.dtypes.to_dict())
+
+        if 'emotion' in df:
+            self.has_emotion = True
+            emotions = self._count_by_day(time, df['emotion'].to_numpy()[valid], seq, 'emotion')
+            self.emotions = self._merge_counts(self.emotions, emotions, 'emotion')
+
+        rows, labels = explode_distortions(df['detected_distortions'][valid])
+        distortions = self._count_by_day(time[rows], labels, self.n_distortions + np.arange(len(labels)), 'distortion')
+        self.distortions = self._merge_counts(self.distortions, distortions, 'distortion')
+        self.n_distortions += len(labels)
+        return self
+
+    def merge(self, other):
+        """Append another store whose entries come after this one's."""
+        self.days = self.days.add(other.days, fill_value=0).astype(self.days.dtypes.to_dict())
+        for name, key, offset in (('emotions', 'emotion', self.n_entries), ('distortions', 'distortion', self.n_distortions)):
+            theirs = getattr(other, name).assign(first_seen=lambda t: t['first_seen'] + offset)
+            setattr(self, name, self._merge_counts(getattr(self, name), theirs, key))
+        self.n_entries += other.n_entries
+        self.n_distortions += other.n_distortions
+        self.has_emotion |= other.has_emotion
+        self.has_distortion_count |= other.has_distortion_count
+        return self
+
+    @classmethod
+    def _top(cls, table, key, labels, n):
+        """
+        {period: value_counts().head(n)} per period. Periods whose top n+1
+        counts are all distinct are read off directly; the others replay
+        the sort value_counts() does.
+        """
+        table = cls._combine(table.assign(period=table['day'].map(labels)), ['period', key])
+        table = table.sort_values(['period'] + cls.ORDER, kind='stable')
+        ranked = table.sort_values(['period', 'count'], ascending=[True, False], kind='stable')
+        rank = ranked.groupby('period', sort=False).cumcount().to_numpy()
+        head = ranked[rank <= n]
+        same_period = head['period'].to_numpy()[1:] == head['period'].to_numpy()[:-1]
+        tied = same_period & (head['count'].to_numpy()[1:] == head['count'].to_numpy()[:-1])
+        tied_periods = set(head['period'].to_numpy()[1:][tied])
+
+        tops = {}
+        head = head[rank[rank <= n] < n]
+        for period, value, count in zip(head['period'], head[key], head['count']):
+            if period not in tied_periods:
+                tops.setdefault(period, {})[value] = count
+        tied = table[table['period'].isin(tied_periods)]
+        periods, values, counts = tied['period'].array, tied[key].to_numpy(), tied['count'].to_numpy()
+        bounds = np.flatnonzero(np.r_[True, periods[1:] != periods[:-1], True]) if len(tied) else []
+        for start, end in zip(bounds[:-1], bounds[1:]):
+            tops[periods[start]] = {values[start + i]: int(counts[start + i]) for i in _descending_order(counts[start:end])[:n]}
+        return tops
+
+    def _group_days(self, freq):
+        """(per-period sums of the day columns, period label of every stored day), or (None, None)."""
+        with warnings.catch_warnings():
+            warnings.simplefilter('ignore', FutureWarning)  # deprecated aliases ('M')
+            offset = pd.tseries.frequencies.to_offset(freq)
+        if isinstance(offset, pd.offsets.Tick) and offset.nanos < pd.Timedelta(days=1).value:
+            raise ValueError(f"PeriodRollup stores days; '{freq}' is shorter than a day")
+
+        days = self.days[self.days['entry_count'] > 0].sort_index().reset_index()
+        if days.empty:
+            return None, None
+        grouped = days.groupby(pd.Grouper(key='day', freq=offset))
+        # period label of every stored day
+        positions = list(grouped.indices.values())
+        labels = pd.Series(np.repeat(list(grouped.indices), [len(p) for p in positions]),
+                           index=days['day'].to_numpy()[np.concatenate(positions)])
+        totals = grouped.sum()
+        return totals[totals['entry_count'] > 0], labels
+
+    def summary(self, freq='M'):
+        """period_insight_summary's frame for any period of a day or longer."""
+        totals, labels = self._group_days(freq)
+        if totals is None:
+            return pd.DataFrame()
+        emotions = self._top(self.emotions, 'emotion', labels, 1) if self.has_emotion else {}
+        distortions = self._top(self.distortions, 'distortion', labels, 2)
+
+        periods = totals.index
+        avg_distortion = None
+        if self.has_distortion_count:
+            with np.errstate(invalid='ignore', divide='ignore'):
+                avg_distortion = np.round(totals['distortion_sum'].to_numpy() / totals['distortion_n'].to_numpy(), 2)
+        return pd.DataFrame({
+            'period': [p.strftime('%Y-%m') if freq=='M' else str(p) for p in periods],
+            'entry_count': totals['entry_count'].to_numpy(dtype=np.int64),
+            'top_emotion': [next(iter(emotions[p]), None) if p in emotions else None for p in periods],
+            'avg_distortion_count': avg_distortion if avg_distortion is not None else [None] * len(periods),
+            'common_distortions': [distortions.get(p, {}) for p in periods],
+        })
+
+    def dashboard_tables(self, freq='D', window=7):
+        """
+        Per-period tables for the dashboard, sized by the number of periods:
+          - emotions: period, emotion, count (most frequent first per period)
+          - distortions: entry_count, distortion_sum, distortion_mean and the
+            `window`-period rolling mean of distortion_sum
+          - traits: mean of every mean_cols column
+        """
+        totals, labels = self._group_days(freq)
+        if totals is None:
+            return {name: pd.DataFrame() for name in DASHBOARD_TABLES}
+        totals.index.name = 'period'
+        emotions = self._combine(self.emotions.assign(period=self.emotions['day'].map(labels)), ['period', 'emotion'])
+        emotions = emotions.sort_values(['period'] + self.ORDER, kind='stable')
+        emotions = emotions.sort_values(['period', 'count'], ascending=[True, False], kind='stable')
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            distortions = pd.DataFrame({
+                'entry_count': totals['entry_count'],
+                'distortion_sum': totals['distortion_sum'],
+                'distortion_mean': totals['distortion_sum'] / totals['distortion_n'],
+                'distortion_rolling_mean': totals['distortion_sum'].rolling(window, min_periods=1).mean(),
+            })
+            traits = pd.DataFrame({col: totals[f'{col}_sum'] / totals[f'{col}_n'] for col in self.mean_cols}, index=totals.index)
+        return {
+            'emotions': emotions[['period', 'emotion', 'count']].reset_index(drop=True),
+            'distortions': distortions.reset_index(),
+            'traits': traits.reset_index(),
         }
-        summaries.append(summary)
 
-    return pd.DataFrame(summaries)
+    # === Persistence ===
+    def save(self, path):
+        """Write the store as one Parquet file per table plus meta.json."""
+        os.makedirs(path, exist_ok=True)
+        for name in self.TABLES:
+            getattr(self, name).to_parquet(os.path.join(path, f"{name}.parquet"))
+        meta = {'date_col': self.date_col, 'mean_cols': self.mean_cols, 'n_entries': self.n_entries, 'n_distortions': self.n_distortions,
+                'has_emotion': self.has_emotion, 'has_distortion_count': self.has_distortion_count}
+        with open(os.path.join(path, 'meta.json'), 'w') as f:
+            json.dump(meta, f, indent=2)
+        return path
+
+    @classmethod
+    def load(cls, path):
+        """Stored rollup, or an empty one when `path` holds none."""
+        meta_file = os.path.join(path, 'meta.json')
+        if not os.path.exists(meta_file):
+            return cls()
+        with open(meta_file) as f:
+            meta = json.load(f)
+        rollup = cls(date_col=meta.pop('date_col'), mean_cols=meta.pop('mean_cols', None))
+        for name in cls.TABLES:
+            setattr(rollup, name, pd.read_parquet(os.path.join(path, f"{name}.parquet")))
+        for key, value in meta.items():
+            setattr(rollup, key, value)
+        return rollup
 
 def print_period_summaries(df_summary):
     print("\n=== PERIODIC INSIGHT SUMMARY ===")
@@ -1,6 +1,10 @@
 # src/insights/psychological_inference.py
 
+import numpy as np
 import pandas as pd
+from collections import Counter
+from src.features.lexicon_matcher import match_lexicons, SUBSTRING, WORD
+from src.features.assembly import column_block, object_column, assign_block
 
 # Example mapping dictionaries (expand as needed)
 CBT_DISTORTION_KEYWORDS = {
@@ -12,6 +16,48 @@ CBT_DISTORTION_KEYWORDS = {
     'overgeneralization': ['everyone', 'nobody', 'every time', 'all', 'none'],
 }
 
+# Feedback examples (expand or personalize as needed)
+INSIGHT_FEEDBACK = {
+    'catastrophizing': "Try evidence-based thinking: What is the most likely outcome?",
+    'fortune telling': "Notice prediction-based thoughts and test their truth in reality.",
+    'personalization': "Ask: Are there other factors at play, not just you?",
+    'should statements': "Challenge rigid 'shoulds'—are they preferences or necessities?",
+    'mind reading': "Check: Do you have evidence for what others think?",
+    'overgeneralization': "Consider: Is this always true, or just sometimes?"
+}
+
+# Common cyclical language triggers (counted as whole words)
+INSIGHT_TRIGGER_TERMS = ['never', 'always', 'everybody', 'nobody', 'should', 'must']
+
+NO_DISTORTION = "none detected"
+DISTORTION_TYPES = list(CBT_DISTORTION_KEYWORDS) + [NO_DISTORTION]
+
+# === Distortion representation ===
+# detected_distortions stays a list column (it is what gets stored and shown),
+# but aggregations never iterate over it: they use its exploded form, one
+# (entry, distortion) pair per listed distortion built in linear time, while
+# psychological_inference builds the lists from an entries x types indicator
+# matrix.
+
+def explode_distortions(lists):
+    """(entry positions, distortion labels) of every listed distortion, in list order."""
+    lengths = lists.str.len().fillna(0).to_numpy(dtype=np.int64)
+    labels = lists.explode().to_numpy()
+    if len(labels):
+        # explode() leaves one NaN row per empty list
+        labels = labels[np.repeat(lengths > 0, np.maximum(lengths, 1))]
+    return np.repeat(np.arange(len(lists)), lengths), labels
+
+def distortion_lists(indicators, types=list(CBT_DISTORTION_KEYWORDS)):
+    """detected_distortions lists from an entries x types indicator matrix (no type -> [NO_DISTORTION])."""
+    codes = indicators.astype(np.int64) @ (1 << np.arange(len(types), dtype=np.int64))
+    patterns = {code: [t for j, t in enumerate(types) if code >> j & 1] or [NO_DISTORTION] for code in np.unique(codes).tolist()}
+    return [list(patterns[code]) for code in codes.tolist()]
+
+def distortion_frequencies(lists):
+    """pd.Series(sum(lists, [])).value_counts() without the quadratic flattening."""
+    return pd.Series(explode_distortions(lists)[1], dtype=object).value_counts()
+
 # Helper: Given a text, map keywords to distortion types
 def infer_distortions(text):
     detected = set()
@@ -19,38 +65,68 @@ def infer_distortions(text):
     for dist_type, keywords in CBT_DISTORTION_KEYWORDS.items():
         if any(kw in text_lower for kw in keywords):
             detected.add(dist_type)
-    return list(detected) if detected else ["none detected"]
+    return list(detected) if detected else [NO_DISTORTION]
 
 # Add new insight columns to each entry
-def psychological_inference(df, text_col='text_clean'):
-    df['detected_distortions'] = df[text_col].apply(infer_distortions)
-    df['distortion_count'] = df['detected_distortions'].apply(lambda x: 0 if x == ["none detected"] else len(x))
-    return df
+def distortion_block(df, text_col='text_clean', matches=None):
+    """detected_distortions / distortion_count of df as one column block."""
+    matches = matches if matches is not None else match_lexicons(df[text_col])
+    indicators = np.column_stack([matches.contains_any(f'cbt:{dist}', SUBSTRING) for dist in CBT_DISTORTION_KEYWORDS])
+    return column_block({
+        'detected_distortions': object_column(distortion_lists(indicators)),
+        'distortion_count': indicators.sum(axis=1),
+    }, df.index)
+
+def psychological_inference(df, text_col='text_clean', matches=None):
+    return assign_block(df, distortion_block(df, text_col, matches))
+
+def _trigger_counts(matches):
+    totals = matches.term_totals('insight_trigger', WORD)
+    return {term: n for term, n in sorted(totals.items(), key=lambda kv: -kv[1]) if n}
 
 # Generate a quick summary of detected psychological loops
-def user_insight_report(df):
+def user_insight_report(df, matches=None):
     summary = {}
 
     # Frequency of each detected distortion
-    all_dists = sum(df['detected_distortions'], [])  # Flatten list
-    dist_counter = pd.Series(all_dists).value_counts()
-    summary['distortion_frequencies'] = dist_counter.to_dict()
-
-    # Feedback examples (expand or personalize as needed)
-    summary['feedback'] = {
-        'catastrophizing': "Try evidence-based thinking: What is the most likely outcome?",
-        'fortune telling': "Notice prediction-based thoughts and test their truth in reality.",
-        'personalization': "Ask: Are there other factors at play, not just you?",
-        'should statements': "Challenge rigid 'shoulds'—are they preferences or necessities?",
-        'mind reading': "Check: Do you have evidence for what others think?",
-        'overgeneralization': "Consider: Is this always true, or just sometimes?"
-    }
+    summary['distortion_frequencies'] = distortion_frequencies(df['detected_distortions']).to_dict()
+
+    summary['feedback'] = INSIGHT_FEEDBACK
 
     # Example: Common cyclical language triggers
-    summary['common_triggers'] = df['text_clean'].str.extractall(r'\b(never|always|everybody|nobody|should|must)\b')[0].value_counts().to_dict()
+    matches = matches if matches is not None else match_lexicons(df['text_clean'])
+    summary['common_triggers'] = _trigger_counts(matches)
     
     return summary
 
+# Streaming counterpart of user_insight_report
+class InsightAccumulator:
+    """Mergeable partial state for user_insight_report (streaming mode)."""
+
+    def __init__(self):
+        self.distortions = Counter()
+        self.triggers = Counter()
+
+    def update(self, df, matches=None):
+        labels = explode_distortions(df['detected_distortions'])[1]
+        codes, uniques = pd.factorize(labels)  # first-appearance order, as if updated list by list
+        self.distortions.update(dict(zip(uniques, np.bincount(codes, minlength=len(uniques)).tolist())))
+        matches = matches if matches is not None else match_lexicons(df['text_clean'])
+        self.triggers.update(_trigger_counts(matches))
+        return self
+
+    def merge(self, other):
+        self.distortions.update(other.distortions)
+        self.triggers.update(other.triggers)
+        return self
+
+    def report(self):
+        return {
+            'distortion_frequencies': dict(self.distortions.most_common()),
+            'feedback': INSIGHT_FEEDBACK,
+            'common_triggers': dict(self.triggers.most_common()),
+        }
+
 def print_user_insight_report(summary):
     print("\n--- PSYCHOLOGICAL INSIGHT REPORT ---")
     print("Most Frequent Detected Distortions:")
@@ -0,0 +1,157 @@
+# src/pipeline/graph.py
+import time
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+import pandas as pd
+from src.features.assembly import column_block, assemble_frame
+
+
+class Stage:
+    """
+    One pipeline step. fn(frame, **artifacts) gets a private frame holding
+    only the `inputs` columns (same index as the data) plus the artifacts
+    named in `needs`, and returns either a DataFrame containing its
+    `outputs` columns (ideally a block of just those, see
+    src/features/assembly.py), or a dict with its outputs and the artifacts
+    in `provides` (shared non-column results such as a tokenized corpus).
+    A stage may overwrite a column it reads (e.g. parsing dates in place).
+    """
+
+    def __init__(self, name, fn, inputs=(), outputs=(), needs=(), provides=()):
+        self.name = name
+        self.fn = fn
+        self.inputs = list(inputs)
+        self.outputs = list(outputs)
+        self.needs = list(needs)
+        self.provides = list(provides)
+
+    def __repr__(self):
+        return f"Stage({self.name!r}, inputs={self.inputs}, outputs={self.outputs + self.provides})"
+
+
+class StageGraph:
+    """
+    Dependency graph of Stages, built from the columns and artifacts each one
+    declares. run() executes the stages a request needs, starting every
+    stage as soon as its inputs exist, so independent stages run
+    concurrently on a thread pool (`workers`; 1 runs them one by one in
+    declaration order). Each stage's outputs are kept as one column block
+    and the result frame is assembled once from the input frame and the
+    blocks, without copying either.
+    """
+
+    def __init__(self, stages):
+        self.stages = list(stages)
+        self.producers = {}
+        for stage in self.stages:
+            for name in stage.outputs + stage.provides:
+                if name in self.producers:
+                    raise ValueError(f"'{name}' is produced by both {self.producers[name].name} and {stage.name}")
+                self.producers[name] = stage
+        self.timings = {}
+
+    def _upstream(self, stage, name):
+        """Stage that produces `name` for `stage` (None: it comes from the input data)."""
+        producer = self.producers.get(name)
+        return None if producer is stage else producer
+
+    def plan(self, available=(), targets=None):
+        """
+        Stages needed for `targets` (all stages when None) given the columns /
+        artifacts in `available`, in an executable order.
+        """
+        available = set(available)
+        if targets is None:
+            required = list(self.stages)
+        else:
+            required, pending = set(), list(targets)
+            while pending:
+                name = pending.pop()
+                producer = self.producers.get(name)
+                if producer is None:
+                    if name not in available:
+                        raise KeyError(f"No stage produces '{name}' and it is not in the data")
+                    continue
+                if producer not in required:
+                    required.add(producer)
+                    pending.extend(producer.inputs + producer.needs)
+            required = [stage for stage in self.stages if stage in required]
+
+        order, done = [], set()
+        while len(order) < len(required):
+            ready = [stage for stage in required if stage.name not in done and self._ready(stage, done, available)]
+            if not ready:
+                blocked = [stage.name for stage in required if stage.name not in done]
+                raise ValueError(f"Unsatisfiable or cyclic stage dependencies: {blocked}")
+            order.append(ready[0])
+            done.add(ready[0].name)
+        return order
+
+    def _ready(self, stage, done, available):
+        for name in stage.inputs + stage.needs:
+            producer = self._upstream(stage, name)
+            if producer is None:
+                if name not in available:
+                    return False
+            elif producer.name not in done:
+                return False
+        return True
+
+    def _run_stage(self, stage, columns, artifacts, index, profiler, concurrent=False):
+        frame = pd.DataFrame({col: columns[col] for col in stage.inputs}, index=index, copy=False)
+        kwargs = {name: artifacts[name] for name in stage.needs}
+        start = time.perf_counter()
+        if profiler is not None:
+            with profiler.stage(stage.name, len(index), concurrent=concurrent):
+                result = stage.fn(frame, **kwargs)
+        else:
+            result = stage.fn(frame, **kwargs)
+        self.timings[stage.name] = time.perf_counter() - start
+        return result
+
+    def _collect(self, stage, result, columns, artifacts, blocks, index):
+        if isinstance(result, dict):
+            block = column_block({col: result[col] for col in stage.outputs}, index)
+        else:
+            block = result if list(result.columns) == stage.outputs else result[stage.outputs]
+        blocks[stage.name] = block
+        for col in stage.outputs:
+            columns[col] = block[col]
+        for name in stage.provides:
+            artifacts[name] = result[name]
+
+    def run(self, df, targets=None, artifacts=None, workers=1, profiler=None):
+        """
+        Run the stages needed for `targets` (default: all) on df. Returns the
+        result frame (df's columns followed by the new ones in stage order;
+        overwritten columns keep their place) and the artifacts dict. With a
+        RunProfiler each stage is recorded under its name. With workers > 1
+        stages overlap: each records its own thread's CPU time, and its peak
+        RSS is the process's while it ran (flagged as shared in the report).
+        """
+        columns = {col: df[col] for col in df.columns}
+        artifacts = dict(artifacts or {})
+        order = self.plan(list(columns) + list(artifacts), targets)
+        blocks = {}
+        if workers <= 1:
+            for stage in order:
+                result = self._run_stage(stage, columns, artifacts, df.index, profiler)
+                self._collect(stage, result, columns, artifacts, blocks, df.index)
+        else:
+            self._run_parallel(order, columns, artifacts, blocks, df.index, workers, profiler)
+
+        return assemble_frame(df, [blocks[stage.name] for stage in order]), artifacts
+
+    def _run_parallel(self, order, columns, artifacts, blocks, index, workers, profiler):
+        available = set(columns) | set(artifacts)
+        done, running = set(), {}
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while len(done) < len(order):
+                for stage in order:
+                    if stage.name not in done and stage not in running.values() and self._ready(stage, done, available):
+                        running[pool.submit(self._run_stage, stage, columns, artifacts, index, profiler, True)] = stage
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    stage = running.pop(future)
+                    # re-raises a failed stage (after the running ones finish); nothing new is started
+                    self._collect(stage, future.result(), columns, artifacts, blocks, index)
+                    done.add(stage.name)
@@ -0,0 +1,59 @@
+# src/profiling/import_profile.py
+import re
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+# "import time: self [us] | cumulative | imported package" lines of -X importtime
+_IMPORT_LINE = re.compile(r'^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)')
+
+
+def profile_imports(module='main'):
+    """
+    Import `module` in a fresh interpreter with -X importtime. Returns
+    (wall seconds, rows) with one row per imported module: name, depth,
+    self and cumulative seconds.
+    """
+    start = time.perf_counter()
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+                            capture_output=True, text=True)
+    wall = time.perf_counter() - start
+    if result.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{result.stderr[-2000:]}")
+    rows = []
+    for line in result.stderr.splitlines():
+        match = _IMPORT_LINE.match(line)
+        if match:
+            self_us, cumulative_us, indent, name = match.groups()
+            rows.append({'module': name, 'depth': len(indent) // 2, 'self': int(self_us) / 1e6,
+                         'cumulative': int(cumulative_us) / 1e6})
+    return wall, rows
+
+
+def print_import_profile(module='main', top=15):
+    """Where startup time goes: slowest direct imports, and self time per top-level package."""
+    wall, rows = profile_imports(module)
+    # a module is reported after everything it imported; earlier top-level
+    # rows are the interpreter's own startup imports
+    end = max(i for i, r in enumerate(rows) if r['depth'] == 0 and r['module'] == module)
+    begin = max([i + 1 for i, r in enumerate(rows[:end]) if r['depth'] == 0] or [0])
+    rows = rows[begin:end + 1]
+    print(f"\n⏱️ import {module}: {rows[-1]['cumulative']:.3f}s in imports, {wall:.3f}s wall (interpreter start included)")
+
+    direct = sorted((r for r in rows if r['depth'] == 1), key=lambda r: -r['cumulative'])
+    print(f"\nSlowest imports made by {module}:")
+    for r in direct[:top]:
+        print(f"  {r['cumulative']:7.3f}s  {r['module']}")
+
+    packages = defaultdict(float)
+    for r in rows:
+        packages[r['module'].split('.')[0]] += r['self']
+    print("\nSelf time by top-level package:")
+    for name, seconds in sorted(packages.items(), key=lambda item: -item[1])[:top]:
+        print(f"  {seconds:7.3f}s  {name}")
+    return wall, rows
+
+
+if __name__ == "__main__":
+    print_import_profile(*sys.argv[1:2])
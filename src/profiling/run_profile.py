@@ -0,0 +1,294 @@
+# src/profiling/run_profile.py
+import cProfile
+import json
+import os
+import platform
+import pstats
+import resource
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+
+REPORT_PREFIX = "run-"
+
+
+def _status_mb(field):
+    """VmRSS / VmHWM of this process in MB (Linux), or None."""
+    try:
+        with open('/proc/self/status') as f:
+            for line in f:
+                if line.startswith(field + ':'):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def reset_peak_rss():
+    """Reset the RSS high-water mark (Linux clear_refs); False when unsupported."""
+    try:
+        with open('/proc/self/clear_refs', 'w') as f:
+            f.write('5')
+        return True
+    except OSError:
+        return False
+
+
+def _max_rss_mb():
+    # ru_maxrss is KB on Linux, bytes on macOS
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / scale
+
+
+def current_rss_mb():
+    return _status_mb('VmRSS')
+
+
+def peak_rss_mb(since_reset=True):
+    """RSS high-water mark in MB: since the last reset_peak_rss() where supported, else of the process."""
+    peak = _status_mb('VmHWM') if since_reset else None
+    return peak if peak is not None else _max_rss_mb()
+
+
+class RunProfiler:
+    """
+    Stage-level instrumentation for a pipeline run. Each `with
+    profiler.stage(name, rows=n):` block records wall and CPU time, rows/sec,
+    resident memory at the end and the RSS high-water mark reached inside
+    the stage (the mark is reset at stage start where Linux allows it,
+    otherwise it is the process peak so far). A stage entered several times
+    (streaming chunks) accumulates.
+
+    Stages that run concurrently on threads (concurrent=True) record their
+    own thread's CPU time and leave the high-water mark alone; their peak
+    RSS is that of the whole process while they ran and is flagged
+    `peak_rss_shared` in the report. `stage_groups` maps fine-grained stage
+    names to coarser ones (e.g. the batch graph's stages to the streaming
+    stages) so diff_run_reports() can compare runs that name stages
+    differently.
+
+    cprofile_stage / tracemalloc_stage additionally run cProfile or
+    tracemalloc on one stage. finish() writes a JSON run report that
+    diff_run_reports() compares with an earlier one.
+    """
+
+    def __init__(self, enabled=True, report_dir='data/runs', cprofile_stage=None, tracemalloc_stage=None, top=15):
+        self.enabled = enabled
+        self.report_dir = report_dir
+        self.cprofile_stage = cprofile_stage
+        self.tracemalloc_stage = tracemalloc_stage
+        self.top = top
+        self.run_id = time.strftime('%Y%m%d-%H%M%S')
+        self.started_at = time.strftime('%Y-%m-%dT%H:%M:%S')
+        self.stages = {}
+        self.metadata = {}
+        self.stage_groups = {}
+        self._start = time.perf_counter()
+        self._profile = None
+        self._peak_resettable = None
+
+    @classmethod
+    def from_config(cls, config):
+        settings = (config or {}).get('profiling') or {}
+        return cls(enabled=settings.get('enabled', True), report_dir=settings.get('report_dir', 'data/runs'),
+                   cprofile_stage=settings.get('cprofile_stage'), tracemalloc_stage=settings.get('tracemalloc_stage'),
+                   top=settings.get('top', 15))
+
+    @contextmanager
+    def stage(self, name, rows=None, concurrent=False):
+        if not self.enabled:
+            yield
+            return
+        # resetting the mark under a concurrently running stage would clobber its peak
+        if not concurrent and (self._peak_resettable is None or self._peak_resettable):
+            self._peak_resettable = reset_peak_rss()
+        cpu_clock = time.thread_time if concurrent else time.process_time
+        if name == self.cprofile_stage:
+            self._profile = self._profile or cProfile.Profile()
+            self._profile.enable()
+        if name == self.tracemalloc_stage:
+            tracemalloc.start()
+        wall, cpu = time.perf_counter(), cpu_clock()
+        try:
+            yield
+        finally:
+            wall, cpu = time.perf_counter() - wall, cpu_clock() - cpu
+            if name == self.cprofile_stage:
+                self._profile.disable()
+            record = self.stages.setdefault(name, {'stage': name, 'calls': 0, 'wall_s': 0.0, 'cpu_s': 0.0,
+                                                   'rows': 0, 'peak_rss_mb': 0.0})
+            if name == self.tracemalloc_stage:
+                self._record_tracemalloc(record)
+            record['calls'] += 1
+            record['wall_s'] += wall
+            record['cpu_s'] += cpu
+            record['rows'] += rows or 0
+            record['rss_mb'] = current_rss_mb()
+            record['peak_rss_mb'] = max(record['peak_rss_mb'], peak_rss_mb(self._peak_resettable))
+            if concurrent:
+                record['peak_rss_shared'] = True
+
+    def iterate(self, name, iterable, rows=len):
+        """Yield from `iterable`, timing each next() as stage `name` (e.g. chunked loading)."""
+        iterator, done = iter(iterable), object()
+        while True:
+            with self.stage(name):
+                item = next(iterator, done)
+            if item is done:
+                return
+            if self.enabled and rows is not None:
+                self.stages[name]['rows'] += rows(item)
+            yield item
+
+    def _record_tracemalloc(self, record):
+        snapshot = tracemalloc.take_snapshot()
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        previous = record.get('tracemalloc', {})
+        if peak / 2 ** 20 < previous.get('peak_mb', -1):
+            return
+        top = snapshot.statistics('lineno')[:self.top]
+        record['tracemalloc'] = {  # peak inside the stage, sites still allocated at its end
+            'peak_mb': peak / 2 ** 20,
+            'top_retained': [{'line': f"{s.traceback[0].filename}:{s.traceback[0].lineno}", 'size_mb': s.size / 2 ** 20,
+                     'count': s.count} for s in top],
+        }
+
+    def _cprofile_report(self, path):
+        self._profile.dump_stats(path)
+        stats = pstats.Stats(self._profile)
+        rows = sorted(stats.stats.items(), key=lambda item: -item[1][3])[:self.top]
+        return {
+            'file': path,
+            'top': [{'function': f"{file}:{line}({func})", 'calls': calls, 'tottime': tottime, 'cumtime': cumtime}
+                    for (file, line, func), (_, calls, tottime, cumtime, _) in rows],
+        }
+
+    def report(self):
+        stages = []
+        for record in self.stages.values():
+            record = dict(record)
+            if record['stage'] in self.stage_groups:
+                record['group'] = self.stage_groups[record['stage']]
+            record['rows_per_s'] = record['rows'] / record['wall_s'] if record['rows'] and record['wall_s'] else None
+            stages.append(record)
+        return {
+            'run_id': self.run_id,
+            'started_at': self.started_at,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'argv': sys.argv,
+            **self.metadata,
+            'total_wall_s': time.perf_counter() - self._start,
+            'peak_rss_mb': max([s['peak_rss_mb'] for s in stages] + [0.0]),
+            'stages': stages,
+        }
+
+    def finish(self):
+        """Write the run report (and the cProfile dump), print the stage table; returns the report path."""
+        if not self.enabled:
+            return None
+        os.makedirs(self.report_dir, exist_ok=True)
+        report = self.report()
+        if self._profile is not None:
+            prof_path = os.path.join(self.report_dir, f"{REPORT_PREFIX}{self.run_id}-{self.cprofile_stage}.prof")
+            for record in report['stages']:
+                if record['stage'] == self.cprofile_stage:
+                    record['cprofile'] = self._cprofile_report(prof_path)
+        path = os.path.join(self.report_dir, f"{REPORT_PREFIX}{self.run_id}.json")
+        with open(path, 'w') as f:
+            json.dump(report, f, indent=2, default=str)
+        print_run_report(report)
+        print(f"🧾 Run report saved to: {path}")
+        return path
+
+
+def print_run_report(report):
+    print(f"\n=== Run profile ({report['run_id']}) ===")
+    print(f"{'stage':<16}{'calls':>6}{'wall s':>9}{'cpu s':>9}{'rows/s':>12}{'peak RSS MB':>13}")
+    for s in report['stages']:
+        rate = f"{s['rows_per_s']:,.0f}" if s.get('rows_per_s') else '-'
+        shared = '*' if s.get('peak_rss_shared') else ' '
+        print(f"{s['stage']:<16}{s['calls']:>6}{s['wall_s']:>9.2f}{s['cpu_s']:>9.2f}{rate:>12}{s['peak_rss_mb']:>13.1f}{shared}")
+    print(f"{'total':<16}{'':>6}{report['total_wall_s']:>9.2f}{'':>9}{'':>12}{report['peak_rss_mb']:>13.1f}")
+    if any(s.get('peak_rss_shared') for s in report['stages']):
+        print("* ran concurrently with other stages: peak RSS is the whole process's, cpu s is the stage's own thread")
+
+
+# === Comparing runs ===
+def list_run_reports(report_dir='data/runs'):
+    if not os.path.isdir(report_dir):
+        return []
+    return sorted(os.path.join(report_dir, f) for f in os.listdir(report_dir)
+                  if f.startswith(REPORT_PREFIX) and f.endswith('.json'))
+
+
+def load_run_report(path):
+    with open(path) as f:
+        return json.load(f)
+
+
+def _stages_by(report, key):
+    """Stage records of a report keyed by `key`, records sharing a key summed (peaks: max)."""
+    merged = {}
+    for s in report['stages']:
+        name = s.get(key, s['stage'])
+        if name not in merged:
+            merged[name] = {'wall_s': s['wall_s'], 'peak_rss_mb': s['peak_rss_mb']}
+        else:
+            merged[name]['wall_s'] += s['wall_s']
+            merged[name]['peak_rss_mb'] = max(merged[name]['peak_rss_mb'], s['peak_rss_mb'])
+    return merged
+
+
+def diff_run_reports(old, new):
+    """
+    Per-stage (and total) wall time and peak RSS of two run reports, with
+    relative change. When the reports name their stages differently (batch
+    stage graph vs streaming or pre-graph runs), stages are compared by
+    their `group`.
+    """
+    def change(a, b):
+        return (b - a) / a if a else None
+
+    same_stages = {s['stage'] for s in old['stages']} == {s['stage'] for s in new['stages']}
+    key = 'stage' if same_stages else 'group'
+    old_stages, new_stages = _stages_by(old, key), _stages_by(new, key)
+    names = list(old_stages) + [name for name in new_stages if name not in old_stages]
+    rows = []
+    for name in names:
+        a, b = old_stages.get(name, {}), new_stages.get(name, {})
+        rows.append({'stage': name, 'old_wall_s': a.get('wall_s'), 'new_wall_s': b.get('wall_s'),
+                     'wall_change': change(a.get('wall_s'), b.get('wall_s')) if a and b else None,
+                     'old_peak_rss_mb': a.get('peak_rss_mb'), 'new_peak_rss_mb': b.get('peak_rss_mb')})
+    rows.append({'stage': 'total', 'old_wall_s': old['total_wall_s'], 'new_wall_s': new['total_wall_s'],
+                 'wall_change': change(old['total_wall_s'], new['total_wall_s']),
+                 'old_peak_rss_mb': old['peak_rss_mb'], 'new_peak_rss_mb': new['peak_rss_mb']})
+    return rows
+
+
+def print_run_diff(old_path=None, new_path=None, report_dir='data/runs'):
+    """Compare two run reports (default: the two most recent in report_dir)."""
+    if old_path is None or new_path is None:
+        reports = list_run_reports(report_dir)
+        if len(reports) < 2:
+            print(f"⚠️ Need two run reports in {report_dir} to compare")
+            return None
+        old_path, new_path = reports[-2], reports[-1]
+    rows = diff_run_reports(load_run_report(old_path), load_run_report(new_path))
+
+    def fmt(value, spec):
+        return format(value, spec) if value is not None else format('-', '>9')
+
+    print(f"\n=== Run diff: {os.path.basename(old_path)} -> {os.path.basename(new_path)} ===")
+    print(f"{'stage':<16}{'old s':>9}{'new s':>9}{'change':>9}{'old MB':>9}{'new MB':>9}")
+    for r in rows:
+        flag = ' ⚠️' if r['wall_change'] is not None and r['wall_change'] > 0.2 else ''
+        print(f"{r['stage']:<16}{fmt(r['old_wall_s'], '9.2f')}{fmt(r['new_wall_s'], '9.2f')}"
+              f"{fmt(r['wall_change'], '+9.0%')}{fmt(r['old_peak_rss_mb'], '9.1f')}{fmt(r['new_peak_rss_mb'], '9.1f')}{flag}")
+    return rows
+
+
+if __name__ == "__main__":
+    print_run_diff(*sys.argv[1:3])
@@ -0,0 +1,46 @@
+# src/storage/aggregate_store.py
+import os
+import pandas as pd
+import pyarrow.dataset as ds
+
+# Period granularities precomputed for the dashboard
+AGGREGATE_FREQS = ['D', 'W', 'M']
+
+
+def _table_path(output_dir, name, freq):
+    return os.path.join(output_dir, f"{name}_{freq}.parquet")
+
+
+def save_aggregates(rollup, output_dir, freqs=AGGREGATE_FREQS, window=7, row_group_size=1024):
+    """
+    Write the dashboard tables of a PeriodRollup (see dashboard_tables) for
+    every granularity in `freqs`, one Parquet file per table and frequency.
+    Rows are sorted by period, so small row groups let period filters skip
+    most of the file.
+    """
+    os.makedirs(output_dir, exist_ok=True)
+    for freq in freqs:
+        for name, table in rollup.dashboard_tables(freq, window=window).items():
+            table.to_parquet(_table_path(output_dir, name, freq), index=False, row_group_size=row_group_size)
+    return output_dir
+
+
+def has_aggregates(output_dir, freq='D'):
+    return os.path.exists(_table_path(output_dir, 'distortions', freq))
+
+
+def load_aggregate(output_dir, name, freq='D', columns=None, start=None, end=None):
+    """
+    One dashboard table ('emotions', 'distortions' or 'traits') at `freq`,
+    reading only `columns` and the periods between `start` and `end`.
+    """
+    dataset = ds.dataset(_table_path(output_dir, name, freq), format='parquet')
+    filter_expr = None
+    if start is not None:
+        filter_expr = ds.field('period') >= pd.Timestamp(start)
+    if end is not None:
+        upper = ds.field('period') <= pd.Timestamp(end)
+        filter_expr = upper if filter_expr is None else filter_expr & upper
+    if columns is not None and 'period' not in columns:
+        columns = ['period'] + list(columns)
+    return dataset.to_table(columns=columns, filter=filter_expr).to_pandas()
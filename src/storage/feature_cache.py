@@ -0,0 +1,151 @@
+# src/storage/feature_cache.py
+import glob
+import hashlib
+import inspect
+import json
+import os
+import time
+import numpy as np
+import pandas as pd
+from src.features.assembly import column_block
+
+# hash_pandas_object needs a 16-character key; two keys give a 128-bit row hash
+_HASH_KEYS = ('journalyze-key-1', 'journalyze-key-2')
+_KEY_COLS = ['_key_hi', '_key_lo']
+# part files are compacted into one when a stage is loaded with more than this
+_MAX_PARTS = 16
+
+
+class FeatureCache:
+    """
+    Persistent per-entry cache for row-local pipeline stages. Entries are keyed
+    on a 128-bit hash of the stage's input text (the raw text columns for
+    preprocessing, text_clean after that); each stage's cache files are further
+    tied to a fingerprint of the preprocessing config and the source code of
+    the module that computes it, so a config or code change starts afresh.
+    """
+
+    def __init__(self, cache_dir, config, enabled=True):
+        self.cache_dir = cache_dir
+        self.enabled = enabled
+        self.text_columns = config['preprocessing'].get('text_columns', [])
+        settings = {k: v for k, v in config['preprocessing'].items() if k != 'parallel'}
+        self._config_token = json.dumps(settings, sort_keys=True, default=str)
+        self._parts = {}
+        self.stats = {}
+
+    @classmethod
+    def from_config(cls, config):
+        opts = config.get('cache', {}) or {}
+        return cls(opts.get('dir', 'data/cache'), config, enabled=opts.get('enabled', True))
+
+    def row_keys(self, df, key_cols=None):
+        cols = [c for c in (key_cols or self.text_columns) if c in df.columns]
+        texts = df[cols].astype(str)
+        return pd.MultiIndex.from_arrays(
+            [pd.util.hash_pandas_object(texts, index=False, hash_key=k).to_numpy() for k in _HASH_KEYS],
+            names=_KEY_COLS,
+        )
+
+    def fingerprint(self, modules, params=None):
+        digest = hashlib.sha1(self._config_token.encode())
+        if params is not None:
+            digest.update(json.dumps(params, sort_keys=True, default=str).encode())
+        for module in modules:
+            digest.update(inspect.getsource(module).encode())
+        return digest.hexdigest()[:16]
+
+    def _load(self, stage, fingerprint):
+        """Cached parts of a stage, read from disk once per run."""
+        if (stage, fingerprint) in self._parts:
+            return self._parts[(stage, fingerprint)]
+
+        prefix = os.path.join(self.cache_dir, f"{stage}-")
+        current = sorted(glob.glob(f"{prefix}{fingerprint}-*.parquet"))
+        # entries cached under an older config/code version can never hit again
+        for stale in set(glob.glob(f"{prefix}*.parquet")) - set(current):
+            os.remove(stale)
+
+        parts = [pd.read_parquet(path).set_index(_KEY_COLS) for path in current]
+        if len(parts) > _MAX_PARTS:
+            merged = pd.concat(parts)
+            parts = [merged[~merged.index.duplicated()]]
+            self._write(stage, fingerprint, parts[0])
+            for path in current:
+                os.remove(path)
+        self._parts[(stage, fingerprint)] = parts
+        return parts
+
+    def _write(self, stage, fingerprint, table):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = os.path.join(self.cache_dir, f"{stage}-{fingerprint}-{time.time_ns()}.parquet")
+        table.reset_index().to_parquet(path, index=False)
+
+    def run_stage(self, df, stage, fn, output_cols, modules=(), key_cols=None, row_kwargs=None, params=None,
+                  block=False):
+        """
+        Fill `output_cols` of df, calling fn(frame, **row_kwargs) -> frame only
+        on the rows whose key is not cached yet, and add those rows to the
+        cache. row_kwargs values are per-row artifacts with a take(positions)
+        method (e.g. LexiconMatches) and are subset to the missed rows. The
+        code fingerprint defaults to the module defining fn (or a partial's func);
+        `params` (JSON-serializable stage settings) are part of it too.
+        With block=True fn returns a column block instead of mutating its
+        frame, and run_stage returns the `output_cols` block for df (df is
+        left untouched).
+        """
+        row_kwargs = {k: v for k, v in (row_kwargs or {}).items() if v is not None}
+        if not self.enabled or df.empty:
+            result = fn(df, **row_kwargs)
+            return result[output_cols] if block else result
+
+        fingerprint = self.fingerprint(modules or [inspect.getmodule(getattr(fn, 'func', fn))], params)
+        parts = self._load(stage, fingerprint)
+        keys = self.row_keys(df, key_cols)
+
+        hit = np.zeros(len(df), dtype=bool)
+        pieces, positions = [], []
+        for part in parts:
+            found = keys.isin(part.index) & ~hit
+            if found.any():
+                pieces.append(part.reindex(keys[found])[output_cols].reset_index(drop=True))
+                positions.append(np.flatnonzero(found))
+                hit |= found
+
+        stats = self.stats.setdefault(stage, {'hits': 0, 'misses': 0})
+        stats['hits'] += int(hit.sum())
+        stats['misses'] += int((~hit).sum())
+
+        if (~hit).any():
+            missed = np.flatnonzero(~hit)
+            subset_kwargs = {k: v.take(missed) for k, v in row_kwargs.items()}
+            missed_rows = df[~hit] if block else df[~hit].copy()
+            computed = fn(missed_rows, **subset_kwargs)[output_cols].reset_index(drop=True)
+            pieces.append(computed)
+            positions.append(missed)
+            new_entries = computed.set_index(keys[~hit])
+            new_entries = new_entries[~new_entries.index.duplicated()]
+            self._write(stage, fingerprint, new_entries)
+            parts.append(new_entries)
+
+        combined = pd.concat(pieces, ignore_index=True).iloc[np.argsort(np.concatenate(positions), kind='stable')]
+        columns = {}
+        for col in output_cols:
+            values = combined[col]
+            if values.dtype == object:
+                # list cells come back from Parquet as arrays
+                values = values.map(lambda v: list(v) if isinstance(v, np.ndarray) else v)
+            # .array keeps categoricals categorical
+            columns[col] = values.array
+        if block:
+            return column_block(columns, df.index)
+        for col, values in columns.items():
+            df[col] = values
+        return df
+
+    def report(self):
+        print("\n=== Feature cache ===")
+        for stage, s in self.stats.items():
+            total = s['hits'] + s['misses']
+            rate = s['hits'] / total if total else 0.0
+            print(f"{stage}: {s['hits']} hits, {s['misses']} misses ({rate:.1%} hit rate)")
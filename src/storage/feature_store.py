@@ -0,0 +1,234 @@
+# src/storage/feature_store.py
+import os
+import shutil
+import time
+from contextlib import nullcontext
+import pandas as pd
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+FEATURES_DATASET = "cleaned_journal_features"
+FEATURES_CSV = "cleaned_journal_features.csv"
+PARTITION_COL = "month"
+
+# Low-cardinality label columns stored dictionary-encoded
+CATEGORICAL_COLUMNS = ['emotion', 'bias/distortion', 'context', 'TextBlob_Analysis', 'nlp_emotion', 'nlp_distortion']
+# List-valued columns stored as native Arrow lists of dictionary-encoded labels
+LIST_COLUMNS = ['detected_distortions']
+# Mostly-zero numeric blocks kept as pandas sparse columns in memory
+SPARSE_PREFIXES = ('tfidf_',)
+
+
+def feature_schema(df):
+    """
+    Arrow schema for the processed feature frame: numeric/datetime columns keep
+    their dtype, label columns are dictionary-encoded, list columns stay lists.
+    """
+    fields = []
+    for col in df.columns:
+        dtype = df[col].dtype
+        if isinstance(dtype, pd.SparseDtype):
+            dtype = dtype.subtype
+        if col in LIST_COLUMNS:
+            arrow_type = pa.list_(pa.dictionary(pa.int32(), pa.string()))
+        elif col in CATEGORICAL_COLUMNS or isinstance(dtype, pd.CategoricalDtype):
+            arrow_type = pa.dictionary(pa.int32(), pa.string())
+        elif pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_numeric_dtype(dtype) or pd.api.types.is_datetime64_any_dtype(dtype):
+            arrow_type = pa.from_numpy_dtype(dtype)
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(col, arrow_type))
+    return pa.schema(fields)
+
+
+def to_arrow_table(df, date_col='date'):
+    schema = feature_schema(df)
+    sparse_cols = [col for col in df.columns if isinstance(df[col].dtype, pd.SparseDtype)]
+    dense_cols = [col for col in df.columns if col not in sparse_cols]
+    table = pa.Table.from_pandas(df[dense_cols], schema=pa.schema([schema.field(c) for c in dense_cols]), preserve_index=False)
+    if sparse_cols:
+        # Sparse columns are densified one at a time, straight into Arrow
+        for col in sparse_cols:
+            table = table.append_column(schema.field(col), pa.array(df[col].sparse.to_dense().to_numpy(), schema.field(col).type))
+        table = table.select(list(df.columns))
+    if date_col in df.columns:
+        months = pd.to_datetime(df[date_col]).dt.strftime('%Y-%m')
+        table = table.append_column(PARTITION_COL, pa.array(months.to_numpy(dtype=object), pa.string()))
+    return table
+
+
+def save_features(df, output_dir, date_col='date', append=False, row_group_size=100_000):
+    """
+    Write the feature frame as a Parquet dataset partitioned by month
+    (<output_dir>/cleaned_journal_features/month=YYYY-MM/*.parquet).
+    With append=True the rows are added next to the existing files.
+    """
+    root = os.path.join(output_dir, FEATURES_DATASET)
+    if not append and os.path.exists(root):
+        shutil.rmtree(root)
+    os.makedirs(root, exist_ok=True)
+
+    table = to_arrow_table(df, date_col=date_col)
+    partition_cols = [PARTITION_COL] if PARTITION_COL in table.column_names else None
+    pq.write_to_dataset(
+        table,
+        root,
+        partition_cols=partition_cols,
+        # time-ordered file names keep appended chunks in write order on read
+        basename_template=f"part-{time.time_ns()}-{{i}}.parquet",
+        existing_data_behavior='overwrite_or_ignore',
+        row_group_size=row_group_size,
+    )
+    return root
+
+
+def export_csv(df, output_dir, append=False):
+    """CSV export of the feature frame (the pre-Parquet output format)."""
+    output_file = os.path.join(output_dir, FEATURES_CSV)
+    df.to_csv(output_file, index=False, mode='a' if append else 'w', header=not append)
+    return output_file
+
+
+def _dataset(output_dir):
+    return ds.dataset(os.path.join(output_dir, FEATURES_DATASET), format='parquet', partitioning='hive')
+
+
+def feature_columns(output_dir):
+    """Column names of the stored features, read from the schema only."""
+    root = os.path.join(output_dir, FEATURES_DATASET)
+    if not os.path.isdir(root):
+        return pd.read_csv(os.path.join(output_dir, FEATURES_CSV), nrows=0).columns.tolist()
+    return [name for name in _dataset(output_dir).schema.names if name != PARTITION_COL]
+
+
+def list_periods(output_dir):
+    """Months present in the dataset, read from the partition directories only."""
+    root = os.path.join(output_dir, FEATURES_DATASET)
+    if not os.path.isdir(root):
+        dates = pd.read_csv(os.path.join(output_dir, FEATURES_CSV), usecols=['date'])['date']
+        return sorted(pd.to_datetime(dates).dt.strftime('%Y-%m').unique())
+    prefix = f"{PARTITION_COL}="
+    return sorted(d[len(prefix):] for d in os.listdir(root) if d.startswith(prefix))
+
+
+def _period_filter(periods):
+    return ds.field(PARTITION_COL).isin(list(periods)) if periods is not None else None
+
+
+def _to_pandas(table):
+    """Arrow table of stored features -> the in-memory frame layout."""
+    df = table.to_pandas()
+    for col in LIST_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].map(list)
+    sparse_cols = [col for col in df.columns if col.startswith(SPARSE_PREFIXES)]
+    if sparse_cols:
+        df[sparse_cols] = df[sparse_cols].astype(pd.SparseDtype('float64', 0.0))
+    return df
+
+
+def load_features(output_dir, columns=None, periods=None):
+    """
+    Load processed features, reading only `columns` and the month partitions
+    in `periods` (e.g. ['2024-01']). Falls back to the CSV export when no
+    Parquet dataset exists.
+    """
+    root = os.path.join(output_dir, FEATURES_DATASET)
+    if not os.path.isdir(root):
+        df = pd.read_csv(os.path.join(output_dir, FEATURES_CSV), usecols=columns)
+        if periods is not None and 'date' in df.columns:
+            df = df[pd.to_datetime(df['date']).dt.strftime('%Y-%m').isin(periods)]
+        return df
+
+    dataset = _dataset(output_dir)
+    # the hive partition column is storage layout, not a feature
+    columns = columns if columns is not None else [name for name in dataset.schema.names if name != PARTITION_COL]
+    return _to_pandas(dataset.to_table(columns=columns, filter=_period_filter(periods)))
+
+
+def count_rows(output_dir, periods=None):
+    """Number of stored entries (in the month partitions `periods`), from the Parquet footers."""
+    root = os.path.join(output_dir, FEATURES_DATASET)
+    if not os.path.isdir(root):
+        return len(load_features(output_dir, columns=['date'], periods=periods))
+    return _dataset(output_dir).count_rows(filter=_period_filter(periods))
+
+
+def _row_groups(dataset, periods=None):
+    """Row groups of the dataset in load_features order, with their row counts (from the footers)."""
+    for fragment in dataset.get_fragments(filter=_period_filter(periods)):
+        for row_group in fragment.split_by_row_group():
+            yield row_group, row_group.row_groups[0].num_rows
+
+
+def load_page(output_dir, offset, limit, columns=None, periods=None):
+    """
+    Rows [offset, offset + limit) of load_features(output_dir, columns,
+    periods), reading only the row groups that hold them: row counts come
+    from the Parquet footers, so a page costs about the same wherever it is.
+    """
+    root = os.path.join(output_dir, FEATURES_DATASET)
+    if not os.path.isdir(root):
+        return load_features(output_dir, columns, periods).iloc[offset:offset + limit].reset_index(drop=True)
+
+    dataset = _dataset(output_dir)
+    columns = columns if columns is not None else [name for name in dataset.schema.names if name != PARTITION_COL]
+    pieces, position, stop = [], 0, offset + limit
+    for row_group, n_rows in _row_groups(dataset, periods):
+        if position + n_rows > offset:
+            start = max(offset - position, 0)
+            pieces.append(row_group.to_table(columns=columns).slice(start, stop - position - start))
+        position += n_rows
+        if position >= stop:
+            break
+    if not pieces:
+        return _to_pandas(dataset.schema.empty_table().select(columns))
+    return _to_pandas(pa.concat_tables(pieces))
+
+
+def iter_feature_batches(output_dir, columns=None, periods=None, batch_size=50_000):
+    """
+    Stored features as a sequence of DataFrames of at most batch_size rows,
+    read one row group at a time (no read-ahead of whole files).
+    """
+    root = os.path.join(output_dir, FEATURES_DATASET)
+    if not os.path.isdir(root):
+        yield from pd.read_csv(os.path.join(output_dir, FEATURES_CSV), usecols=columns, chunksize=batch_size)
+        return
+    dataset = _dataset(output_dir)
+    columns = columns if columns is not None else [name for name in dataset.schema.names if name != PARTITION_COL]
+    for row_group, n_rows in _row_groups(dataset, periods):
+        table = row_group.to_table(columns=columns)
+        for start in range(0, n_rows, batch_size):
+            yield _to_pandas(table.slice(start, batch_size))
+
+
+def estimate_csv_bytes(output_dir, columns=None, periods=None, sample_rows=1000):
+    """
+    Approximate size of write_features_csv's output without writing it: the
+    row count (from the Parquet footers) times the mean CSV row size of the
+    first `sample_rows` rows.
+    """
+    sample = next(iter_feature_batches(output_dir, columns, periods, batch_size=sample_rows), None)
+    if sample is None or sample.empty:
+        return 0
+    header = len(sample.iloc[:0].to_csv(index=False).encode())
+    row_bytes = len(sample.to_csv(index=False, header=False).encode()) / len(sample)
+    return int(header + row_bytes * count_rows(output_dir, periods))
+
+
+def write_features_csv(output_dir, dest, columns=None, periods=None, batch_size=50_000, max_bytes=None):
+    """
+    Stream the stored features into a CSV file (path or binary file object),
+    one batch at a time, so memory stays at one batch whatever the size.
+    With max_bytes, writing stops after the batch that passes it (the file is
+    then incomplete). Returns the number of bytes written.
+    """
+    written = 0
+    with open(dest, 'wb') if isinstance(dest, str) else nullcontext(dest) as f:
+        for i, df in enumerate(iter_feature_batches(output_dir, columns, periods, batch_size)):
+            written += f.write(df.to_csv(index=False, header=i == 0).encode())
+            if max_bytes is not None and written > max_bytes:
+                break
+    return written
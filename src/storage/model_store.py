@@ -0,0 +1,110 @@
+# src/storage/model_store.py
+import json
+import os
+import shutil
+import time
+import numpy as np
+
+LATEST_FILE = "LATEST"
+META_FILE = "meta.json"
+
+
+def _version_dir(root, name, version):
+    return os.path.join(root, name, f"v{version:04d}")
+
+
+def latest_version(root, name):
+    """Latest saved version number of a model, or None."""
+    path = os.path.join(root, name, LATEST_FILE)
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return int(f.read().strip())
+
+
+def list_versions(root, name):
+    model_dir = os.path.join(root, name)
+    if not os.path.isdir(model_dir):
+        return []
+    return sorted(int(d[1:]) for d in os.listdir(model_dir) if d.startswith('v') and d[1:].isdigit())
+
+
+def save_artifact(root, name, arrays, metadata=None, keep=None):
+    """
+    Save a model as a new version: one .npy file per array (loadable with
+    memory-mapping) plus meta.json. The LATEST pointer is switched only
+    after every file is written; with `keep`, older versions beyond the
+    newest `keep` are removed. Returns the version number.
+    """
+    import sklearn
+    versions = list_versions(root, name)
+    version = versions[-1] + 1 if versions else 1
+    path = _version_dir(root, name, version)
+    os.makedirs(path)
+    for key, values in arrays.items():
+        np.save(os.path.join(path, f"{key}.npy"), np.asarray(values))
+    meta = {
+        'name': name,
+        'version': version,
+        'created_at': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'sklearn_version': sklearn.__version__,
+        'arrays': sorted(arrays),
+    }
+    meta.update(metadata or {})
+    with open(os.path.join(path, META_FILE), 'w') as f:
+        json.dump(meta, f, indent=2, default=str)
+    tmp = os.path.join(root, name, f"{LATEST_FILE}.tmp")
+    with open(tmp, 'w') as f:
+        f.write(str(version))
+    os.replace(tmp, os.path.join(root, name, LATEST_FILE))
+    if keep:
+        for old in (versions + [version])[:-keep]:
+            shutil.rmtree(_version_dir(root, name, old), ignore_errors=True)
+    return version
+
+
+def load_artifact(root, name, version=None, mmap=True):
+    """
+    (arrays, metadata) of a saved model version (latest by default), or
+    (None, None) when nothing is saved. Arrays are memory-mapped read-only.
+    """
+    version = version if version is not None else latest_version(root, name)
+    if version is None:
+        return None, None
+    path = _version_dir(root, name, version)
+    with open(os.path.join(path, META_FILE)) as f:
+        meta = json.load(f)
+    arrays = {key: np.load(os.path.join(path, f"{key}.npy"), mmap_mode='r' if mmap else None) for key in meta['arrays']}
+    return arrays, meta
+
+
+def align_labels(new_labels, old_labels, n_clusters):
+    """
+    Map freshly fitted cluster ids onto the ids of the previous model so that
+    ids stay stable across refits. Both labelings are for the same entries;
+    the mapping maximizes the number of entries keeping their id (Hungarian
+    assignment on the contingency table). Returns (mapping array indexed by
+    new id, share of entries whose id is unchanged).
+    """
+    from scipy.optimize import linear_sum_assignment
+    new_labels = np.asarray(new_labels, dtype=np.int64)
+    old_labels = np.asarray(old_labels, dtype=np.int64)
+    n_old = max(n_clusters, int(old_labels.max()) + 1 if len(old_labels) else 0)
+    table = np.zeros((n_clusters, n_old), dtype=np.int64)
+    np.add.at(table, (new_labels, old_labels), 1)
+    rows, cols = linear_sum_assignment(table, maximize=True)
+    mapping = np.full(n_clusters, -1, dtype=np.int64)
+    mapping[rows] = cols
+    # clusters without a counterpart get ids after the old ones
+    unmatched = np.flatnonzero(mapping < 0)
+    mapping[unmatched] = n_old + np.arange(len(unmatched))
+    agreement = table[rows, cols].sum() / max(len(new_labels), 1)
+    return mapping, float(agreement)
+
+
+def nearest_centroid(X, centers):
+    """Index of the nearest centroid (squared euclidean) for each row of X, dense or sparse."""
+    centers = np.asarray(centers)
+    scores = X @ centers.T
+    scores = np.asarray(scores) * -2 + (centers ** 2).sum(axis=1)
+    return scores.argmin(axis=1)
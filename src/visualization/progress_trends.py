@@ -1,8 +1,6 @@
 # src/visualization/progress_trends.py
 
 import pandas as pd
-import matplotlib.pyplot as plt
-import seaborn as sns
 
 def plot_emotion_trend(df, date_col='date', emotion_col='emotion', save_path=None):
     """
@@ -12,6 +10,8 @@ def plot_emotion_trend(df, date_col='date', emotion_col='emotion', save_path=Non
         print(f"[Warning] No '{date_col}' column found. Trend visualization skipped.")
         return
 
+    import matplotlib.pyplot as plt
+
     # Ensure datetime
     df[date_col] = pd.to_datetime(df[date_col])
     top_emotions = df[emotion_col].value_counts().head(5).index.tolist()
@@ -35,6 +35,7 @@ def plot_distortion_trend(df, date_col='date', distortion_col='distortion_count'
     if date_col not in df.columns:
         print(f"[Warning] No '{date_col}' column found. Trend visualization skipped.")
         return
+    import matplotlib.pyplot as plt
     df[date_col] = pd.to_datetime(df[date_col])
     distortion_by_date = df.groupby(date_col)[distortion_col].sum()
     distortion_by_date.rolling(window=7, min_periods=1).mean().plot(figsize=(12,6))
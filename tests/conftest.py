@@ -0,0 +1,32 @@
+# tests/conftest.py
+import os
+import sys
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from src.data_preprocess.load_data import load_journal_data, load_yaml_config
+
+
+@pytest.fixture(scope='session')
+def config():
+    """The shipped config, with data paths resolved against the repo root."""
+    config = load_yaml_config(os.path.join(ROOT, 'src', 'config', 'config.yaml'))
+    for key in ('raw_data_dir', 'processed_data_dir'):
+        config['data'][key] = os.path.join(ROOT, config['data'][key])
+    config['preprocessing']['nltk_download'] = False
+    return config
+
+
+@pytest.fixture(scope='session')
+def journal(config):
+    """The bundled journal entries (raw)."""
+    return load_journal_data(config)
+
+
+@pytest.fixture(scope='session')
+def clean_journal(journal, config):
+    """The bundled journal after preprocessing (text_clean)."""
+    from src.data_preprocess.preprocess import preprocess_dataframe
+    return preprocess_dataframe(journal.copy(), config)
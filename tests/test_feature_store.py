@@ -0,0 +1,44 @@
+# tests/test_feature_store.py
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.storage.feature_store import (FEATURES_DATASET, count_rows, estimate_csv_bytes, list_periods,
+                                       save_features, write_features_csv)
+
+
+@pytest.fixture(scope='module')
+def store(tmp_path_factory):
+    rng = np.random.default_rng(0)
+    n = 20_000
+    df = pd.DataFrame({
+        'date': pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 24 * 200, size=n), unit='h'),
+        'text': [' '.join(['word'] * k) for k in rng.integers(1, 60, size=n)],
+        'emotion': rng.choice(['joy', 'sadness', 'anger'], size=n),
+        'sentiment_polarity': rng.normal(size=n),
+    })
+    output_dir = str(tmp_path_factory.mktemp('processed'))
+    save_features(df, output_dir, row_group_size=5_000)
+    return output_dir
+
+
+def test_estimate_is_close_to_the_written_size(store, tmp_path):
+    dest = str(tmp_path / 'features.csv')
+    written = write_features_csv(store, dest)
+    assert written == os.path.getsize(dest)
+    assert len(pd.read_csv(dest)) == count_rows(store)
+    assert estimate_csv_bytes(store) == pytest.approx(written, rel=0.1)
+
+
+def test_write_stops_past_max_bytes(store, tmp_path):
+    full = write_features_csv(store, str(tmp_path / 'full.csv'))
+    dest = str(tmp_path / 'capped.csv')
+    written = write_features_csv(store, dest, batch_size=1_000, max_bytes=100_000)
+    assert 100_000 < written < full
+    assert written == os.path.getsize(dest)
+
+
+def test_store_without_months(tmp_path):
+    os.makedirs(tmp_path / FEATURES_DATASET)
+    assert list_periods(str(tmp_path)) == []
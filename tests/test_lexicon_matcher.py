@@ -0,0 +1,111 @@
+# tests/test_lexicon_matcher.py
+import re
+import numpy as np
+import pytest
+
+from src.features.feature_engineering import COG_DISTORTION_KEYWORDS, NEG_EMOTION_WORDS
+from src.features.lexicon_matcher import LexiconMatcher, match_lexicons, SUBSTRING, TOKEN, WORD
+from src.features.pattern_detection import TRIGGER_TERMS
+from src.features.personality_traits import BIG5_LEXICON, score_big5
+from src.insights.psychological_inference import CBT_DISTORTION_KEYWORDS, INSIGHT_TRIGGER_TERMS, infer_distortions
+
+EDGE_CASES = [
+    # multi-word CBT phrases, with the whitespace around them varied
+    "It was my fault, every time it's me",
+    "it was all my  fault and every\ttime",
+    "MY FAULT. Every Time. Because of me!",
+    "myfault everytime",
+    # curly-apostrophe trigger, case-sensitive in the trigger lexicons
+    "I can’t, I just can’t",
+    "Can’t stop. CAN’T stop.",
+    "I can't (straight apostrophe)",
+    # substrings that are not tokens or words
+    "shoulder allowance nevertheless predictable",
+    "all-nighter, never-ending; must've should've",
+    "nevernever alwaysalways",
+    # non-ASCII word characters next to a term
+    "éshould should_ never2 ñever",
+    "",
+    "   ",
+]
+
+
+# === Reference scans (the per-row code the matcher replaced) ===
+def _substring_any(text, keywords):
+    text_lower = text.lower()
+    return any(kw in text_lower for kw in keywords)
+
+
+def _token_count(text, words):
+    return sum(1 for word in text.lower().split() if word in words)
+
+
+def _contains(texts, term):
+    # Old trigger frequency: df[col].str.contains(term), case-sensitive
+    return sum(term in text for text in texts)
+
+
+def _word_total(texts, terms):
+    pattern = re.compile(r'\b(' + '|'.join(terms) + r')\b')
+    totals = dict.fromkeys(terms, 0)
+    for text in texts:
+        for term in pattern.findall(text):
+            totals[term] += 1
+    return totals
+
+
+@pytest.fixture(scope='module', params=['text', 'text_clean'])
+def texts(request, clean_journal):
+    return list(clean_journal[request.param].astype(str)) + EDGE_CASES
+
+
+def test_substring_mode_matches_in_scan(texts):
+    matches = match_lexicons(texts)
+    for dist, keywords in CBT_DISTORTION_KEYWORDS.items():
+        expected = np.array([_substring_any(t, keywords) for t in texts])
+        np.testing.assert_array_equal(matches.contains_any(f'cbt:{dist}', SUBSTRING), expected, err_msg=dist)
+
+    indicators = np.column_stack([matches.contains_any(f'cbt:{d}', SUBSTRING) for d in CBT_DISTORTION_KEYWORDS])
+    for text, row in zip(texts, indicators):
+        found = [d for d, hit in zip(CBT_DISTORTION_KEYWORDS, row) if hit]
+        assert set(found or ['none detected']) == set(infer_distortions(text)), text
+
+
+def test_token_mode_matches_split_membership(texts):
+    matches = match_lexicons(texts)
+    for lexicon, words in (('cog_distortion', COG_DISTORTION_KEYWORDS), ('neg_emotion', NEG_EMOTION_WORDS)):
+        expected = [_token_count(t, words) for t in texts]
+        np.testing.assert_array_equal(matches.lexicon_counts(lexicon, TOKEN), expected, err_msg=lexicon)
+
+    big5 = LexiconMatcher(BIG5_LEXICON).match_many(texts)
+    for trait in BIG5_LEXICON:
+        expected = [score_big5(t)[trait] for t in texts]
+        np.testing.assert_array_equal(big5.lexicon_counts(trait, TOKEN), expected, err_msg=trait)
+
+
+def test_case_sensitive_triggers_match_str_contains(texts):
+    matches = match_lexicons(texts)
+    expected = {term: _contains(texts, term) for term in TRIGGER_TERMS}
+    assert matches.document_frequencies('pattern_trigger', SUBSTRING) == expected
+    assert expected['can’t'] > 0
+
+
+def test_word_mode_matches_regex_scan(texts):
+    matches = match_lexicons(texts)
+    assert matches.term_totals('insight_trigger', WORD) == _word_total(texts, INSIGHT_TRIGGER_TERMS)
+
+
+def test_phrases_and_curly_apostrophe():
+    matcher = LexiconMatcher({'phrases': ['my fault', 'every time', 'can’t']}, case_sensitive=['phrases'])
+    texts = ["my fault, every time", "My fault every  time", "I can’t", "I CAN’T", "can’tcan’t"]
+    matches = matcher.match_many(texts)
+
+    def counts(mode):
+        return matches.term_matrix('phrases', mode).toarray().tolist()
+
+    assert counts(SUBSTRING) == [[1, 1, 0], [0, 0, 0], [0, 0, 1], [0, 0, 0], [0, 0, 2]]
+    assert counts(WORD) == [[1, 1, 0], [0, 0, 0], [0, 0, 1], [0, 0, 0], [0, 0, 0]]
+    # A phrase is a token match when whitespace delimits the whole phrase
+    assert counts(TOKEN) == [[0, 1, 0], [0, 0, 0], [0, 0, 1], [0, 0, 0], [0, 0, 0]]
+    for text, row in zip(texts, counts(WORD)):
+        assert row == [len(re.findall(r'\b' + re.escape(t) + r'\b', text)) for t in matcher.lexicons['phrases']]
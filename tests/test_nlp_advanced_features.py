@@ -0,0 +1,113 @@
+# tests/test_nlp_advanced_features.py
+import pandas as pd
+import pytest
+
+torch = pytest.importorskip('torch')
+transformers = pytest.importorskip('transformers')
+
+from src.features import nlp_advanced_features as nlp
+
+SPECIAL_TOKENS = ['[PAD]', '[UNK]', '[CLS]', '[SEP]', '[MASK]']
+
+
+@pytest.fixture(autouse=True)
+def empty_registry():
+    nlp.clear_model_registry()
+    yield
+    nlp.clear_model_registry()
+
+
+@pytest.fixture(scope='module')
+def texts(clean_journal):
+    texts = clean_journal['text_clean'].astype(str)
+    # the per-row pipeline does not truncate, so keep entries well inside 512 tokens
+    texts = texts[texts.str.split().str.len().between(1, 200)].head(60)
+    return pd.Series(list(texts) + ['', '   '])
+
+
+@pytest.fixture(scope='module')
+def vocab_file(tmp_path_factory, texts):
+    words = sorted({w for t in texts for w in t.split()})
+    path = tmp_path_factory.mktemp('vocab') / 'vocab.txt'
+    path.write_text('\n'.join(SPECIAL_TOKENS + words) + '\n')
+    return path
+
+
+def _save_tiny_model(path, vocab_file, labels, seed, do_lower_case=True):
+    """A randomly initialised one-layer BERT classifier saved with save_pretrained."""
+    tokenizer = transformers.BertTokenizerFast(vocab_file=str(vocab_file), do_lower_case=do_lower_case)
+    config = transformers.BertConfig(
+        vocab_size=tokenizer.vocab_size, hidden_size=16, num_hidden_layers=1, num_attention_heads=2,
+        intermediate_size=32, max_position_embeddings=512, initializer_range=1.0,
+        num_labels=len(labels), id2label=dict(enumerate(labels)), label2id={l: i for i, l in enumerate(labels)},
+    )
+    torch.manual_seed(seed)
+    model = transformers.BertForSequenceClassification(config).eval()
+    model.save_pretrained(path)
+    tokenizer.save_pretrained(path)
+    return str(path)
+
+
+@pytest.fixture(scope='module')
+def models(tmp_path_factory, vocab_file):
+    root = tmp_path_factory.mktemp('models')
+    return {
+        'emotion': _save_tiny_model(root / 'emotion', vocab_file, ['joy', 'sadness', 'anger', 'fear'], seed=0),
+        'distortion': _save_tiny_model(root / 'distortion', vocab_file, ['labeling', 'blaming', 'none'], seed=1),
+        'cased': _save_tiny_model(root / 'cased', vocab_file, ['joy', 'sadness'], seed=2, do_lower_case=False),
+    }
+
+
+def _config(emotion_model, distortion_model):
+    # small batches so that several padded batches of mixed lengths are run
+    return {'nlp_models': {'device': 'cpu', 'emotion_model': emotion_model, 'distortion_model': distortion_model,
+                           'max_batch_tokens': 256, 'max_batch_size': 8}}
+
+
+def _pipeline_labels(model_path, texts, empty_label):
+    # The per-row classification add_nlp_*_column used before batching
+    model = transformers.pipeline('text-classification', model=model_path, tokenizer=model_path, device=-1)
+    return [model(x)[0]['label'] if x.strip() else empty_label for x in texts]
+
+
+def _count_tokenizer_calls(monkeypatch, tokenizer):
+    calls = []
+    original = type(tokenizer).__call__
+
+    def counting_call(self, *args, **kwargs):
+        calls.append(self)
+        return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(type(tokenizer), '__call__', counting_call)
+    return calls
+
+
+def test_add_nlp_columns_matches_per_row_pipeline(models, texts):
+    df = pd.DataFrame({'text_clean': texts})
+    nlp.add_nlp_columns(df, config=_config(models['emotion'], models['distortion']))
+    assert df['nlp_emotion'].tolist() == _pipeline_labels(models['emotion'], texts, 'neutral')
+    assert df['nlp_distortion'].tolist() == _pipeline_labels(models['distortion'], texts, 'none_detected')
+
+
+def test_heads_sharing_a_tokenizer_tokenize_once(models, texts, monkeypatch):
+    tokenizer, key = nlp.load_tokenizer(models['emotion'])
+    shared, shared_key = nlp.load_tokenizer(models['distortion'])
+    assert shared is tokenizer and shared_key == key
+
+    calls = _count_tokenizer_calls(monkeypatch, tokenizer)
+    nlp.add_nlp_columns(pd.DataFrame({'text_clean': texts}), config=_config(models['emotion'], models['distortion']))
+    assert len(calls) == 1
+
+
+def test_tokenizer_settings_are_part_of_the_key(models, texts, monkeypatch):
+    lower, lower_key = nlp.load_tokenizer(models['emotion'])
+    cased, cased_key = nlp.load_tokenizer(models['cased'])
+    # same vocabulary, different normalisation: not shared
+    assert lower.get_vocab() == cased.get_vocab()
+    assert cased_key != lower_key and cased is not lower
+
+    calls = _count_tokenizer_calls(monkeypatch, lower)
+    df = pd.DataFrame({'text_clean': texts.str.upper()})
+    nlp.add_nlp_columns(df, config=_config(models['emotion'], models['cased']))
+    assert len(calls) == 2
+    assert df['nlp_distortion'].tolist() == _pipeline_labels(models['cased'], df['text_clean'], 'none_detected')
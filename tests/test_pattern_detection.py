@@ -0,0 +1,81 @@
+# tests/test_pattern_detection.py
+from collections import Counter
+import numpy as np
+import pytest
+
+from src.features.corpus import build_corpus
+from src.features.pattern_detection import NgramSketch
+
+ORDERS = [2, 3]
+TOP_K = 15
+
+
+def _most_common(texts, n):
+    # get_top_ngrams' Counter before the sketch
+    grams = []
+    for txt in texts:
+        words = txt.split()
+        grams.extend(' '.join(g) for g in zip(*[words[i:] for i in range(n)]))
+    return Counter(grams)
+
+
+@pytest.fixture(scope='module')
+def zipf_texts():
+    """5,000 documents of Zipf-distributed words."""
+    rng = np.random.default_rng(0)
+    words = np.array([f'w{rank}' for rank in range(1, 3001)])
+    weights = 1.0 / np.arange(1, len(words) + 1) ** 1.2
+    lengths = rng.integers(3, 40, size=5000)
+    tokens = rng.choice(words, size=lengths.sum(), p=weights / weights.sum())
+    return [' '.join(doc) for doc in np.split(tokens, np.cumsum(lengths)[:-1])]
+
+
+@pytest.fixture(scope='module', params=['bundled', 'zipf'])
+def texts(request, clean_journal, zipf_texts):
+    return clean_journal['text_clean'].tolist() if request.param == 'bundled' else zipf_texts
+
+
+def _merged_halves(texts, **kwargs):
+    half = len(texts) // 2
+    return NgramSketch(ORDERS, **kwargs).update(texts[:half]).merge(NgramSketch(ORDERS, **kwargs).update(texts[half:]))
+
+
+@pytest.mark.parametrize('n', ORDERS)
+def test_update_and_merge_match_most_common(texts, n):
+    expected = _most_common(texts, n).most_common(TOP_K)
+    assert NgramSketch(ORDERS).update(texts).top(n, TOP_K) == expected
+    assert _merged_halves(texts).top(n, TOP_K) == expected
+    # several blocks and update() calls on one sketch
+    sketch = NgramSketch(ORDERS, block_tokens=5000)
+    for start in range(0, len(texts), 700):
+        sketch.update(build_corpus(texts[start:start + 700]))
+    assert sketch.top(n, TOP_K) == expected
+
+
+@pytest.mark.parametrize('n', ORDERS)
+def test_bounded_sketch_keeps_heavy_hitters(zipf_texts, n):
+    true_counts = _most_common(zipf_texts, n)
+    sketch = _merged_halves(zipf_texts, capacity=2000, block_tokens=20000)
+    table = sketch.tables[n]
+    assert len(table['keys']) <= 2000 and table['floor'] > 0
+
+    # every kept count is an upper bound, off by at most its error
+    for gram, count, error in zip(table['grams'], table['counts'], table['errors']):
+        assert count - error <= true_counts[gram] <= count
+    # every n-gram seen more than `floor` times is kept
+    kept = set(table['grams'])
+    assert all(gram in kept for gram, count in true_counts.items() if count > table['floor'])
+
+    # an n-gram whose true count clears the (k+1)-th true count by more than the floor is in the top k
+    threshold = true_counts.most_common(TOP_K + 1)[-1][1] + table['floor']
+    top = [gram for gram, _ in sketch.top(n, TOP_K)]
+    certain = [gram for gram, count in true_counts.most_common(TOP_K) if count > threshold]
+    assert certain and set(certain) <= set(top)
+
+
+def test_merge_breaks_ties_by_first_appearance():
+    # 'd e' only occurs in the second half, at its start; 'b c' late in the first: 'b c' comes first
+    texts = ['a a a a b c', 'b c', 'd e', 'd e']
+    expected = _most_common(texts, 2).most_common(3)
+    assert expected == [('a a', 3), ('b c', 2), ('d e', 2)]
+    assert _merged_halves(texts).top(2, 3) == expected
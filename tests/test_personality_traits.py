@@ -0,0 +1,76 @@
+# tests/test_personality_traits.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.corpus import build_corpus
+from src.features.personality_traits import BIG5_LEXICON, big5_block, score_big5, score_traits, trait_lexicon
+
+EXTRA_LEXICON = {
+    'openness': {'Curious': 2, 'museum': 0.5, 'art': 3},   # new terms, one re-weighted
+    'neuroticism': ['PANIC'],                             # term list, weight 1
+    'resilience': {'cope': 1, 'Recover': 1.5},            # new trait
+}
+
+EDGE_CASES = [
+    "Curious CURIOUS curious, museum MUSEUM art Art",
+    "panic PANIC Panic! worry afraid",
+    "I cope and recover; RECOVER cope cope",
+    "friendly\tkind\nteam  generous",
+    "",
+]
+
+
+def _weighted_reference(text, lexicon):
+    # score_big5 generalised to weights: lower-cased whitespace tokens looked up per trait
+    words = text.lower().split()
+    return [sum(terms.get(w, 0) for w in words) for terms in lexicon.values()]
+
+
+@pytest.fixture(scope='module', params=['text', 'text_clean'])
+def texts(request, clean_journal):
+    return clean_journal[request.param].astype(str).tolist() + EDGE_CASES
+
+
+def test_score_traits_matches_score_big5(texts):
+    scores = score_traits(build_corpus(texts))
+    expected = np.array([[score_big5(t)[trait] for trait in BIG5_LEXICON] for t in texts])
+    assert scores.dtype == np.int64
+    np.testing.assert_array_equal(scores, expected)
+
+
+def test_big5_block_matches_score_big5(texts):
+    df = pd.DataFrame({'text_clean': texts}, index=np.arange(len(texts)) * 2)
+    expected = pd.DataFrame([score_big5(t) for t in texts], index=df.index).add_prefix('big5_')
+    pd.testing.assert_frame_equal(big5_block(df), expected)
+
+
+def test_config_lexicon_terms_are_lower_cased():
+    lexicon = trait_lexicon({'traits': {'lexicon': EXTRA_LEXICON}})
+    assert lexicon['openness']['curious'] == 2 and 'Curious' not in lexicon['openness']
+    assert lexicon['openness']['art'] == 3 and lexicon['openness']['imagine'] == 1
+    assert lexicon['neuroticism']['panic'] == 1
+    assert lexicon['resilience'] == {'cope': 1, 'recover': 1.5}
+    assert list(lexicon)[:len(BIG5_LEXICON)] == list(BIG5_LEXICON)
+    assert trait_lexicon({'traits': {'lexicon': {}}}) == trait_lexicon()
+
+
+def test_weighted_extended_lexicon(texts):
+    lexicon = trait_lexicon({'traits': {'lexicon': EXTRA_LEXICON}})
+    df = pd.DataFrame({'text_clean': texts})
+    block = big5_block(df, lexicon=lexicon)
+
+    assert list(block.columns) == [f'big5_{trait}' for trait in BIG5_LEXICON] + ['big5_resilience']
+    expected = np.array([_weighted_reference(t, lexicon) for t in texts], dtype=float)
+    np.testing.assert_allclose(block.to_numpy(), expected, rtol=0, atol=1e-12)
+    # whole tokens only: 'curious,' and 'recover;' do not count
+    first = len(texts) - len(EDGE_CASES)
+    assert block.loc[first, 'big5_openness'] == 2 * 2 + 0.5 * 2 + 3 * 2
+    assert block.loc[first + 2, 'big5_resilience'] == 3 * 1 + 1 * 1.5
+
+
+def test_integer_weights_keep_integer_counts(texts):
+    lexicon = trait_lexicon({'traits': {'lexicon': {'resilience': ['cope', 'recover']}}})
+    scores = score_traits(build_corpus(texts), lexicon)
+    assert scores.dtype == np.int64
+    np.testing.assert_array_equal(scores, [_weighted_reference(t, lexicon) for t in texts])
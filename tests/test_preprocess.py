@@ -0,0 +1,52 @@
+# tests/test_preprocess.py
+import copy
+import pytest
+
+from src.data_preprocess.preprocess import TextPreprocessor, preprocess_text
+
+EDGE_CASES = [
+    # contractions NLTK's Treebank rules split apart
+    "I cannot sleep, I'm gonna try, gimme a minute, gotta go, lemme think, wanna rest",
+    "CANNOT Cannot cannot. Gonna! wanna? GIMME",
+    "can't won't don't shouldn't I've you'd they'll",
+    # curly quotes / apostrophes and other non-ASCII punctuation
+    "I’m “fine” — really… it’s ‘okay’",
+    "Cannot’s rule: “gonna” isn’t wanna",
+    # digits, ASCII and not
+    "Slept 4 hours, 2nd night in a row; 10/10 would not recommend 3.5",
+    "٣ days and ４ nights, ２０２４",
+    # other non-ASCII text
+    "Café naïve résumé — déjà vu, straße, 東京 😊",
+    # empty and whitespace-only
+    "",
+    "   ",
+    "\t\n  \r\n",
+]
+
+CONFIG_VARIANTS = {
+    'default': {},
+    'keep_case': {'lowercase': False},
+    'keep_stopwords': {'remove_stopwords': False, 'lemmatize': False},
+    'keep_punctuation_digits': {'remove_punctuation': False, 'remove_numbers': False},
+}
+
+
+def _variant(config, overrides):
+    config = copy.deepcopy(config)
+    config['preprocessing'].update(overrides)
+    return config
+
+
+@pytest.mark.parametrize('variant', sorted(CONFIG_VARIANTS))
+def test_edge_cases_match_preprocess_text(config, variant):
+    config = _variant(config, CONFIG_VARIANTS[variant])
+    preprocessor = TextPreprocessor(config)
+    for text in EDGE_CASES:
+        assert preprocessor(text) == preprocess_text(text, config), text
+
+
+def test_bundled_corpus_matches_preprocess_text(config, journal):
+    preprocessor = TextPreprocessor(config)
+    texts = journal['text'].astype(str)
+    mismatches = [t for t in texts if preprocessor(t) != preprocess_text(t, config)]
+    assert not mismatches, f"{len(mismatches)} of {len(texts)} entries differ, e.g. {mismatches[0]!r}"
@@ -0,0 +1,82 @@
+# tests/test_quirk_detection.py
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.features.corpus import build_corpus
+from src.features.quirk_detection import OnlineQuirkClusterer, online_quirk_clusters
+
+N_CLUSTERS = 5
+CONFIG = {'quirks': {'n_clusters': N_CLUSTERS, 'batch_size': 256}}
+
+
+@pytest.fixture(scope='module')
+def corpus(clean_journal):
+    return build_corpus(clean_journal['text_clean'])
+
+
+def _fitted(corpus, n_rows=2000):
+    df = pd.DataFrame(index=range(n_rows))
+    _, clusterer = online_quirk_clusters(df, corpus.take(np.arange(n_rows)), CONFIG)
+    return clusterer
+
+
+def _rare_chunk(clusterer, corpus, n_rows):
+    """Unseen entries from the smallest cluster: as a chunk their share shift alone passes the drift threshold."""
+    rest = np.arange(2000, len(corpus))
+    labels = clusterer.predict(corpus.take(rest))
+    rarest = np.argmin(clusterer.label_counts)
+    return corpus.take(rest[labels == rarest][:n_rows])
+
+
+@pytest.mark.parametrize('chunk_rows', [1, 2, N_CLUSTERS - 1])
+def test_chunk_smaller_than_n_clusters(corpus, chunk_rows):
+    clusterer = _fitted(corpus)
+    reference = corpus.take(np.arange(2000))
+    before = clusterer.predict(reference)
+    terms = list(clusterer.vectorizer.terms)
+
+    chunk = _rare_chunk(clusterer, corpus, chunk_rows)
+    assert clusterer.drift(chunk)['needs_refit']
+    df, same = online_quirk_clusters(pd.DataFrame(index=range(chunk_rows)), chunk, CONFIG, clusterer=clusterer)
+
+    assert same is clusterer
+    assert df['quirk_cluster'].between(0, N_CLUSTERS - 1).all()
+    assert list(clusterer.vectorizer.terms) == terms
+    assert clusterer.model.cluster_centers_.shape[0] == N_CLUSTERS
+    # a few rows nudge the centroids; they do not renumber the clusters
+    assert (clusterer.predict(reference) == before).mean() > 0.95
+
+
+def test_chunk_smaller_than_n_clusters_without_update(corpus):
+    clusterer = _fitted(corpus)
+    centers = clusterer.model.cluster_centers_.copy()
+    chunk = _rare_chunk(clusterer, corpus, 3)
+    online_quirk_clusters(pd.DataFrame(index=range(3)), chunk, CONFIG, clusterer=clusterer, update=False)
+    np.testing.assert_array_equal(clusterer.model.cluster_centers_, centers)
+
+
+def test_checkpoint_without_min_drift_rows(corpus):
+    clusterer = _fitted(corpus)
+    del clusterer.min_drift_rows  # checkpoints written before the setting existed
+    chunk = _rare_chunk(clusterer, corpus, 3)
+    df, _ = online_quirk_clusters(pd.DataFrame(index=range(3)), chunk, CONFIG, clusterer=clusterer)
+    assert len(df['quirk_cluster']) == 3
+
+
+def test_min_drift_rows_never_below_n_clusters():
+    assert OnlineQuirkClusterer(n_clusters=N_CLUSTERS, min_drift_rows=2).min_drift_rows == N_CLUSTERS
+    assert OnlineQuirkClusterer(n_clusters=N_CLUSTERS, batch_size=64).min_drift_rows == 64
+
+
+def test_refit_keeps_vocabulary_and_ids(corpus):
+    clusterer = _fitted(corpus)
+    terms = list(clusterer.vectorizer.terms)
+    rest = corpus.take(np.arange(2000, len(corpus)))
+    before = clusterer.predict(rest)
+
+    agreement = clusterer.refit(rest)
+
+    assert list(clusterer.vectorizer.terms) == terms
+    assert agreement == pytest.approx((clusterer.predict(rest) == before).mean())
+    assert agreement > 0.5
@@ -0,0 +1,79 @@
+# tests/test_sentiment.py
+import numpy as np
+import pytest
+from textblob import TextBlob
+
+from src.features.corpus import build_corpus
+from src.features.sentiment import BatchSentimentScorer, batch_sentiment
+
+TOLERANCE = BatchSentimentScorer.tolerance
+
+EDGE_CASES = [
+    # modifier chains, broken by long unknown words but not by short ones
+    "really very good",
+    "really extremely bad day",
+    "very zzzz good",
+    "very ab good",
+    "not good",
+    "not very good at all",
+    "never really happy but not sad",
+    "no no no good",
+    "good not",
+    # emoticons, alphanumeric and not
+    "xD so happy",
+    "XD bad",
+    "happy :)",
+    "sad :( but ok :-D",
+    "<3 love it ;)",
+    # punctuation, contractions, quotes and line breaks
+    "Good! Bad? Great...",
+    "I don't feel good, it isn't great.",
+    "It's “wonderful” — isn't it?",
+    "Terrible.\nWonderful.\r\nOK",
+    "good-bad well-known",
+    "GOOD Good gOoD",
+    # digits, non-ASCII, empty
+    "10 good 20 bad 3rd best",
+    "café très bien, naïve good",
+    "",
+    "   ",
+]
+
+SYNTHETIC_WORDS = [
+    'good', 'bad', 'happy', 'sad', 'great', 'terrible', 'love', 'awful',
+    'very', 'really', 'extremely', 'quite', 'slightly', 'too',
+    'not', 'no', 'never', 'xD', 'XD',
+    'a', 'is', 'it', 'of', 'day', 'today', 'feeling', 'zzzz', 'notgood',
+]
+
+
+def _textblob(texts):
+    sentiments = [TextBlob(t).sentiment for t in texts]
+    return np.array([s.polarity for s in sentiments]), np.array([s.subjectivity for s in sentiments])
+
+
+def _assert_matches_textblob(texts, corpus=None):
+    polarity, subjectivity = batch_sentiment(texts, corpus=corpus)
+    expected_polarity, expected_subjectivity = _textblob(texts)
+    assert np.max(np.abs(polarity - expected_polarity), initial=0.0) <= TOLERANCE
+    assert np.max(np.abs(subjectivity - expected_subjectivity), initial=0.0) <= TOLERANCE
+
+
+def test_edge_cases_match_textblob():
+    _assert_matches_textblob(EDGE_CASES)
+    for text in EDGE_CASES:
+        _assert_matches_textblob([text])
+
+
+def test_synthetic_plain_text_matches_textblob():
+    rng = np.random.default_rng(0)
+    texts = [' '.join(rng.choice(SYNTHETIC_WORDS, size=rng.integers(0, 12))) for _ in range(2000)]
+    _assert_matches_textblob(texts)
+
+
+@pytest.mark.parametrize('text_col', ['text', 'text_clean'])
+def test_bundled_corpus_matches_textblob(clean_journal, text_col):
+    texts = clean_journal[text_col].astype(str)
+    _assert_matches_textblob(texts)
+    # and with a shared TokenizedCorpus instead of re-splitting
+    _assert_matches_textblob(texts, corpus=build_corpus(texts))